@@ -0,0 +1,113 @@
+# Microbenchmark of the "readblocks" method that doesn't need a server or a network connection.
+# It can be run on the MCU or on a computer, as long as the 'adafruit_requests' module can be imported.
+
+# Imports
+import binascii
+import gc
+import time
+
+import bld_remote
+
+
+# Constants
+SECTOR_SIZE = 512
+SECTOR_COUNTS = [1, 2, 4, 8, 16]
+ITERATIONS = 50
+
+
+# Code
+class LocalResponse:
+    # Imitates the parts of "adafruit_requests.Response" that are used by the BLD.
+    
+    status_code: int
+    content: bytes
+    
+    def __init__(self, content: bytes):
+        self.status_code = 200
+        self.content = content
+    
+    def iter_content(self, chunk_size: int = 1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+    
+    def close(self) -> None:
+        pass
+
+
+class LocalSession:
+    # Imitates the server's "/data/" route with sectors held in memory.
+    
+    data: bytearray
+    
+    def __init__(self, sector_count: int):
+        self.data = bytearray(sector_count * SECTOR_SIZE)
+        for i in range(len(self.data)):
+            self.data[i] = i % 251
+    
+    def get(self, url: str, timeout: int = 0) -> LocalResponse:
+        params = {}
+        for param in url.split("?")[1].split("&"):
+            key, value = param.split("=")
+            params[key] = value
+        
+        start_index = int(params["ssi"]) * SECTOR_SIZE
+        end_index = start_index + int(params["sc"]) * SECTOR_SIZE
+        
+        if params.get("enc") == bld_remote.BLD_ENCODING_RAW:
+            return LocalResponse(bytes(self.data[start_index:end_index]))
+        return LocalResponse(binascii.b2a_base64(self.data[start_index:end_index]))
+
+
+def print_result(name: str, sector_count: int, elapsed_ns: int) -> None:
+    byte_count = sector_count * SECTOR_SIZE * ITERATIONS
+    print("> {:<24} {:>3} sector(s): {:>12} B/s".format(
+        name, sector_count, int(byte_count / (max(elapsed_ns, 1) / 1000000000))))
+
+
+def bench_copy(sector_count: int) -> None:
+    data = bytes(sector_count * SECTOR_SIZE)
+    buf = bytearray(len(data))
+    
+    # Copy loop used before the "readblocks" rework.
+    start = time.monotonic_ns()
+    for _ in range(ITERATIONS):
+        for i in range(0, len(buf)):
+            buf[i] = data[i]
+    print_result("Per-byte copy", sector_count, time.monotonic_ns() - start)
+    
+    start = time.monotonic_ns()
+    for _ in range(ITERATIONS):
+        buf[:] = data
+    print_result("Slice copy", sector_count, time.monotonic_ns() - start)
+
+
+def bench_readblocks(sector_count: int, encoding: str, collect_garbage: bool) -> None:
+    bld = bld_remote.RemoteBlockDevice(
+        session=LocalSession(max(SECTOR_COUNTS)),
+        server_base_address="",
+        server_timeout=0,
+        sector_count=max(SECTOR_COUNTS),
+        sector_size=SECTOR_SIZE,
+        encoding=encoding,
+        collect_garbage=collect_garbage,
+    )
+    buf = bytearray(sector_count * SECTOR_SIZE)
+    
+    start = time.monotonic_ns()
+    for _ in range(ITERATIONS):
+        bld.readblocks(0, buf)
+    print_result("readblocks {} gc={}".format(encoding, int(collect_garbage)), sector_count,
+                 time.monotonic_ns() - start)
+
+
+print("Copying decoded sectors into the return buffer:")
+for count in SECTOR_COUNTS:
+    bench_copy(count)
+    gc.collect()
+
+print("Reading sectors from a local session:")
+for count in SECTOR_COUNTS:
+    for bench_encoding in [bld_remote.BLD_ENCODING_BASE64, bld_remote.BLD_ENCODING_RAW]:
+        for bench_gc in [True, False]:
+            bench_readblocks(count, bench_encoding, bench_gc)
+            gc.collect()
@@ -0,0 +1,404 @@
+# Imports
+import time
+
+
+# Constants
+# Size of the buffer in which the status line, the headers and the small bodies of the responses are received.
+HTTP_BUFFER_SIZE = 1024
+
+# Delay before the first reconnection attempt, doubled after each failed attempt up to the given maximum.
+RECONNECT_BACKOFF_START = 0.1
+RECONNECT_BACKOFF_MAX = 5
+RECONNECT_ATTEMPTS = 8
+
+# Period over which the connection setups are counted.
+SETUP_COUNT_PERIOD = 60
+
+
+# Code
+class ManagedResponse:
+    # Response of a request sent by a ManagedSession, which can be used like the ones of adafruit_requests.
+    # It is only read from the socket when its status is first needed, which lets other requests be sent before that.
+    
+    method: str
+    path: str
+    
+    def __init__(self, session, method: str, path: str, head: bytes, body):
+        self.method = method
+        self.path = path
+        
+        self._session = session
+        self._head = head
+        self._body = body
+        
+        self._status_code = None
+        self._error = None
+        
+        # Amount of bytes of the body that are still in the socket, and the body if it had to be read in advance.
+        self._remaining = 0
+        self._content = None
+        self._close_connection = False
+    
+    @property
+    def status_code(self) -> int:
+        self._session._read_head(self)
+        return self._status_code
+    
+    @property
+    def content(self) -> bytes:
+        self._session._read_head(self)
+        
+        if self._content is None:
+            self._content = bytes(self._session._read_body(self, self._remaining))
+        return self._content
+    
+    def iter_content(self, chunk_size: int = 1024):
+        """
+        Yields the body of the response in chunks of at most the given size.
+        :param chunk_size: Maximum size of each chunk
+        :return: Generator of chunks
+        """
+        self._session._read_head(self)
+        
+        if self._content is not None:
+            for offset in range(0, len(self._content), chunk_size):
+                yield self._content[offset:offset + chunk_size]
+            return
+        
+        while self._remaining > 0:
+            yield self._session._read_body(self, min(chunk_size, self._remaining))
+    
+    def close(self) -> None:
+        """
+        Reads and drops what is left of the body so that the connection can be used by the next response.
+        :return: None
+        """
+        if self._error is not None or self._content is not None:
+            self._session._forget(self)
+            return
+        
+        self._session._read_head(self)
+        while self._remaining > 0:
+            self._session._read_body(self, min(HTTP_BUFFER_SIZE, self._remaining))
+        self._session._forget(self)
+
+
+class ManagedSession:
+    # Keeps a single HTTP/1.1 connection to the server alive between requests and reconnects with a bounded backoff
+    #  when it is lost, which can be used instead of an adafruit_requests.Session.
+    # Up to `max_in_flight` requests can be sent before their responses are read, all the requests sent by the BLD
+    #  can be sent again safely if the connection is lost before their response is received.
+    
+    host: str
+    port: int
+    timeout: float
+    
+    # Number of requests that can be waiting for their response at the same time, 1 disables the pipelining.
+    max_in_flight: int
+    
+    # Number of connections that were set up, and of requests that were sent.
+    setups: int
+    requests: int
+    
+    def __init__(self, pool, host: str, port: int, timeout: float = 10, max_in_flight: int = 1):
+        """
+        :param pool: A socketpool.SocketPool, or the "socket" module on CPython
+        :param host: Address of the server
+        :param port: Port of the server
+        :param timeout: Seconds after which a connection attempt or a read fails
+        :param max_in_flight: Number of requests that can be sent before reading their response
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_in_flight = max(max_in_flight, 1)
+        self.setups = 0
+        self.requests = 0
+        
+        self._pool = pool
+        self._socket = None
+        self._setup_times = []
+        
+        # Responses that weren't entirely read yet, in the order their requests were sent.
+        self._in_flight = []
+        
+        self._buffer = bytearray(HTTP_BUFFER_SIZE)
+        self._buffer_view = memoryview(self._buffer)
+        self._buffer_start = 0
+        self._buffer_end = 0
+    
+    def get(self, url: str, headers: dict = None, timeout: float = None) -> ManagedResponse:
+        return self.send("GET", url, headers=headers)
+    
+    def post(self, url: str, data=None, headers: dict = None, timeout: float = None) -> ManagedResponse:
+        return self.send("POST", url, data, headers)
+    
+    def send(self, method: str, url: str, data=None, headers: dict = None) -> ManagedResponse:
+        """
+        Sends a request without waiting for its response, which is read when its status or body is accessed.
+        :param method: HTTP method
+        :param url: Absolute URL or path of the request, the host and port are always the session's ones
+        :param data: Body of the request, or None
+        :param headers: Additional headers, or None
+        :return: The response
+        """
+        # Making some room by reading the oldest responses ahead of time.
+        while len(self._in_flight) >= self.max_in_flight:
+            self._buffer_response(self._in_flight[0])
+        
+        if url.startswith("http://"):
+            path_start = url.find("/", len("http://"))
+            url = url[path_start:] if path_start >= 0 else "/"
+        
+        head = "{} {} HTTP/1.1\r\nHost: {}:{}\r\nContent-Length: {}\r\n".format(
+            method, url, self.host, self.port, 0 if data is None else len(data))
+        if headers is not None:
+            for name, value in headers.items():
+                head += "{}: {}\r\n".format(name, value)
+        
+        response = ManagedResponse(self, method, url, (head + "\r\n").encode(), data)
+        self._in_flight.append(response)
+        self.requests += 1
+        
+        try:
+            if self._socket is None:
+                self._reconnect()
+            else:
+                self._send_request(response)
+        except OSError:
+            # The requests that are in flight are sent again on a new connection.
+            self._reconnect()
+        
+        return response
+    
+    def setups_per_minute(self) -> int:
+        """
+        Returns the number of connections that were set up during the last minute.
+        :return: Number of connection setups
+        """
+        now = time.monotonic()
+        while self._setup_times and now - self._setup_times[0] > SETUP_COUNT_PERIOD:
+            self._setup_times.pop(0)
+        return len(self._setup_times)
+    
+    def close(self) -> None:
+        """
+        Closes the connection, the responses that weren't read yet can't be used anymore.
+        :return: None
+        """
+        self._fail_in_flight(OSError("The session was closed"))
+        self._close_socket()
+    
+    def _connect(self) -> None:
+        # Setting up a new connection, waiting longer after each failed attempt.
+        self._close_socket()
+        
+        backoff = RECONNECT_BACKOFF_START
+        for attempt in range(RECONNECT_ATTEMPTS):
+            sock = None
+            try:
+                address = self._pool.getaddrinfo(self.host, self.port)[0][4]
+                sock = self._pool.socket(self._pool.AF_INET, self._pool.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                
+                # The heads are sent apart from the bodies, which Nagle's algorithm would otherwise hold back until
+                #  the server acknowledges them.
+                if hasattr(self._pool, "TCP_NODELAY"):
+                    sock.setsockopt(self._pool.IPPROTO_TCP, self._pool.TCP_NODELAY, 1)
+                sock.connect(address)
+                
+                self._socket = sock
+                self.setups += 1
+                self._setup_times.append(time.monotonic())
+                self.setups_per_minute()
+                return
+            except OSError:
+                if sock is not None:
+                    sock.close()
+                
+                if attempt == RECONNECT_ATTEMPTS - 1:
+                    raise
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+    
+    def _reconnect(self) -> None:
+        # Connecting again and sending the requests whose response wasn't received again.
+        # Responses that were partially read can't be recovered.
+        for attempt in range(RECONNECT_ATTEMPTS):
+            try:
+                self._connect()
+            except OSError as err:
+                self._fail_in_flight(err)
+                raise
+            
+            for response in self._in_flight:
+                if response._status_code is not None:
+                    self._fail_in_flight(OSError("The connection was lost while receiving a response"))
+                    raise OSError("The connection was lost while receiving a response")
+            
+            try:
+                for response in self._in_flight:
+                    self._send_request(response)
+                return
+            except OSError:
+                continue
+        
+        self._fail_in_flight(OSError("Unable to send the requests"))
+        raise OSError("Unable to send the requests")
+    
+    def _send_request(self, response: ManagedResponse) -> None:
+        self._send_all(response._head)
+        if response._body is not None:
+            self._send_all(response._body)
+    
+    def _send_all(self, data) -> None:
+        view = memoryview(data)
+        sent = 0
+        while sent < len(view):
+            count = self._socket.send(view[sent:])
+            if count is None or count <= 0:
+                raise OSError("Unable to send the request")
+            sent += count
+    
+    def _close_socket(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+        self._buffer_start = 0
+        self._buffer_end = 0
+    
+    def _fail_in_flight(self, error: OSError) -> None:
+        for response in self._in_flight:
+            response._error = error
+        self._in_flight = []
+        self._close_socket()
+    
+    def _forget(self, response: ManagedResponse) -> None:
+        # Called once a response was entirely read, the connection is closed if the server asked for it.
+        if response in self._in_flight:
+            self._in_flight.remove(response)
+        
+        if response._close_connection:
+            response._close_connection = False
+            if self._in_flight:
+                self._reconnect()
+            else:
+                self._close_socket()
+    
+    def _buffer_response(self, response: ManagedResponse) -> None:
+        # Reading a whole response in memory so that the ones sent after it can be read.
+        response.content
+        self._forget(response)
+    
+    def _read_head(self, response: ManagedResponse) -> None:
+        if response._error is not None:
+            raise response._error
+        
+        if response._status_code is not None:
+            return
+        
+        # The responses come back in the order their requests were sent.
+        while self._in_flight and self._in_flight[0] is not response:
+            self._buffer_response(self._in_flight[0])
+        
+        if response._error is not None:
+            raise response._error
+        
+        for attempt in range(RECONNECT_ATTEMPTS):
+            try:
+                status_line = self._read_line()
+                break
+            except OSError:
+                # Usually the server closing an idle connection, the request is sent again on a new one.
+                if attempt == RECONNECT_ATTEMPTS - 1:
+                    self._fail_in_flight(OSError("Unable to receive the response"))
+                    raise response._error
+                self._reconnect()
+        
+        try:
+            version, status, _ = (status_line.decode() + "  ").split(" ", 2)
+            response._status_code = int(status)
+            
+            response._remaining = None
+            while True:
+                line = self._read_line()
+                if not line:
+                    break
+                
+                name, _, value = line.decode().partition(":")
+                name = name.strip().lower()
+                value = value.strip().lower()
+                
+                if name == "content-length":
+                    response._remaining = int(value)
+                elif name == "connection":
+                    response._close_connection = value == "close"
+            
+            if version != "HTTP/1.1":
+                response._close_connection = True
+            
+            if response._remaining is None:
+                raise OSError("The server didn't give the length of its response")
+        except (OSError, ValueError) as err:
+            self._fail_in_flight(OSError("Got an invalid response: {}".format(err)))
+            raise response._error
+        
+        if response._remaining == 0:
+            self._forget(response)
+    
+    def _read_body(self, response: ManagedResponse, size: int) -> bytearray:
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        
+        try:
+            # Using what was already received with the headers first.
+            buffered = min(self._buffer_end - self._buffer_start, size)
+            if buffered > 0:
+                view[:buffered] = self._buffer_view[self._buffer_start:self._buffer_start + buffered]
+                self._buffer_start += buffered
+                received = buffered
+            
+            while received < size:
+                count = self._socket.recv_into(view[received:], size - received)
+                if count <= 0:
+                    raise OSError("The connection was closed by the server")
+                received += count
+        except OSError as err:
+            self._fail_in_flight(err)
+            raise
+        
+        response._remaining -= size
+        if response._remaining == 0:
+            self._forget(response)
+        
+        return data
+    
+    def _read_line(self) -> bytes:
+        # Returns the next line of the response's head without its line ending.
+        if self._socket is None:
+            raise OSError("Not connected")
+        
+        while True:
+            end = self._buffer.find(b"\n", self._buffer_start, self._buffer_end)
+            if end >= 0:
+                line = bytes(self._buffer_view[self._buffer_start:end])
+                self._buffer_start = end + 1
+                return line.rstrip(b"\r")
+            
+            # Moving what is left to the start of the buffer before receiving more.
+            left = self._buffer_end - self._buffer_start
+            if left >= len(self._buffer):
+                raise OSError("A line of the response's head is too long")
+            
+            self._buffer_view[:left] = self._buffer_view[self._buffer_start:self._buffer_end]
+            self._buffer_start = 0
+            self._buffer_end = left
+            
+            count = self._socket.recv_into(self._buffer_view[left:], len(self._buffer) - left)
+            if count <= 0:
+                raise OSError("The connection was closed by the server")
+            self._buffer_end += count
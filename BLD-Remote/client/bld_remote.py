@@ -2,15 +2,340 @@
 import binascii
 import gc
 import json
+import struct
+import time
+from collections import OrderedDict
 
 import adafruit_requests
 
+# Only needed by the "zlib" encoding, CircuitPython's version can only decompress data.
+try:
+    import zlib
+except ImportError:
+    zlib = None
+
 
 # Constants
 BLD_MIN_SECTOR_SIZE = 512
 
+# Encodings that can be used to transfer sectors, the server lists the ones it supports in "/info/".
+BLD_ENCODING_BASE64 = "base64"
+BLD_ENCODING_RAW = "raw"
+BLD_ENCODING_ZLIB = "zlib"
+
+# Types of the records used by the "zlib" encoding, each sector is sent as one of them.
+SECTOR_RECORD_ZERO = 0  # Only the type, the sector only contains zeros.
+SECTOR_RECORD_RAW = 1  # The type and the sector as-is.
+SECTOR_RECORD_ZLIB = 2  # The type, the length of the compressed sector as a little-endian uint16, and its data.
+SECTOR_RECORD_UNCHANGED = 3  # Only the type, the sector didn't change since it was put in the flash cache.
+
+# Header of the flash cache's file: Magic, sector size, slot count.
+FLASH_CACHE_MAGIC = b"BLDC"
+FLASH_CACHE_HEADER_FORMAT = "<4sII"
+
+# Entries of the flash cache's index: Sector index + 1 or 0 if the slot is empty, CRC32 of the sector.
+FLASH_CACHE_ENTRY_FORMAT = "<II"
+FLASH_CACHE_ENTRY_SIZE = 8
+
+# Maximum number of sector ranges that can be sent in a single request to the "/batch/" route.
+BLD_MAX_BATCH_RANGES = 64
+
 
 # Code
+class SectorCache:
+    # Bounded LRU cache that holds copies of individual sectors.
+    
+    sector_size: int
+    max_sectors: int
+    
+    hits: int
+    misses: int
+    
+    def __init__(self, size: int, sector_size: int):
+        self.sector_size = sector_size
+        self.max_sectors = size // sector_size
+        self.hits = 0
+        self.misses = 0
+        
+        # Sector index => Sector data, ordered from least to most recently used.
+        self._sectors = OrderedDict()
+    
+    def __contains__(self, sector: int) -> bool:
+        return sector in self._sectors
+    
+    def __len__(self) -> int:
+        return len(self._sectors)
+    
+    def get(self, sector: int) -> bytes:
+        """
+        Returns a cached sector and marks it as the most recently used one.
+        :param sector: Index of the sector
+        :return: The sector's data, or None if it isn't cached
+        """
+        data = self._sectors.pop(sector, None)
+        
+        if data is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self._sectors[sector] = data
+        return data
+    
+    def put(self, sector: int, data) -> None:
+        """
+        Stores a copy of a sector, evicting the least recently used ones if the cache is full.
+        :param sector: Index of the sector
+        :param data: Buffer containing exactly one sector
+        :return: None
+        """
+        if self.max_sectors <= 0:
+            return
+        
+        self._sectors.pop(sector, None)
+        
+        while len(self._sectors) >= self.max_sectors:
+            del self._sectors[next(iter(self._sectors))]
+        
+        self._sectors[sector] = bytes(data)
+    
+    def invalidate(self, start_sector: int, sector_count: int) -> None:
+        """
+        Drops any cached copy of the given sectors.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors to drop
+        :return: None
+        """
+        for sector in range(start_sector, start_sector + sector_count):
+            self._sectors.pop(sector, None)
+    
+    def clear(self) -> None:
+        """
+        Drops every cached sector.  (The counters are kept as-is)
+        :return: None
+        """
+        self._sectors = OrderedDict()
+
+
+class ReadAheadBuffer:
+    # Staging buffer that holds the sectors grabbed past the end of sequential reads, and the size of the window of
+    #  sectors to grab, which grows while the reads stay sequential and shrinks on random accesses.
+    
+    sector_size: int
+    max_sectors: int
+    
+    # Number of sectors to grab past the end of the next sequential read.
+    window: int
+    
+    # Number of sectors that were grabbed ahead of time, and how many of them were read afterward.
+    fetched: int
+    hits: int
+    
+    def __init__(self, size: int, sector_size: int):
+        self.sector_size = sector_size
+        self.max_sectors = size // sector_size
+        self.window = 1
+        self.fetched = 0
+        self.hits = 0
+        
+        # Allocated once so that reading ahead doesn't fragment the heap.
+        self._buffer = bytearray(self.max_sectors * sector_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._count = 0
+        
+        # Whether each staged sector was read, so that sectors read many times are only counted once.
+        self._read = bytearray(self.max_sectors)
+    
+    def __contains__(self, sector: int) -> bool:
+        return self._start <= sector < self._start + self._count
+    
+    def get(self, sector: int) -> memoryview:
+        """
+        Returns a staged sector.
+        :param sector: Index of the sector, it must be staged
+        :return: View of the sector's data, only valid until the next call to `stage`
+        """
+        if not self._read[sector - self._start]:
+            self._read[sector - self._start] = 1
+            self.hits += 1
+        
+        offset = (sector - self._start) * self.sector_size
+        return self._view[offset:offset + self.sector_size]
+    
+    def stage(self, start_sector: int, sector_count: int) -> memoryview:
+        """
+        Drops the staged sectors and returns the buffer in which the given ones need to be grabbed.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors, at most `max_sectors`
+        :return: View of the buffer to fill
+        """
+        self._start = start_sector
+        self._count = sector_count
+        self.fetched += sector_count
+        
+        for i in range(sector_count):
+            self._read[i] = 0
+        
+        return self._view[:sector_count * self.sector_size]
+    
+    def invalidate(self, start_sector: int, sector_count: int) -> None:
+        """
+        Drops the staged sectors if any of them is in the given range.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: None
+        """
+        if start_sector < self._start + self._count and self._start < start_sector + sector_count:
+            self._count = 0
+    
+    def grow(self) -> None:
+        # Doubling the window after each sequential read that had to grab sectors.
+        self.window = min(self.window * 2, self.max_sectors)
+    
+    def shrink(self) -> None:
+        # Halving it after each random access.
+        self.window = max(self.window // 2, 1)
+    
+    def hit_rate(self) -> float:
+        """
+        Returns the share of sectors grabbed ahead of time that were actually read.
+        :return: Number between 0 and 1
+        """
+        if self.fetched == 0:
+            return 0.0
+        return self.hits / self.fetched
+
+
+class FlashSectorCache:
+    # Direct-mapped cache that keeps sectors in a file on the MCU's flash so that they survive reboots.
+    # Each sector is kept with its CRC32, which the server uses to tell whether the sector changed since then.
+    
+    # The file starts with a header, followed by the index entry of each slot and by the slots, in which a sector can
+    #  only be put in the slot given by its index modulo the number of slots.
+    
+    path: str
+    
+    sector_size: int
+    slot_count: int
+    
+    # Number of sectors that the server didn't need to send, and that it had to send.
+    hits: int
+    misses: int
+    
+    def __init__(self, path: str, size: int, sector_size: int):
+        self.path = path
+        self.sector_size = sector_size
+        self.slot_count = size // sector_size
+        self.hits = 0
+        self.misses = 0
+        
+        header = struct.pack(FLASH_CACHE_HEADER_FORMAT, FLASH_CACHE_MAGIC, sector_size, self.slot_count)
+        self._data_offset = len(header) + self.slot_count * FLASH_CACHE_ENTRY_SIZE
+        
+        # The index is kept in memory and is written to the file whenever it changes.
+        self._index = bytearray(self.slot_count * FLASH_CACHE_ENTRY_SIZE)
+        
+        try:
+            self._file = open(path, "r+b")
+            if self._file.read(len(header)) == header and self._file.readinto(self._index) == len(self._index):
+                return
+            self._file.close()
+        except OSError:
+            pass
+        
+        # Creating a new file if it is missing or if it was made for a different sector size or cache size.
+        self._file = open(path, "w+b")
+        self._file.write(header)
+        self._index[:] = bytes(len(self._index))
+        self._file.write(self._index)
+        
+        empty_slot = bytes(sector_size)
+        for _ in range(self.slot_count):
+            self._file.write(empty_slot)
+        self._file.flush()
+    
+    def lookup(self, sector: int) -> int:
+        """
+        Returns the CRC32 of a sector if it is in the cache.
+        :param sector: Index of the sector
+        :return: The sector's CRC32, or None if it isn't in the cache
+        """
+        if self.slot_count <= 0:
+            return None
+        
+        entry_sector, crc = struct.unpack_from(
+            FLASH_CACHE_ENTRY_FORMAT, self._index, (sector % self.slot_count) * FLASH_CACHE_ENTRY_SIZE)
+        
+        if entry_sector != sector + 1:
+            return None
+        return crc
+    
+    def read(self, sector: int, buf) -> None:
+        """
+        Reads a sector from the cache.
+        :param sector: Index of the sector, it must be in the cache
+        :param buf: Buffer of exactly one sector
+        :return: None
+        """
+        self._file.seek(self._data_offset + (sector % self.slot_count) * self.sector_size)
+        if self._file.readinto(buf) != self.sector_size:
+            raise OSError("Unable to read sector #{} from the flash cache !".format(sector))
+        self.hits += 1
+    
+    def put(self, sector: int, data, crc: int) -> None:
+        """
+        Stores a sector in the cache, replacing the one that was in its slot.
+        :param sector: Index of the sector
+        :param data: Buffer containing exactly one sector
+        :param crc: CRC32 of the sector
+        :return: None
+        """
+        self.misses += 1
+        if self.slot_count <= 0 or self.lookup(sector) == crc:
+            return
+        
+        # The slot is emptied while its data is written in case the MCU is reset midway.
+        self._write_entry(sector % self.slot_count, 0, 0)
+        
+        self._file.seek(self._data_offset + (sector % self.slot_count) * self.sector_size)
+        self._file.write(data)
+        
+        self._write_entry(sector % self.slot_count, sector + 1, crc)
+    
+    def invalidate(self, start_sector: int, sector_count: int) -> None:
+        """
+        Drops the given sectors from the cache.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors to drop
+        :return: None
+        """
+        for sector in range(start_sector, start_sector + sector_count):
+            if self.lookup(sector) is not None:
+                self._write_entry(sector % self.slot_count, 0, 0)
+    
+    def flush(self) -> None:
+        """
+        Makes sure the cache's file is written to the flash.
+        :return: None
+        """
+        self._file.flush()
+    
+    def close(self) -> None:
+        """
+        Flushes and closes the cache's file.
+        :return: None
+        """
+        self._file.close()
+    
+    def _write_entry(self, slot: int, entry_sector: int, crc: int) -> None:
+        offset = slot * FLASH_CACHE_ENTRY_SIZE
+        struct.pack_into(FLASH_CACHE_ENTRY_FORMAT, self._index, offset, entry_sector, crc)
+        
+        self._file.seek(struct.calcsize(FLASH_CACHE_HEADER_FORMAT) + offset)
+        self._file.write(self._index[offset:offset + FLASH_CACHE_ENTRY_SIZE])
+
+
 class RemoteBlockDevice:
     # BLD class that accesses sectors from a given remote host.
     
@@ -22,12 +347,87 @@ class RemoteBlockDevice:
     sector_count: int
     sector_size: int
     
-    def __init__(self, session, server_base_address: str, server_timeout: int, sector_count: int, sector_size: int):
+    # Read cache, its size is given in bytes and is disabled when it is set to 0.
+    cache: SectorCache
+    
+    # Sectors grabbed past the end of sequential reads, its size is given in bytes and is disabled when it is set to 0.
+    read_ahead: ReadAheadBuffer
+    
+    # Sectors kept in a file on the MCU's flash across reboots, None if disabled.
+    # The server only sends the ones that changed since, which requires the "zlib" encoding and its "hashes" feature.
+    flash_cache: FlashSectorCache
+    
+    # Amount of written bytes that can be held before being sent to the server, 0 sends them right away.
+    write_back_size: int
+    
+    # Maximum number of seconds written sectors can be held for, 0 only sends them when needed.
+    write_back_delay: float
+    
+    # Encoding used to transfer sectors, "raw" avoids the Base64 overhead and "zlib" compresses the sectors if the
+    #  server supports them.
+    encoding: str
+    
+    # Whether the garbage collector should be run after each request or be left to CircuitPython.
+    collect_garbage: bool
+    
+    # Whether "sync" should also ask the server to flush the sectors to its disk.
+    server_sync: bool
+    
+    # Whether non-contiguous ranges of sectors can be read and written in a single request.
+    server_batch: bool
+    
+    # Transport used instead of the HTTP session to exchange the sectors, like a `bld_tcp.TcpTransport`, None if unused.
+    transport: object
+    
+    # Amount of bytes sent and received in the bodies of the sector requests.
+    bytes_sent: int
+    bytes_received: int
+    
+    def __init__(self, session, server_base_address: str, server_timeout: int, sector_count: int, sector_size: int,
+                 cache_size: int = 0, write_back_size: int = 0, write_back_delay: float = 0,
+                 encoding: str = BLD_ENCODING_BASE64, collect_garbage: bool = True, server_sync: bool = False,
+                 server_batch: bool = False, read_ahead_size: int = 0, flash_cache_path: str = None,
+                 flash_cache_size: int = 0, transport=None):
         self.session = session
         self.server_base_address = server_base_address
         self.server_timeout = server_timeout
         self.sector_count = sector_count
         self.sector_size = sector_size
+        self.cache = SectorCache(cache_size, sector_size)
+        self.read_ahead = ReadAheadBuffer(read_ahead_size, sector_size)
+        self.write_back_size = write_back_size
+        self.write_back_delay = write_back_delay
+        self.encoding = encoding
+        self.collect_garbage = collect_garbage
+        self.server_sync = server_sync
+        self.transport = transport
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        
+        if encoding == BLD_ENCODING_ZLIB and zlib is None:
+            raise OSError("The 'zlib' encoding requires the 'zlib' module !")
+        self._zero_sector = bytes(sector_size)
+        
+        # The transport sends many ranges one after the other without waiting, which is as good as a batch.
+        self.server_batch = server_batch or transport is not None
+        if transport is not None and encoding != BLD_ENCODING_RAW:
+            raise OSError("The transport only supports the 'raw' encoding !")
+        
+        self.flash_cache = None
+        if flash_cache_path is not None and flash_cache_size > 0:
+            if encoding != BLD_ENCODING_ZLIB:
+                raise OSError("The flash cache requires the 'zlib' encoding !")
+            self.flash_cache = FlashSectorCache(flash_cache_path, flash_cache_size, sector_size)
+        
+        # Sector index => Sector data that hasn't been sent yet.
+        self._dirty_sectors = {}
+        self._dirty_since = None
+        
+        # Responses of the writes that were sent but not checked yet, with their ranges and the sectors they held.
+        self._pending_sends = []
+        
+        # Sector that follows the last read, used to detect sequential reads.
+        self._next_read_sector = None
     
     def count(self) -> int:
         """
@@ -37,65 +437,581 @@ class RemoteBlockDevice:
         return self.sector_count
     
     def readblocks(self, start_block: int, buf: bytearray) -> None:
-        sector_count = int(len(buf) / BLD_MIN_SECTOR_SIZE)
+        self._check_write_back_delay()
+        
+        sector_count = len(buf) // self.sector_size
+        view = memoryview(buf)
+        
+        sequential = start_block == self._next_read_sector
+        self._next_read_sector = start_block + sector_count
+        if not sequential:
+            self.read_ahead.shrink()
+        
+        # Copying the pending writes, the staged and the cached sectors first, and finding the runs of sectors that
+        #  are missing.
+        missing_runs = []
+        for i in range(sector_count):
+            data = self._dirty_sectors.get(start_block + i)
+            
+            if data is None and (start_block + i) in self.read_ahead:
+                data = self.read_ahead.get(start_block + i)
+                self.cache.put(start_block + i, data)
+            elif data is None and (start_block + i) in self.cache:
+                data = self.cache.get(start_block + i)
+            
+            if data is not None:
+                view[i * self.sector_size:(i + 1) * self.sector_size] = data
+            elif missing_runs and missing_runs[-1][0] + missing_runs[-1][1] == start_block + i:
+                missing_runs[-1][1] += 1
+            else:
+                missing_runs.append([start_block + i, 1])
+        
+        if not missing_runs:
+            self._complete_sends()
+            return
+        
+        # Servers without batches get the smallest range that covers every missing sector in one request instead.
+        fetched_runs = missing_runs
+        if len(missing_runs) > 1 and not self.server_batch:
+            fetched_runs = [[missing_runs[0][0], missing_runs[-1][0] + missing_runs[-1][1] - missing_runs[0][0]]]
+        
+        ranges = list(fetched_runs)
+        bufs = [
+            view[(run_start - start_block) * self.sector_size:(run_start - start_block + run_count) * self.sector_size]
+            for run_start, run_count in fetched_runs
+        ]
+        
+        # Grabbing the sectors that follow sequential reads in the same request, up to the first one waiting to be
+        #  written since the server still holds its old data.
+        read_ahead_count = min(self.read_ahead.window, self.sector_count - self._next_read_sector)
+        for i in range(max(0, read_ahead_count)):
+            if (self._next_read_sector + i) in self._dirty_sectors:
+                read_ahead_count = i
+                break
+        if sequential and self.read_ahead.max_sectors > 0 and read_ahead_count > 0 and \
+                fetched_runs[-1][0] + fetched_runs[-1][1] == self._next_read_sector:
+            ranges.append([self._next_read_sector, read_ahead_count])
+            bufs.append(self.read_ahead.stage(self._next_read_sector, read_ahead_count))
+            self.read_ahead.grow()
+        
+        try:
+            self._fetch_ranges(ranges, bufs)
+        except OSError:
+            # The staged sectors can't be trusted if the request failed midway.
+            self.read_ahead.invalidate(0, self.sector_count)
+            raise
+        
+        # Writes that were sent before the read can be checked now that their responses were received.
+        self._complete_sends()
         
-        res = self.session.get("{}/data/?ssi={}&sc={}".format(
+        # A covering range also overwrote the sectors found between the missing runs, whose pending writes must be kept.
+        if fetched_runs is not missing_runs:
+            for sector in range(fetched_runs[0][0], fetched_runs[0][0] + fetched_runs[0][1]):
+                if sector in self._dirty_sectors:
+                    i = sector - start_block
+                    view[i * self.sector_size:(i + 1) * self.sector_size] = self._dirty_sectors[sector]
+        
+        # Only the sectors that were missing are counted and cached, the others were already handled above.
+        for run_start, run_count in missing_runs:
+            self.cache.misses += run_count
+            
+            for sector in range(run_start, run_start + run_count):
+                i = sector - start_block
+                self.cache.put(sector, view[i * self.sector_size:(i + 1) * self.sector_size])
+    
+    def prefetch(self, ranges: list) -> None:
+        """
+        Grabs the given ranges of sectors into the cache ahead of time, in a single request if the server supports
+         batches.
+        Sectors that are already cached or waiting to be written are skipped, and the cache's size is never exceeded.
+        :param ranges: List of (start sector, sector count) tuples
+        :return: None
+        """
+        missing_runs = []
+        missing_sectors = 0
+        
+        for start_sector, sector_count in ranges:
+            for sector in range(start_sector, start_sector + sector_count):
+                if missing_sectors >= self.cache.max_sectors:
+                    break
+                
+                if sector in self.cache or sector in self._dirty_sectors:
+                    continue
+                
+                if missing_runs and missing_runs[-1][0] + missing_runs[-1][1] == sector:
+                    missing_runs[-1][1] += 1
+                else:
+                    missing_runs.append([sector, 1])
+                missing_sectors += 1
+        
+        if not missing_runs:
+            self._complete_sends()
+            return
+        
+        buf = bytearray(missing_sectors * self.sector_size)
+        view = memoryview(buf)
+        
+        bufs = []
+        offset = 0
+        for _, run_count in missing_runs:
+            bufs.append(view[offset:offset + run_count * self.sector_size])
+            offset += run_count * self.sector_size
+        
+        self._fetch_ranges(missing_runs, bufs)
+        
+        offset = 0
+        for run_start, run_count in missing_runs:
+            for sector in range(run_start, run_start + run_count):
+                self.cache.put(sector, view[offset:offset + self.sector_size])
+                offset += self.sector_size
+        
+        del buf
+    
+    def bundle(self, paths: list) -> int:
+        """
+        Seeds the cache with the sectors needed to mount the FAT volume and read the given files, which the server's
+         "/bundle/" route finds by parsing the volume and sends in a single request.
+        Sectors that are waiting to be written are skipped, and the server never sends more than the cache can hold.
+        :param paths: Paths of the files relative to the root of the volume, like "code.py" and its imports
+        :return: Number of sectors that were put in the cache
+        :raises OSError: If the server couldn't make the bundle, like when the BLD doesn't hold a FAT volume yet
+        """
+        if self.cache.max_sectors <= 0 or self.transport is not None:
+            return 0
+        
+        # Only imported here so that the BLD can be used without the files of "FS-Common".
+        from url_quote import quote_path
+        
+        url = "{}/bundle/?f={}&max={}&enc={}".format(
             self.server_base_address,
-            start_block,
-            sector_count
-        ), timeout=self.server_timeout)
+            ",".join(quote_path(path.strip("/")) for path in paths),
+            self.cache.max_sectors,
+            self.encoding
+        )
+        res = self.session.get(url, timeout=self.server_timeout)
         
         if res.status_code != 200:
-            raise OSError("Unable to grab {} sector(s) starting from sector #{}".format(sector_count, start_block))
+            res.close()
+            raise OSError("Unable to grab the bundle of {} file(s) !  (HTTP {})".format(len(paths), res.status_code))
         
-        # Decoding the Base64-encoded sector data.
-        data = binascii.a2b_base64(res.content)
+        data = res.content
         res.close()
+        self.bytes_received += len(data)
         
-        # Some final safety check
-        if len(data) != len(buf):
-            res.close()
-            raise OSError("Requested {} byte(s) of data, got {} !".format(len(buf), len(data)))
+        # The body starts with the ranges of the sectors it holds, in the format of the "/batch/" route.
+        header_end = data.find(b"\n")
+        if header_end < 0:
+            raise OSError("Got a malformed bundle !")
         
-        # Copying the data into the return buffer.
-        for i in range(0, len(buf)):
-            buf[i] = data[i]
+        try:
+            ranges = [[int(value) for value in part.split(":")] for part in str(data[:header_end], "utf-8").split(",")
+                      if part]
+        except ValueError:
+            raise OSError("Got a malformed bundle !")
+        sectors = [sector for start_sector, sector_count in ranges
+                   for sector in range(start_sector, start_sector + sector_count)]
         
-        # Helping out the garbage collector  (Not really required)
-        del res
-        del data
-        gc.collect()
+        buf = bytearray(len(sectors) * self.sector_size)
+        body = memoryview(data)[header_end + 1:]
+        
+        if self.encoding == BLD_ENCODING_RAW:
+            received = min(len(body), len(buf))
+            buf[:received] = body[:received]
+            received = len(body)
+        elif self.encoding == BLD_ENCODING_ZLIB:
+            received = self._unpack_sectors(body, [buf], sectors)
+        else:
+            decoded = binascii.a2b_base64(body)
+            received = len(decoded)
+            if received == len(buf):
+                buf[:] = decoded
+            del decoded
+        del body, data
+        
+        if received != len(buf):
+            raise OSError("Requested {} byte(s) of data, got {} !".format(len(buf), received))
+        
+        view = memoryview(buf)
+        for i, sector in enumerate(sectors):
+            if sector not in self._dirty_sectors:
+                self.cache.put(sector, view[i * self.sector_size:(i + 1) * self.sector_size])
+        
+        del view, buf
+        if self.collect_garbage:
+            gc.collect()
+        
+        return len(sectors)
     
-    def writeblocks(self, start_block: int, buf: bytearray) -> None:
-        sector_count = int(len(buf) / BLD_MIN_SECTOR_SIZE)
-        data = binascii.b2a_base64(buf)
+    def _ranges_url(self, route: str, ranges: list) -> str:
+        # Single ranges use the "/data/" route so that servers without batches can still be used.
+        if len(ranges) == 1:
+            return "{}/data/?ssi={}&sc={}&enc={}".format(
+                self.server_base_address,
+                ranges[0][0],
+                ranges[0][1],
+                self.encoding
+            )
         
-        res = self.session.post("{}/data/?ssi={}&sc={}".format(
+        return "{}/{}/?r={}&enc={}".format(
             self.server_base_address,
-            start_block,
-            sector_count
-        ), data=data, timeout=self.server_timeout)
+            route,
+            ",".join("{}:{}".format(start_sector, sector_count) for start_sector, sector_count in ranges),
+            self.encoding
+        )
+    
+    def _fetch_ranges(self, ranges: list, bufs: list) -> None:
+        # Grabbing the given ranges of sectors into their respective buffers with as few requests as possible.
+        # Adjacent ranges are merged since their buffers can simply be filled one after the other.
+        merged_ranges = []
+        merged_bufs = []
+        for (start_sector, sector_count), buf in zip(ranges, bufs):
+            if merged_ranges and merged_ranges[-1][0] + merged_ranges[-1][1] == start_sector:
+                merged_ranges[-1][1] += sector_count
+                merged_bufs[-1].append(buf)
+            else:
+                merged_ranges.append([start_sector, sector_count])
+                merged_bufs.append([buf])
+        
+        batch_size = BLD_MAX_BATCH_RANGES if self.server_batch else 1
+        
+        for i in range(0, len(merged_ranges), batch_size):
+            self._fetch_blocks(merged_ranges[i:i + batch_size],
+                               [buf for range_bufs in merged_bufs[i:i + batch_size] for buf in range_bufs])
+    
+    def _fetch_blocks(self, ranges: list, bufs: list) -> None:
+        if self.transport is not None:
+            self.bytes_received += self.transport.read(ranges, bufs)
+            return
+        
+        url = self._ranges_url("batch", ranges)
+        
+        # Giving the CRC32 of the sectors in the flash cache so that the server only sends the ones that changed.
+        sectors = None
+        if self.flash_cache is not None:
+            sectors = [sector for start_sector, sector_count in ranges
+                       for sector in range(start_sector, start_sector + sector_count)]
+            known_hashes = [self.flash_cache.lookup(sector) for sector in sectors]
+            
+            if any(crc is not None for crc in known_hashes):
+                url += "&h=" + ",".join("" if crc is None else "{:x}".format(crc) for crc in known_hashes)
+            del known_hashes
+        
+        res = self.session.get(url, timeout=self.server_timeout)
         
         if res.status_code != 200:
             res.close()
-            raise OSError("Unable to write {} sector(s) starting from sector #{}".format(sector_count, start_block))
-        res.close()
+            raise OSError("Unable to grab {} range(s) of sectors starting from sector #{}".format(
+                len(ranges), ranges[0][0]))
+        
+        expected = sum(len(buf) for buf in bufs)
+        
+        if self.encoding == BLD_ENCODING_RAW:
+            # Reading the raw sector data straight into the return buffers.
+            received = 0
+            buf_index = 0
+            buf_offset = 0
+            for chunk in res.iter_content(chunk_size=self.sector_size):
+                if received + len(chunk) > expected:
+                    res.close()
+                    raise OSError("Requested {} byte(s) of data, got more !".format(expected))
+                
+                # Chunks can overlap the end of a buffer and the start of the next one.
+                chunk = memoryview(chunk)
+                chunk_offset = 0
+                while chunk_offset < len(chunk):
+                    size = min(len(bufs[buf_index]) - buf_offset, len(chunk) - chunk_offset)
+                    bufs[buf_index][buf_offset:buf_offset + size] = chunk[chunk_offset:chunk_offset + size]
+                    chunk_offset += size
+                    buf_offset += size
+                    
+                    if buf_offset == len(bufs[buf_index]):
+                        buf_index += 1
+                        buf_offset = 0
+                
+                received += len(chunk)
+            res.close()
+            self.bytes_received += received
+        elif self.encoding == BLD_ENCODING_ZLIB:
+            # Unpacking the sector records straight into the return buffers.
+            data = res.content
+            res.close()
+            
+            self.bytes_received += len(data)
+            received = self._unpack_sectors(data, bufs, sectors)
+            del data
+        else:
+            # Decoding the Base64-encoded sector data and copying it into the return buffers in one go.
+            data = res.content
+            res.close()
+            
+            self.bytes_received += len(data)
+            data = binascii.a2b_base64(data)
+            
+            received = len(data)
+            if received == expected:
+                view = memoryview(data)
+                offset = 0
+                for buf in bufs:
+                    buf[:] = view[offset:offset + len(buf)]
+                    offset += len(buf)
+                del view
+            del data
+        
+        # Some final safety check
+        if received != expected:
+            raise OSError("Requested {} byte(s) of data, got {} !".format(expected, received))
         
         # Helping out the garbage collector  (Not really required)
         del res
+        if self.collect_garbage:
+            gc.collect()
+    
+    def _unpack_sectors(self, data: bytes, bufs: list, sectors: list = None) -> int:
+        # Decoding the records of the "zlib" encoding into the given buffers, and returning the amount of bytes written.
+        # The index of each sector must be given if the flash cache is used.
+        view = memoryview(data)
+        received = 0
+        buf_index = 0
+        buf_offset = 0
+        offset = 0
+        
+        while offset < len(data):
+            if buf_index >= len(bufs):
+                raise OSError("Got more sectors than requested !")
+            
+            sector = memoryview(bufs[buf_index])[buf_offset:buf_offset + self.sector_size]
+            record_type = data[offset]
+            
+            if record_type == SECTOR_RECORD_ZERO:
+                sector[:] = self._zero_sector
+                offset += 1
+            elif record_type == SECTOR_RECORD_RAW and offset + 1 + self.sector_size <= len(data):
+                sector[:] = view[offset + 1:offset + 1 + self.sector_size]
+                offset += 1 + self.sector_size
+            elif record_type == SECTOR_RECORD_ZLIB and offset + 3 <= len(data):
+                compressed_size = data[offset + 1] | (data[offset + 2] << 8)
+                decompressed = zlib.decompress(view[offset + 3:offset + 3 + compressed_size])
+                
+                if len(decompressed) != self.sector_size:
+                    raise OSError("Got a compressed sector of {} byte(s) !".format(len(decompressed)))
+                
+                sector[:] = decompressed
+                offset += 3 + compressed_size
+                del decompressed
+            elif record_type == SECTOR_RECORD_UNCHANGED and self.flash_cache is not None:
+                self.flash_cache.read(sectors[received // self.sector_size], sector)
+                offset += 1
+            else:
+                raise OSError("Got a malformed sector record !  (Type: {})".format(record_type))
+            
+            # All-zero sectors are as small as the "unchanged" records, so they aren't worth writing to the flash.
+            if self.flash_cache is not None and record_type in (SECTOR_RECORD_RAW, SECTOR_RECORD_ZLIB):
+                self.flash_cache.put(sectors[received // self.sector_size], sector, binascii.crc32(sector))
+            
+            received += self.sector_size
+            buf_offset += self.sector_size
+            if buf_offset == len(bufs[buf_index]):
+                buf_index += 1
+                buf_offset = 0
+        
+        return received
+    
+    def _pack_sectors(self, buf: bytearray) -> bytearray:
+        # Encoding sectors as the records of the "zlib" encoding, they are only compressed when it makes them smaller
+        #  and if the 'zlib' module can compress data.
+        view = memoryview(buf)
+        records = bytearray()
+        
+        for offset in range(0, len(buf), self.sector_size):
+            sector = bytes(view[offset:offset + self.sector_size])
+            
+            if sector == self._zero_sector:
+                records.append(SECTOR_RECORD_ZERO)
+                continue
+            
+            compressed = zlib.compress(sector) if hasattr(zlib, "compress") else None
+            if compressed is not None and len(compressed) + 2 < self.sector_size:
+                records.append(SECTOR_RECORD_ZLIB)
+                records.append(len(compressed) & 0xFF)
+                records.append(len(compressed) >> 8)
+                records.extend(compressed)
+            else:
+                records.append(SECTOR_RECORD_RAW)
+                records.extend(sector)
+        
+        return records
+    
+    def writeblocks(self, start_block: int, buf: bytearray) -> None:
+        self._check_write_back_delay()
+        
+        sector_count = len(buf) // self.sector_size
+        
+        # Dropping the cached and staged copies before sending anything in case the request fails midway.
+        self.cache.invalidate(start_block, sector_count)
+        self.read_ahead.invalidate(start_block, sector_count)
+        if self.flash_cache is not None:
+            self.flash_cache.invalidate(start_block, sector_count)
+        
+        if self.write_back_size <= 0:
+            ranges = [(start_block, sector_count)]
+            self._pending_sends.append((self._send_blocks(ranges, buf), ranges, []))
+            self._complete_sends()
+            return
+        
+        # Keeping a copy of the sectors until they get flushed.
+        view = memoryview(buf)
+        for i in range(sector_count):
+            self._dirty_sectors[start_block + i] = bytes(view[i * self.sector_size:(i + 1) * self.sector_size])
+        
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        
+        if len(self._dirty_sectors) * self.sector_size >= self.write_back_size:
+            self.flush()
+        else:
+            self._complete_sends()
+    
+    def _send_blocks(self, ranges: list, buf: bytearray):
+        # Sends the given ranges of sectors and returns the response without checking it.  (See `_complete_sends`)
+        if self.transport is not None:
+            self.bytes_sent += len(buf)
+            return self.transport.write(ranges, buf)
+        
+        if self.encoding == BLD_ENCODING_RAW:
+            data = buf
+            headers = {"Content-Type": "application/octet-stream"}
+        elif self.encoding == BLD_ENCODING_ZLIB:
+            data = self._pack_sectors(buf)
+            headers = {"Content-Type": "application/octet-stream"}
+        else:
+            data = binascii.b2a_base64(buf)
+            headers = None
+        
+        res = self.session.post(self._ranges_url("batch", ranges), data=data, headers=headers,
+                                timeout=self.server_timeout)
+        self.bytes_sent += len(data)
+        
         del data
-        gc.collect()
+        return res
+    
+    def _complete_sends(self) -> None:
+        # Checking the responses of the writes that were sent, and forgetting the pending sectors the server received.
+        # Nothing is done when no write was sent, so that cache hits and buffered writes don't run the collector.
+        if not self._pending_sends:
+            return
+        
+        pending_sends = self._pending_sends
+        self._pending_sends = []
+        
+        error = None
+        for res, ranges, sent_sectors in pending_sends:
+            try:
+                status_code = res.status_code
+                res.close()
+            except OSError as err:
+                error = err
+                continue
+            
+            if status_code != 200:
+                error = OSError("Unable to write {} range(s) of sectors starting from sector #{}".format(
+                    len(ranges), ranges[0][0]))
+                continue
+            
+            # Only forgetting the sectors once the server has them, unless they were written again since then.
+            for sector, data in sent_sectors:
+                if self._dirty_sectors.get(sector) is data:
+                    del self._dirty_sectors[sector]
+        
+        if not self._dirty_sectors:
+            self._dirty_since = None
+        
+        # Helping out the garbage collector  (Not really required)
+        del pending_sends
+        if self.collect_garbage:
+            gc.collect()
+        
+        if error is not None:
+            raise error
+    
+    def _send_dirty_sectors(self) -> None:
+        # Sending the pending writes, without waiting for the server's responses if the session can pipeline them.
+        self._complete_sends()
+        
+        dirty_sectors = sorted(self._dirty_sectors)
+        batch_size = BLD_MAX_BATCH_RANGES if self.server_batch else 1
+        pipelining = self.transport is not None or getattr(self.session, "max_in_flight", 1) > 1
+        
+        run_start = 0
+        while run_start < len(dirty_sectors):
+            # Finding the runs of contiguous sectors that go into the current request.
+            ranges = []
+            run_end = run_start
+            while run_end < len(dirty_sectors) and len(ranges) < batch_size:
+                range_start = run_end
+                run_end += 1
+                while run_end < len(dirty_sectors) and dirty_sectors[run_end] == dirty_sectors[run_end - 1] + 1:
+                    run_end += 1
+                ranges.append((dirty_sectors[range_start], run_end - range_start))
+            
+            data = bytearray((run_end - run_start) * self.sector_size)
+            sent_sectors = []
+            for i in range(run_start, run_end):
+                offset = (i - run_start) * self.sector_size
+                sector_data = self._dirty_sectors[dirty_sectors[i]]
+                data[offset:offset + self.sector_size] = sector_data
+                sent_sectors.append((dirty_sectors[i], sector_data))
+            
+            self._pending_sends.append((self._send_blocks(ranges, data), ranges, sent_sectors))
+            if not pipelining:
+                self._complete_sends()
+            
+            del data
+            run_start = run_end
+    
+    def flush(self) -> None:
+        """
+        Sends all the pending writes to the server, merging adjacent sectors into a single range.
+        The ranges are sent together if the server supports batches, and one by one otherwise.
+        :return: None
+        """
+        self._send_dirty_sectors()
+        self._complete_sends()
+    
+    def _check_write_back_delay(self) -> None:
+        if self.write_back_delay > 0 and self._dirty_since is not None:
+            if time.monotonic() - self._dirty_since >= self.write_back_delay:
+                # The responses are checked after the next request if the session can pipeline them.
+                self._send_dirty_sectors()
     
     def deinit(self) -> None:
         """
         Disable the BLD permanently.
         :return: None
         """
-        pass
+        self.flush()
+        self.cache.clear()
+        self.read_ahead.invalidate(0, self.sector_count)
+        
+        if self.flash_cache is not None:
+            self.flash_cache.close()
+            self.flash_cache = None
     
     def sync(self) -> None:
         """
         Ensure all blocks written are actually committed to the device.
         :return: None
         """
-        pass
+        self.flush()
+        
+        if self.flash_cache is not None:
+            self.flash_cache.flush()
+        
+        if self.transport is not None:
+            self.transport.sync()
+        elif self.server_sync:
+            res = self.session.get("{}/sync/".format(self.server_base_address), timeout=self.server_timeout)
+            status_code = res.status_code
+            res.close()
+            
+            if status_code != 200:
+                raise OSError("Unable to make the server flush its sectors !  ({})".format(status_code))
@@ -0,0 +1,306 @@
+# Imports
+import struct
+
+
+# Constants
+# Header of the requests: Opcode, start sector, sector count, length of the payload that follows.
+BLDP_REQUEST_FORMAT = "<BxxxIII"
+BLDP_REQUEST_SIZE = 16
+
+# Header of the replies: Status, length of the payload that follows.
+BLDP_REPLY_FORMAT = "<BxxxI"
+BLDP_REPLY_SIZE = 8
+
+# Operations that can be requested.
+BLDP_OP_INFO = 0  # Replies with the sector size and count as two little-endian uint32.
+BLDP_OP_READ = 1  # Replies with the sectors.
+BLDP_OP_WRITE = 2  # The payload holds the sectors.
+BLDP_OP_SYNC = 3  # Makes the server flush the BLD to its disk.
+BLDP_OP_DEVICE = 4  # The payload holds the ID of the device whose BLD is used by the next requests.
+
+# Statuses of the replies, the payload holds an error message if it isn't OK.
+BLDP_STATUS_OK = 0
+BLDP_STATUS_INVALID = 1
+BLDP_STATUS_NOT_FOUND = 2
+BLDP_STATUS_ERROR = 3
+
+# HTTP-like status codes of each status, so that the replies can be checked like the responses of the HTTP sessions.
+BLDP_STATUS_CODES = {
+    BLDP_STATUS_OK: 200,
+    BLDP_STATUS_INVALID: 400,
+    BLDP_STATUS_NOT_FOUND: 404,
+    BLDP_STATUS_ERROR: 500,
+}
+
+
+# Code
+class TcpReply:
+    # Replies to the requests sent by a single call to `TcpTransport.write`, which are read when their status is needed.
+    
+    def __init__(self, transport, reply_count: int):
+        self._transport = transport
+        self._reply_count = reply_count
+        self._status_code = None
+        self._error = None
+    
+    @property
+    def status_code(self) -> int:
+        if self._status_code is None and self._error is None:
+            self._transport._read_pending(self)
+        
+        if self._error is not None:
+            raise self._error
+        return self._status_code
+    
+    def close(self) -> None:
+        pass
+
+
+class TcpTransport:
+    # Sends the BLD's requests over a compact binary protocol instead of HTTP, see "main_tcp.py" on the server's side.
+    # Requests are sent right away and their replies are read when they are needed, which lets many requests be in
+    #  flight at the same time.
+    
+    host: str
+    port: int
+    timeout: float
+    
+    # ID of the device whose BLD is used, or None to use the server's main BLD.
+    device_id: str
+    
+    # Number of connections that were set up, and of requests that were sent.
+    setups: int
+    requests: int
+    
+    def __init__(self, pool, host: str, port: int, timeout: float = 10, device_id: str = None):
+        """
+        :param pool: A socketpool.SocketPool, or the "socket" module on CPython
+        :param host: Address of the server
+        :param port: Port of the server
+        :param timeout: Seconds after which a connection attempt or a read fails
+        :param device_id: ID of the device whose BLD is used, or None to use the server's main BLD
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.device_id = device_id
+        self.setups = 0
+        self.requests = 0
+        
+        self._pool = pool
+        self._socket = None
+        
+        # Replies to writes that weren't read yet, in the order their requests were sent.
+        self._pending = []
+        
+        self._header = bytearray(BLDP_REPLY_SIZE)
+    
+    def info(self) -> dict:
+        """
+        Returns the BLD's info in the same format as the "/info/" route of the HTTP server.
+        :return: Dict with the "sector_size" and "sector_count" fields
+        """
+        self._send(BLDP_OP_INFO, 0, 0)
+        sector_size, sector_count = struct.unpack("<II", self._read_reply(BLDP_OP_INFO))
+        return {"sector_size": sector_size, "sector_count": sector_count}
+    
+    def read(self, ranges: list, bufs: list) -> int:
+        """
+        Reads the given ranges of sectors into the given buffers, which are filled one after the other.
+        :param ranges: List of (start sector, sector count) tuples
+        :param bufs: Buffers whose total size matches the requested sectors
+        :return: Number of bytes received
+        """
+        # Reads can be sent again safely, which usually happens when the server closed an idle connection.
+        try:
+            return self._read_ranges(ranges, bufs)
+        except OSError:
+            return self._read_ranges(ranges, bufs)
+    
+    def write(self, ranges: list, buf) -> TcpReply:
+        """
+        Sends the given ranges of sectors, whose data follow each other in the given buffer.
+        :param ranges: List of (start sector, sector count) tuples
+        :param buf: Buffer holding the sectors
+        :return: Reply whose `status_code` is read when it is accessed
+        """
+        view = memoryview(buf)
+        offset = 0
+        sector_size = len(buf) // sum(sector_count for _, sector_count in ranges)
+        
+        for start_sector, sector_count in ranges:
+            size = sector_count * sector_size
+            self._send(BLDP_OP_WRITE, start_sector, sector_count, view[offset:offset + size])
+            offset += size
+        
+        reply = TcpReply(self, len(ranges))
+        self._pending.append(reply)
+        return reply
+    
+    def sync(self) -> None:
+        """
+        Asks the server to flush the BLD to its disk.
+        :return: None
+        """
+        self._send(BLDP_OP_SYNC, 0, 0)
+        self._read_reply(BLDP_OP_SYNC)
+    
+    def close(self) -> None:
+        """
+        Closes the connection, the replies that weren't read yet can't be used anymore.
+        :return: None
+        """
+        for reply in self._pending:
+            reply._error = OSError("The connection was closed before the reply was received")
+        self._pending = []
+        
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+    
+    def _connect(self) -> None:
+        address = self._pool.getaddrinfo(self.host, self.port)[0][4]
+        self._socket = self._pool.socket(self._pool.AF_INET, self._pool.SOCK_STREAM)
+        self._socket.settimeout(self.timeout)
+        
+        # The headers are sent apart from the sectors, which Nagle's algorithm would otherwise hold back until the
+        #  server acknowledges them.
+        if hasattr(self._pool, "TCP_NODELAY"):
+            self._socket.setsockopt(self._pool.IPPROTO_TCP, self._pool.TCP_NODELAY, 1)
+        
+        try:
+            self._socket.connect(address)
+            self.setups += 1
+            
+            if self.device_id is not None:
+                self._send(BLDP_OP_DEVICE, 0, 0, self.device_id.encode())
+                self._read_reply(BLDP_OP_DEVICE)
+        except OSError:
+            self.close()
+            raise
+    
+    def _send(self, opcode: int, start_sector: int, sector_count: int, payload=None) -> None:
+        if self._socket is None:
+            self._connect()
+        
+        try:
+            self._send_all(struct.pack(BLDP_REQUEST_FORMAT, opcode, start_sector, sector_count,
+                                       0 if payload is None else len(payload)))
+            if payload is not None:
+                self._send_all(payload)
+        except OSError:
+            self.close()
+            raise
+        
+        self.requests += 1
+    
+    def _send_all(self, data) -> None:
+        view = memoryview(data)
+        sent = 0
+        while sent < len(view):
+            count = self._socket.send(view[sent:])
+            if count is None or count <= 0:
+                raise OSError("Unable to send the request")
+            sent += count
+    
+    def _read_ranges(self, ranges: list, bufs: list) -> int:
+        for start_sector, sector_count in ranges:
+            self._send(BLDP_OP_READ, start_sector, sector_count)
+        
+        self._read_pending(None)
+        
+        buf_index = 0
+        buf_offset = 0
+        received = 0
+        try:
+            for _ in ranges:
+                size = self._read_reply_header(BLDP_OP_READ)
+                
+                # Receiving the sectors straight into the buffers.
+                while size > 0:
+                    if buf_index >= len(bufs):
+                        raise OSError("Got more sectors than requested !")
+                    
+                    view = memoryview(bufs[buf_index])[buf_offset:]
+                    count = self._socket.recv_into(view, min(size, len(view)))
+                    if count <= 0:
+                        raise OSError("The connection was closed by the server")
+                    
+                    size -= count
+                    received += count
+                    buf_offset += count
+                    if buf_offset == len(bufs[buf_index]):
+                        buf_index += 1
+                        buf_offset = 0
+        except OSError:
+            self.close()
+            raise
+        
+        return received
+    
+    def _read_pending(self, until: TcpReply) -> None:
+        # Reading the replies to the writes, in order, until the given one or all of them if None is given.
+        while self._pending:
+            reply = self._pending.pop(0)
+            
+            try:
+                status_code = 200
+                for _ in range(reply._reply_count):
+                    status, size = self._read_status()
+                    self._receive(size)
+                    if status != BLDP_STATUS_OK:
+                        status_code = BLDP_STATUS_CODES.get(status, 500)
+                reply._status_code = status_code
+            except OSError as err:
+                reply._error = err
+                self.close()
+            
+            if reply is until:
+                return
+    
+    def _read_status(self) -> tuple:
+        if self._socket is None:
+            raise OSError("The connection was lost while receiving the replies")
+        
+        view = memoryview(self._header)
+        received = 0
+        while received < BLDP_REPLY_SIZE:
+            count = self._socket.recv_into(view[received:], BLDP_REPLY_SIZE - received)
+            if count <= 0:
+                raise OSError("The connection was closed by the server")
+            received += count
+        
+        return struct.unpack(BLDP_REPLY_FORMAT, self._header)
+    
+    def _read_reply_header(self, opcode: int) -> int:
+        # Returns the size of the payload of a successful reply, or raises an error with the server's message.
+        status, size = self._read_status()
+        
+        if status != BLDP_STATUS_OK:
+            message = bytes(self._receive(size)).decode()
+            raise OSError("The server refused the request #{}: {}  ({})".format(opcode, message, status))
+        
+        return size
+    
+    def _read_reply(self, opcode: int) -> bytearray:
+        self._read_pending(None)
+        
+        try:
+            return self._receive(self._read_reply_header(opcode))
+        except OSError:
+            self.close()
+            raise
+    
+    def _receive(self, size: int) -> bytearray:
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = self._socket.recv_into(view[received:], size - received)
+            if count <= 0:
+                raise OSError("The connection was closed by the server")
+            received += count
+        return data
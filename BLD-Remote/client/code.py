@@ -43,9 +43,12 @@ import os
 import random
 import socketpool
 import storage
+import time
 import wifi
 
+import bld_connection
 import bld_remote
+import bld_tcp
 from secrets import secrets
 
 
@@ -59,6 +62,60 @@ WIFI_PASS = secrets["password"]
 
 SERVER_TIMEOUT = 10
 SERVER_BASE_ADDRESS = "http://{}:{}".format(secrets["server_host"], secrets["server_port"])
+if secrets.get("device_id"):
+    SERVER_BASE_ADDRESS = "{}/dev/{}".format(SERVER_BASE_ADDRESS, secrets["device_id"])
+
+# Size of the sector cache in bytes, set it to 0 to disable it.
+BLD_CACHE_SIZE = 16 * 512  # 8 KiB
+
+# Maximum amount of bytes grabbed past the end of sequential reads, set it to 0 to disable it.
+BLD_READ_AHEAD_SIZE = 8 * 512  # 4 KiB
+
+# Amount of written bytes that can be held before sending them, and for how many seconds, set them to 0 to disable it.
+BLD_WRITE_BACK_SIZE = 32 * 512  # 16 KiB
+BLD_WRITE_BACK_DELAY = 5
+
+# File on the MCU's flash in which sectors are kept across reboots, and its size, set it to None to disable it.
+# The server then only sends the sectors that changed, but CIRCUITPY must be writable from the code.  (See the readme)
+BLD_FLASH_CACHE_PATH = "/bld_cache.bin"
+BLD_FLASH_CACHE_SIZE = 64 * 512  # 32 KiB
+
+# Whether the sectors should be compressed if the server and firmware support it, all-zero sectors are always skipped.
+BLD_COMPRESS = True
+
+# Whether the BLD should use its own connection that is kept alive and reconnects by itself instead of the one of
+#  adafruit_requests, and how many requests it can send before reading their responses.
+BLD_MANAGED_CONNECTION = True
+BLD_MAX_IN_FLIGHT = 4
+
+# Port of the server's binary protocol used instead of HTTP, None to use HTTP.  (See "server/main_tcp.py")
+BLD_TCP_PORT = secrets.get("server_tcp_port")
+
+# Whether the garbage collector should be run after each request, it makes each request noticeably slower.
+BLD_COLLECT_GARBAGE = False
+
+# Number of sectors grabbed into the cache before mounting the file system.
+BLD_PREFETCH_SECTORS = 8
+
+# Files whose sectors are grabbed along with the ones needed to mount the file system, if the server can find them.
+# (Requires "FS-Common/url_quote.py" if the server lists the "bundle" feature)
+BLD_BUNDLE_FILES = ["test.py"]
+
+# Whether the accesses of the file system should be recorded and printed at the end, in order to replay them with
+#  "Harness/harness.py".  (Requires "Harness/bld_trace.py")
+BLD_TRACE = False
+
+# Whether the calls made to the BLD while importing the test module should be counted, printed and sent to the server's
+#  "/stats/" route.  (Requires "Harness/instrumentation.py")
+BLD_INSTRUMENT = False
+
+# Whether the file system should answer the lookups of the modules that aren't on it without reading any sector once it
+#  is at the front of `sys.path`.  (Requires "FS-Common/negative_cache.py" and "FS-Common/path_cache.py")
+NEGATIVE_CACHE = False
+
+# Modules installed in "/lib" that are imported once the file system is at the front of `sys.path`, in order to measure
+#  the time spent looking for them on it with and without `NEGATIVE_CACHE`.
+LIBRARY_MODULES = []
 
 
 # Code
@@ -77,54 +134,143 @@ except:
 
 print("Preparing the socketpool and session for the BLD...")
 pool = socketpool.SocketPool(wifi.radio)
-session = adafruit_requests.Session(pool)
+transport = None
+if BLD_TCP_PORT is not None:
+    session = None
+    transport = bld_tcp.TcpTransport(pool, secrets["server_host"], BLD_TCP_PORT, SERVER_TIMEOUT,
+                                     secrets.get("device_id"))
+elif BLD_MANAGED_CONNECTION:
+    session = bld_connection.ManagedSession(pool, secrets["server_host"], secrets["server_port"], SERVER_TIMEOUT,
+                                            BLD_MAX_IN_FLIGHT)
+else:
+    session = adafruit_requests.Session(pool)
 
 
 # This step is required in order to instantiate a BLD class that reports having the same amount of sectors as
 #  the server has.
 print("Grabbing the BLD info from the remote server...")
-print("> GET: {}/info/".format(SERVER_BASE_ADDRESS))
-try:
-    res = session.get("{}/info/".format(SERVER_BASE_ADDRESS), timeout=SERVER_TIMEOUT)
-except:
-    print("> ERROR: Failed to get info !")
-    print("> If this issue persists on a windows-hosted server, try checking your firewall settings.")
-    sys.exit(7)
-
-if res.status_code != 200:
-    print("> ERROR: Got an unexpected status code !  ({})".format(res.status_code))
+if transport is not None:
+    print("> INFO: {}:{}".format(secrets["server_host"], BLD_TCP_PORT))
+    try:
+        bld_info = transport.info()
+    except OSError as err:
+        print("> ERROR: Failed to get info !  ({})".format(err))
+        sys.exit(7)
+    
+    # The binary protocol only sends raw sectors.
+    bld_info["encodings"] = [bld_remote.BLD_ENCODING_RAW]
+else:
+    print("> GET: {}/info/".format(SERVER_BASE_ADDRESS))
+    try:
+        res = session.get("{}/info/".format(SERVER_BASE_ADDRESS), timeout=SERVER_TIMEOUT)
+    except:
+        print("> ERROR: Failed to get info !")
+        print("> If this issue persists on a windows-hosted server, try checking your firewall settings.")
+        sys.exit(7)
+    
+    if res.status_code != 200:
+        print("> ERROR: Got an unexpected status code !  ({})".format(res.status_code))
+        res.close()
+        sys.exit(8)
+    
+    print("> Parsing JSON data...")
+    bld_info = json.loads(res.content)
     res.close()
-    sys.exit(8)
-
-print("> Parsing JSON data...")
-bld_info = json.loads(res.content)
-res.close()
 print("> {}".format(bld_info))
 
 
 print("Preparing the BLD class...")
+# Older servers don't list their encodings and only support Base64.
+if BLD_COMPRESS and bld_remote.zlib is not None and bld_remote.BLD_ENCODING_ZLIB in bld_info.get("encodings", []):
+    bld_encoding = bld_remote.BLD_ENCODING_ZLIB
+elif bld_remote.BLD_ENCODING_RAW in bld_info.get("encodings", []):
+    bld_encoding = bld_remote.BLD_ENCODING_RAW
+else:
+    bld_encoding = bld_remote.BLD_ENCODING_BASE64
+
+# The flash cache relies on the records of the "zlib" encoding to tell which sectors didn't change.
+bld_flash_cache_path = None
+if BLD_FLASH_CACHE_PATH is not None and bld_encoding == bld_remote.BLD_ENCODING_ZLIB and \
+        "hashes" in bld_info.get("features", []):
+    if storage.getmount("/").readonly:
+        print("> CIRCUITPY is read-only, the flash cache is disabled !")
+    else:
+        bld_flash_cache_path = BLD_FLASH_CACHE_PATH
+
 print("> Sector count: {}".format(bld_info["sector_count"]))
 print("> Sector size:  {}".format(bld_info["sector_size"]))
+print("> Encoding:     {}".format(bld_encoding))
+print("> Cache size:   {}".format(BLD_CACHE_SIZE))
+print("> Read-ahead:   {}".format(BLD_READ_AHEAD_SIZE))
+print("> Flash cache:  {}".format(bld_flash_cache_path))
+print("> Write-back:   {} bytes / {} seconds".format(BLD_WRITE_BACK_SIZE, BLD_WRITE_BACK_DELAY))
 bld = bld_remote.RemoteBlockDevice(
     session=session,
     server_base_address=SERVER_BASE_ADDRESS,
     server_timeout=SERVER_TIMEOUT,
     sector_count=bld_info["sector_count"],
     sector_size=bld_info["sector_size"],
+    cache_size=BLD_CACHE_SIZE,
+    read_ahead_size=BLD_READ_AHEAD_SIZE,
+    flash_cache_path=bld_flash_cache_path,
+    flash_cache_size=BLD_FLASH_CACHE_SIZE,
+    write_back_size=BLD_WRITE_BACK_SIZE,
+    write_back_delay=BLD_WRITE_BACK_DELAY,
+    encoding=bld_encoding,
+    collect_garbage=BLD_COLLECT_GARBAGE,
+    server_sync="sync" in bld_info.get("features", []),
+    server_batch="batch" in bld_info.get("features", []),
+    transport=transport,
 )
 
 
+bld_instrumentation = None
+if BLD_INSTRUMENT:
+    import instrumentation
+    bld_instrumentation = instrumentation.Instrumentation()
+    instrumentation.instrument(bld, bld_instrumentation)
+
+# The file system uses the BLD through the tracer when the accesses are recorded.
+fs_bld = bld
+bld_tracer = None
+if BLD_TRACE:
+    import bld_trace
+    fs_bld = bld_tracer = bld_trace.TracingBlockDevice(bld)
+
 print("Preparing the VfsFat...")
-fs = storage.VfsFat(bld)
+fs = storage.VfsFat(fs_bld)
 
 if FORMAT_BEFORE_MOUNT:
     print("> Doing a quick format of the file system using the builtin formatter.  (This may take a while !)")
-    fs.mkfs(bld)
+    start_time = time.monotonic()
+    fs.mkfs(fs_bld)
+    bld.sync()
+    print("> Done in {:.2f} seconds, {} bytes sent".format(time.monotonic() - start_time, bld.bytes_sent))
 else:
     print("> Skipping the formatting step.  (It needs to have been done at least ONCE before !)")
 
+# The boot sector and the start of the FAT are always read first, so they can be grabbed in one go.
+# Servers that can parse the FAT volume also send the directories and clusters of the bundled files in the same request.
+bundled_sectors = 0
+if "bundle" in bld_info.get("features", []):
+    print("> Grabbing the sectors of {} and of the volume's metadata...".format(BLD_BUNDLE_FILES))
+    try:
+        bundled_sectors = bld.bundle(BLD_BUNDLE_FILES)
+        print("> Got {} sectors".format(bundled_sectors))
+    except OSError as err:
+        print("> Unable to grab the bundle: {}".format(err))
+if bundled_sectors == 0:
+    print("> Prefetching the first {} sectors...".format(BLD_PREFETCH_SECTORS))
+    bld.prefetch([(0, BLD_PREFETCH_SECTORS)])
+
+# The VfsFat is mounted through the wrapper, which has to be given every lookup and write.
+mounted_fs = fs
+if NEGATIVE_CACHE:
+    import negative_cache
+    mounted_fs = negative_cache.NegativeLookupFileSystem(fs)
+
 print("> Mounting the file system at '{}' in RW mode...".format(MOUNTING_POINT))
-storage.mount(fs, MOUNTING_POINT, readonly=False)
+storage.mount(mounted_fs, MOUNTING_POINT, readonly=False)
 
 
 print("Checking if we can see it in the MCU's root folder:")
@@ -167,4 +313,67 @@ print("> New: {}".format(sys.path))
 
 
 print("Importing the 'test' module from '{}'".format(MOUNTING_POINT + "/test.py"))
+if bld_instrumentation is not None:
+    bld_instrumentation.reset()
+start_time = time.monotonic()
 import test
+print("> Done in {:.2f} seconds".format(time.monotonic() - start_time))
+
+if LIBRARY_MODULES:
+    print("Importing {} modules from '/lib' while the file system is at the front of 'sys.path'".format(
+        len(LIBRARY_MODULES)))
+    start_time = time.monotonic()
+    for module_name in LIBRARY_MODULES:
+        __import__(module_name)
+    print("> Done in {:.2f} seconds".format(time.monotonic() - start_time))
+
+if NEGATIVE_CACHE:
+    print("Negative cache statistics:")
+    print("> Hits:   {}".format(mounted_fs.hits))
+    print("> Misses: {}".format(mounted_fs.misses))
+
+
+print("Sending any pending write to the server...")
+bld.sync()
+print("> Done !")
+
+
+print("Sector cache statistics:")
+print("> Hits:   {}".format(bld.cache.hits))
+print("> Misses: {}".format(bld.cache.misses))
+
+print("Read-ahead statistics:")
+print("> Fetched:  {}".format(bld.read_ahead.fetched))
+print("> Hits:     {}".format(bld.read_ahead.hits))
+print("> Hit rate: {:.1f}%".format(bld.read_ahead.hit_rate() * 100))
+
+if bld.flash_cache is not None:
+    print("Flash cache statistics:")
+    print("> Unchanged: {}".format(bld.flash_cache.hits))
+    print("> Sent:      {}".format(bld.flash_cache.misses))
+
+print("Transfer statistics:  ({} encoding)".format(bld_encoding))
+print("> Sent:     {} bytes".format(bld.bytes_sent))
+print("> Received: {} bytes".format(bld.bytes_received))
+
+if transport is not None:
+    print("Connection statistics:")
+    print("> Requests: {}".format(transport.requests))
+    print("> Setups:   {}".format(transport.setups))
+elif BLD_MANAGED_CONNECTION:
+    print("Connection statistics:")
+    print("> Requests:          {}".format(session.requests))
+    print("> Setups:            {}".format(session.setups))
+    print("> Setups per minute: {}".format(session.setups_per_minute()))
+
+if bld_tracer is not None:
+    print("Trace of the file system's accesses:")
+    bld_tracer.dump()
+
+if bld_instrumentation is not None:
+    print("Calls made to the BLD while importing the test module:")
+    bld_instrumentation.dump()
+    
+    if session is not None:
+        print("> Sending them to the server...")
+        bld_instrumentation.send(session, SERVER_BASE_ADDRESS, SERVER_TIMEOUT)
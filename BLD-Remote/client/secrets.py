@@ -2,5 +2,7 @@ secrets = {
     'ssid': "CHANGE-ME",
     'password': "CHANGE-ME.",
     'server_host': "IPV4 OF WHICH SERVER IS RUNNING",
-    'server_port': 8080
+    'server_port': 8080,
+    'server_tcp_port': None,  # Set it to use the binary protocol of "main_tcp.py" instead of HTTP.
+    'device_id': None  # Set it to use the BLD served on "/dev/<device_id>/" instead of the server's main one.
 }
@@ -0,0 +1,97 @@
+# Benchmark of the encodings that can be used to transfer sectors on the "/data/" and "/batch/" routes.
+# It compares the amount of bytes each one sends for a whole BLD and how long it takes to encode and decode it.
+
+# Imports
+import argparse
+import glob
+import os
+import random
+import time
+
+import bld_server
+
+
+# Constants
+SECTOR_SIZE = bld_server.BLD_MIN_SECTOR_SIZE
+SECTOR_COUNT = 2048  # 1 MiB
+REQUEST_SECTORS = 8
+
+
+# Code
+def build_sample_image(sector_count: int) -> bytearray:
+    # Rough imitation of a FAT volume that is a quarter full: a few metadata sectors, text files, some random data
+    #  standing in for already compressed files, and zeros everywhere else.
+    image = bytearray(sector_count * SECTOR_SIZE)
+    rng = random.Random(0)
+    
+    image[0:3] = b"\xEB\x3C\x90"
+    image[3:11] = b"MSDOS5.0"
+    image[510:512] = b"\x55\xAA"
+    image[SECTOR_SIZE:SECTOR_SIZE + 64] = bytes(rng.randrange(256) for _ in range(64))
+    
+    repository_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+    text = b"".join(
+        open(path, "rb").read() for path in sorted(glob.glob(os.path.join(repository_folder, "**", "*.py"),
+                                                             recursive=True))
+    )
+    
+    offset = 64 * SECTOR_SIZE
+    text_size = min(len(text), sector_count * SECTOR_SIZE // 5)
+    image[offset:offset + text_size] = text[:text_size]
+    
+    offset += text_size + SECTOR_SIZE
+    random_size = sector_count * SECTOR_SIZE // 20
+    image[offset:offset + random_size] = os.urandom(random_size)
+    
+    return image
+
+
+def bench_encoding(image: bytearray, encoding: str) -> None:
+    request_size = REQUEST_SECTORS * SECTOR_SIZE
+    
+    start = time.perf_counter()
+    bodies = [bld_server.encode_sectors(image[offset:offset + request_size], encoding)
+              for offset in range(0, len(image), request_size)]
+    encode_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    decoded = b"".join(bld_server.decode_sectors(body, encoding) for body in bodies)
+    decode_time = time.perf_counter() - start
+    
+    if decoded != image:
+        raise RuntimeError("The '{}' encoding didn't give back the same sectors !".format(encoding))
+    
+    sent = sum(len(body) for body in bodies)
+    print("> {:<8} {:>10} bytes  ({:>6.1f}%), encoded in {:>7.2f} ms, decoded in {:>7.2f} ms".format(
+        encoding, sent, sent / len(image) * 100, encode_time * 1000, decode_time * 1000))
+
+
+def count_uncompressed_records(image: bytearray) -> int:
+    # CircuitPython can't compress data, so the MCU only skips the all-zero sectors when it sends sectors.
+    zero_sector = bytes(SECTOR_SIZE)
+    size = 0
+    for offset in range(0, len(image), SECTOR_SIZE):
+        size += 1 if image[offset:offset + SECTOR_SIZE] == zero_sector else 1 + SECTOR_SIZE
+    return size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compares the size and speed of the sector encodings.")
+    parser.add_argument("--file", default=None,
+                        help="BLD file to use, a sample FAT-like BLD is generated if omitted.")
+    args = parser.parse_args()
+    
+    if args.file is not None:
+        with open(args.file, "rb") as f:
+            sample_image = bytearray(f.read())
+        sample_image = sample_image[:len(sample_image) - len(sample_image) % (REQUEST_SECTORS * SECTOR_SIZE)]
+    else:
+        sample_image = build_sample_image(SECTOR_COUNT)
+    
+    print("Encoding {} bytes in requests of {} sectors...".format(len(sample_image), REQUEST_SECTORS))
+    for sample_encoding in bld_server.BLD_ENCODINGS:
+        bench_encoding(sample_image, sample_encoding)
+    
+    uploaded = count_uncompressed_records(sample_image)
+    print("> {:<8} {:>10} bytes  ({:>6.1f}%), when sent by a MCU that can't compress".format(
+        bld_server.BLD_ENCODING_ZLIB, uploaded, uploaded / len(sample_image) * 100))
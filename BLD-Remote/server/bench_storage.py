@@ -0,0 +1,60 @@
+# Benchmark of the sector writes done by the server when it receives sectors on the "/data/" route.
+# It compares the per-byte copy loop that was used before the "storage" module to the store's bulk writes.
+
+# Imports
+import os
+import tempfile
+import time
+
+import storage
+
+
+# Constants
+SECTOR_SIZE = 512
+SECTOR_COUNT = 1024
+WRITE_SIZES = [1, 2, 4, 8, 16, 32, 64, 128]
+TOTAL_BYTES = 8 * 1024 * 1024
+
+
+# Code
+def print_result(name: str, sector_count: int, byte_count: int, elapsed: float) -> None:
+    print("> {:<14} {:>3} sector(s): {:>10.2f} MB/s".format(
+        name, sector_count, byte_count / max(elapsed, 0.000001) / 1000000))
+
+
+def bench_loop(data: bytearray, sector_count: int, iterations: int) -> None:
+    payload = os.urandom(sector_count * SECTOR_SIZE)
+    
+    start = time.perf_counter()
+    for iteration in range(iterations):
+        start_index = (iteration % (SECTOR_COUNT - sector_count + 1)) * SECTOR_SIZE
+        for i in range(0, len(payload)):
+            data[start_index + i] = payload[i]
+    print_result("Per-byte loop", sector_count, len(payload) * iterations, time.perf_counter() - start)
+
+
+def bench_store(store: storage.MemorySectorStore, sector_count: int, iterations: int) -> None:
+    payload = os.urandom(sector_count * SECTOR_SIZE)
+    
+    start = time.perf_counter()
+    for iteration in range(iterations):
+        store.write(iteration % (SECTOR_COUNT - sector_count + 1), sector_count, payload)
+    print_result("Store write", sector_count, len(payload) * iterations, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bld_file = os.path.join(temp_dir, "bld.bin")
+        with open(bld_file, "wb") as f:
+            f.write(b'\x00' * SECTOR_COUNT * SECTOR_SIZE)
+        
+        bench_store_instance = storage.MemorySectorStore(bld_file, SECTOR_SIZE)
+        bench_data = bytearray(SECTOR_COUNT * SECTOR_SIZE)
+        
+        print("Writing {} bytes in total for each write size...".format(TOTAL_BYTES))
+        for write_size in WRITE_SIZES:
+            write_iterations = TOTAL_BYTES // (write_size * SECTOR_SIZE)
+            
+            # The per-byte loop is way too slow to write the same amount of bytes.
+            bench_loop(bench_data, write_size, max(write_iterations // 64, 1))
+            bench_store(bench_store_instance, write_size, write_iterations)
@@ -0,0 +1,618 @@
+# Parts of the BLD server that are shared between its Flask and asyncio entry points.
+
+# Imports
+import argparse
+import atexit
+import base64
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+import fat
+import storage
+import volumes
+
+
+# Constants
+HOST = "0.0.0.0"
+PORT = 8080
+
+BLD_FILE = "./bld.bin"
+BLD_MIN_SECTOR_SIZE = 512
+BLD_SECTOR_COUNT = 512  # 512 * 512 B = 256 KiB
+
+# Storage backends that can be used to hold the sectors.
+BLD_STORE_MEMORY = "memory"  # Loaded in RAM, only saved when "/save/" is visited.
+BLD_STORE_MMAP = "mmap"  # Mapped from the file, persisted by the OS and flushed periodically and on "/sync/".
+BLD_STORE_SPARSE = "sparse"  # Only holds the written sectors, optionally on top of a read-only base BLD file.
+BLD_SYNC_INTERVAL = 5
+
+# Amount of memory the BLDs of the devices served on "/dev/<id>/" can use before the least recently used are closed.
+BLD_DEVICES_MEMORY_BUDGET = 256  # MiB
+
+# Encodings that can be used to transfer sectors on the "/data/" route, the first one is used by default.
+BLD_ENCODING_BASE64 = "base64"
+BLD_ENCODING_RAW = "raw"
+BLD_ENCODING_ZLIB = "zlib"  # Each sector is sent as a record that is either a marker, raw or compressed.
+BLD_ENCODINGS = [BLD_ENCODING_BASE64, BLD_ENCODING_RAW, BLD_ENCODING_ZLIB]
+
+# Types of the records used by the "zlib" encoding, each one is followed by the data described below.
+SECTOR_RECORD_ZERO = 0  # Nothing, the sector only contains zeros.
+SECTOR_RECORD_RAW = 1  # The sector as-is.
+SECTOR_RECORD_ZLIB = 2  # The length of the compressed sector as a little-endian uint16, and the compressed sector.
+SECTOR_RECORD_UNCHANGED = 3  # Nothing, the CRC32 the client gave for the sector in the "h" parameter is still valid.
+SECTOR_COMPRESSION_LEVEL = 6
+
+# Maximum number of sector ranges that can be read or written at once on the "/batch/" route.
+BLD_MAX_BATCH_RANGES = 64
+
+# Maximum number of sectors that can be sent at once on the "/bundle/" route.
+BLD_MAX_BUNDLE_SECTORS = 256  # 256 * 512 B = 128 KiB
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+PANEL_HTML = """
+    <!DOCTYPE html>
+    <html lang="en-US">
+    <head>
+    <meta charset="utf-8">
+    <title>BLD-RemoteJson Server Control Panel</title>
+    </head>
+    <body>
+    <h1>BLD-RemoteJson Server Control Panel</h1>
+    <h2>Actions</h2>
+    <ul>
+    <li><a href="/save">Save BLD to file.</a></li>
+    <li><a href="/sync">Flush BLD to file.</a></li>
+    <li><a href="/download">Download BLD to local machine.</a></li>
+    <li><a href="/info">Show BLD info in JSON format.</a></li>
+    </ul>
+    </body>
+    </html>
+    """
+
+SAVE_REPORT_HTML = """
+    <!DOCTYPE html>
+    <html lang="en-US">
+    <head>
+    <meta charset="utf-8">
+    <title>BLD-RemoteJson Server Control Panel</title>
+    </head>
+    <body>
+    <h1>BLD-RemoteJson Server Control Panel</h1>
+    <h2>Report</h2>
+    <p>The file was properly saved on the server's side.</p>
+    <ul><li><a href="/">Return to main panel.</a></li></ul>
+    </body>
+    </html>
+    """
+
+logger = logging.getLogger("bld")
+
+
+# Code
+class RequestError(Exception):
+    # Raised by the handlers when a request can't be fulfilled, it is sent back with the given HTTP status code.
+    
+    status: int
+    
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class BldServer:
+    # Stores that are served and the handlers that are called by the routes of each entry point.
+    
+    args: argparse.Namespace
+    
+    store: storage.MemorySectorStore  # Or any other store from the "storage" module.
+    base_store: storage.MappedSectorStore
+    volume_manager: volumes.VolumeManager
+    
+    # Last instrumentation report posted by each client, the main BLD's one uses an empty device ID.
+    client_stats: dict
+    
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.base_store = None
+        self.volume_manager = None
+        self.client_stats = {}
+        self._client_stats_lock = threading.Lock()
+        
+        if args.base is not None:
+            logger.info("Mapping the base BLD file '{}' in read-only mode...".format(args.base))
+            self.base_store = storage.MappedSectorStore(args.base, BLD_MIN_SECTOR_SIZE, readonly=True)
+            args.sector_count = self.base_store.sector_count
+            atexit.register(self.base_store.close)
+        
+        self.store = self.open_store(args.file)
+        atexit.register(self.store.close)
+        logger.info("> {} sectors of {} bytes".format(self.store.sector_count, self.store.sector_size))
+        
+        if args.devices is not None:
+            logger.info("Serving the BLD of each device from '{}'...".format(args.devices))
+            self.volume_manager = volumes.VolumeManager(
+                args.devices, self.open_store, args.devices_memory_budget * 1024 * 1024)
+            atexit.register(self.volume_manager.close_all)
+        
+        if args.store != BLD_STORE_MEMORY and args.sync_interval > 0:
+            threading.Thread(target=self.flush_periodically, daemon=True).start()
+    
+    def open_store(self, path: str) -> storage.MemorySectorStore:
+        # Opens a BLD file with the store given in the arguments, and creates it if needed.
+        logger.info("Checking if '{}' exists...".format(path))
+        if not os.path.exists(path):
+            logger.info("> Couldn't find it, creating a new one...")
+            
+            if self.args.store == BLD_STORE_SPARSE:
+                storage.create_sparse_image(path, self.args.sector_count, BLD_MIN_SECTOR_SIZE)
+            else:
+                storage.create_image(path, self.args.sector_count, BLD_MIN_SECTOR_SIZE)
+            
+            logger.info("> Created a new file with {} sectors of {} bytes amounting to {} bytes.".format(
+                self.args.sector_count, BLD_MIN_SECTOR_SIZE, self.args.sector_count * BLD_MIN_SECTOR_SIZE))
+        
+        if self.args.store == BLD_STORE_SPARSE:
+            logger.info("Opening the sparse BLD file...")
+            store = storage.SparseSectorStore(path, self.base_store)
+            logger.info("> {} sector(s) are allocated".format(store.allocated_sector_count()))
+        elif self.args.store == BLD_STORE_MMAP:
+            logger.info("Mapping the BLD file into memory...")
+            store = storage.MappedSectorStore(path, BLD_MIN_SECTOR_SIZE, self.args.sync_interval)
+        else:
+            logger.info("Loading the BLD file into memory...")
+            store = storage.MemorySectorStore(path, BLD_MIN_SECTOR_SIZE)
+        
+        return store
+    
+    def flush_periodically(self) -> None:
+        # Flushing the sectors even when the client stops writing for a while.
+        while True:
+            time.sleep(self.args.sync_interval)
+            self.store.flush()
+            
+            if self.volume_manager is not None:
+                self.volume_manager.flush_all()
+    
+    def with_device(self, device_id: str, handler, *handler_args):
+        # Calls the given handler with the device's BLD while making sure no other request can use it.
+        if self.volume_manager is None:
+            raise RequestError("Devices aren't enabled on this server", status=404)
+        
+        try:
+            volume = self.volume_manager.acquire(device_id)
+        except ValueError as err:
+            raise RequestError(str(err))
+        
+        try:
+            return handler(volume.store, *handler_args)
+        finally:
+            self.volume_manager.release(volume)
+    
+    def handle_stats(self, method: str, body: bytes, device_id: str = None) -> str:
+        """
+        Keeps the instrumentation report posted by a client, or returns all the reports, for the "/stats/" route.
+        :param method: HTTP method of the request
+        :param body: JSON-encoded report posted by the client  (See "Harness/instrumentation.py")
+        :param device_id: ID of the device that posted it, or None for the main BLD
+        :return: JSON-encoded reports of all the clients for GET requests, an empty string otherwise
+        :raises RequestError: If the report or the device ID is invalid
+        """
+        if method == "GET":
+            with self._client_stats_lock:
+                return json.dumps(self.client_stats)
+        
+        if device_id is not None and not volumes.DEVICE_ID_PATTERN.match(device_id):
+            raise RequestError("Invalid device ID")
+        
+        try:
+            report = json.loads(body)
+            methods = report["methods"]
+        except (ValueError, TypeError, KeyError):
+            raise RequestError("Invalid instrumentation report")
+        
+        report["received_time"] = int(time.time())
+        with self._client_stats_lock:
+            self.client_stats[device_id or ""] = report
+        
+        for method_stats in methods[:3]:
+            logger.info("Client {} spent {} us in {} call(s) of '{}'".format(
+                device_id or "main", method_stats[2], method_stats[1], method_stats[0]))
+        return ""
+    
+    def download_sparse(self) -> str:
+        """
+        Returns the path of the sparse BLD file if it can be sent as-is, after flushing it.
+        :return: Absolute path of the sparse BLD file, or None if the store isn't sparse
+        """
+        if self.args.store != BLD_STORE_SPARSE:
+            return None
+        
+        self.store.flush()
+        return os.path.abspath(self.args.file)
+
+
+def build_argument_parser(description: str, default_log_level: str,
+                          default_port: int = PORT) -> argparse.ArgumentParser:
+    """
+    Returns the parser of the arguments that are common to all entry points.
+    :param description: Description of the entry point
+    :param default_log_level: Log level used when none is given
+    :param default_port: Port used when none is given
+    :return: The argument parser
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default=HOST, help="Address to listen on.  (Default: {})".format(HOST))
+    parser.add_argument("--port", default=default_port, type=int,
+                        help="Port to listen on.  (Default: {})".format(default_port))
+    parser.add_argument("--file", default=BLD_FILE, help="Path of the BLD file.  (Default: {})".format(BLD_FILE))
+    parser.add_argument("--sector-count", default=BLD_SECTOR_COUNT, type=int,
+                        help="Number of sectors when creating a new BLD file.  (Default: {})".format(BLD_SECTOR_COUNT))
+    parser.add_argument("--store", default=BLD_STORE_MMAP,
+                        choices=[BLD_STORE_MMAP, BLD_STORE_MEMORY, BLD_STORE_SPARSE],
+                        help="How the sectors are held by the server.  (Default: {})".format(BLD_STORE_MMAP))
+    parser.add_argument("--base", default=None,
+                        help="Read-only BLD file used for the sectors that weren't written yet by a sparse store.")
+    parser.add_argument("--sync-interval", default=BLD_SYNC_INTERVAL, type=float,
+                        help="Seconds between each flush of the BLD file, 0 to disable.  (Default: {})".format(
+                            BLD_SYNC_INTERVAL))
+    parser.add_argument("--devices", default=None,
+                        help="Folder in which the BLD of each device served on '/dev/<id>/' is stored.  "
+                             "(Disabled by default)")
+    parser.add_argument("--devices-memory-budget", default=BLD_DEVICES_MEMORY_BUDGET, type=int,
+                        help="MiB the open BLDs of the devices can use before some are closed.  (Default: {})".format(
+                            BLD_DEVICES_MEMORY_BUDGET))
+    parser.add_argument("--log-level", default=default_log_level, choices=LOG_LEVELS,
+                        help="Use DEBUG to log every request and sector range.  (Default: {})".format(
+                            default_log_level))
+    return parser
+
+
+def parse_arguments(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    """
+    Parses and validates the arguments, and configures the logging.
+    :param parser: Parser returned by `build_argument_parser`
+    :return: The parsed arguments
+    """
+    args = parser.parse_args()
+    
+    if args.base is not None and args.store != BLD_STORE_SPARSE:
+        parser.error("A base BLD file can only be used with the '{}' store".format(BLD_STORE_SPARSE))
+    
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(message)s")
+    
+    # Flask's development server logs each request at the INFO level unless its logger was given a level.
+    logging.getLogger("werkzeug").setLevel(args.log_level)
+    return args
+
+
+def encode_sectors(data, encoding: str, known_hashes: list = None, hashes: list = None) -> bytes:
+    """
+    Encodes sectors for the body of a response.
+    :param data: Bytes-like object holding whole sectors
+    :param encoding: One of the encodings in `BLD_ENCODINGS`
+    :param known_hashes: CRC32 of the sectors the client already has, or None for the ones it doesn't have
+    :param hashes: Current CRC32 of the sectors, required if `known_hashes` is given
+    :return: Encoded sectors
+    """
+    if encoding == BLD_ENCODING_RAW:
+        return bytes(data)
+    
+    if encoding == BLD_ENCODING_BASE64:
+        return base64.b64encode(data)
+    
+    view = memoryview(data)
+    zero_sector = bytes(BLD_MIN_SECTOR_SIZE)
+    records = bytearray()
+    
+    for offset in range(0, len(view), BLD_MIN_SECTOR_SIZE):
+        sector = view[offset:offset + BLD_MIN_SECTOR_SIZE]
+        
+        if known_hashes is not None and known_hashes[offset // BLD_MIN_SECTOR_SIZE] == \
+                hashes[offset // BLD_MIN_SECTOR_SIZE]:
+            records.append(SECTOR_RECORD_UNCHANGED)
+            continue
+        
+        if sector == zero_sector:
+            records.append(SECTOR_RECORD_ZERO)
+            continue
+        
+        # Sectors that don't get smaller, like the ones that hold already compressed files, are sent as-is.
+        compressed = zlib.compress(sector, SECTOR_COMPRESSION_LEVEL)
+        if len(compressed) + 2 < BLD_MIN_SECTOR_SIZE:
+            records.append(SECTOR_RECORD_ZLIB)
+            records += struct.pack("<H", len(compressed))
+            records += compressed
+        else:
+            records.append(SECTOR_RECORD_RAW)
+            records += sector
+    
+    return bytes(records)
+
+
+def decode_sectors(body: bytes, encoding: str) -> bytes:
+    """
+    Decodes the sectors in the body of a request.
+    :param body: Body of the request
+    :param encoding: One of the encodings in `BLD_ENCODINGS`
+    :return: Decoded sectors
+    :raises RequestError: If the body is malformed
+    """
+    if encoding == BLD_ENCODING_RAW:
+        return body
+    
+    try:
+        if encoding == BLD_ENCODING_BASE64:
+            return base64.b64decode(body)
+        
+        zero_sector = bytes(BLD_MIN_SECTOR_SIZE)
+        data = bytearray()
+        offset = 0
+        
+        while offset < len(body):
+            record_type = body[offset]
+            offset += 1
+            
+            if record_type == SECTOR_RECORD_ZERO:
+                data += zero_sector
+            elif record_type == SECTOR_RECORD_RAW:
+                data += body[offset:offset + BLD_MIN_SECTOR_SIZE]
+                offset += BLD_MIN_SECTOR_SIZE
+            elif record_type == SECTOR_RECORD_ZLIB:
+                compressed_size = struct.unpack_from("<H", body, offset)[0]
+                data += zlib.decompress(body[offset + 2:offset + 2 + compressed_size])
+                offset += 2 + compressed_size
+            else:
+                raise ValueError("Unknown sector record type {}".format(record_type))
+        
+        return bytes(data)
+    except (ValueError, struct.error, zlib.error) as err:
+        logger.warning("Failed to decode the sectors: {}".format(err))
+        raise RequestError("Malformed body: {}".format(err))
+
+
+def parse_known_hashes(params: dict, encoding: str, sector_count: int) -> list:
+    """
+    Parses the "h" parameter in which clients give the CRC32 of the sectors they already have, as comma-separated
+     hexadecimal values that are left empty for the sectors they don't have.
+    :param params: Query parameters of the request
+    :param encoding: Encoding of the request, only "zlib" can tell that a sector is unchanged
+    :param sector_count: Number of requested sectors
+    :return: List of CRC32 or None for each sector, or None if the parameter wasn't given
+    :raises RequestError: If the parameter is invalid
+    """
+    if "h" not in params:
+        return None
+    
+    if encoding != BLD_ENCODING_ZLIB:
+        raise RequestError("The 'h' parameter can only be used with the '{}' encoding".format(BLD_ENCODING_ZLIB))
+    
+    try:
+        known_hashes = [int(value, 16) if value else None for value in params.get("h").split(",")]
+    except ValueError:
+        raise RequestError("Invalid 'h' parameter")
+    
+    if len(known_hashes) != sector_count:
+        raise RequestError("The 'h' parameter must have one value per requested sector")
+    
+    return known_hashes
+
+
+def handle_data(store, method: str, params: dict, body: bytes) -> bytes:
+    """
+    Reads or writes sectors for the "/data/" route.
+    :param store: Store of the BLD
+    :param method: HTTP method of the request, POST writes the sectors and anything else reads them
+    :param params: Query parameters of the request
+    :param body: Body of the request
+    :return: Body of the response
+    :raises RequestError: If the parameters or the body are invalid
+    """
+    # Grabbing and validating URL parameters.
+    try:
+        start_sector_index = int(params.get("ssi"))
+        sector_count = int(params.get("sc"))
+    except (TypeError, ValueError):
+        raise RequestError("Missing or invalid 'ssi' and 'sc' parameters")
+    encoding = params.get("enc", BLD_ENCODING_BASE64)
+    
+    if encoding not in BLD_ENCODINGS:
+        logger.warning("The user requested the unsupported '{}' encoding !".format(encoding))
+        raise RequestError("Unsupported encoding")
+    
+    try:
+        store.check_range(start_sector_index, sector_count)
+    except ValueError as err:
+        logger.warning("The user requested invalid sectors: {}".format(err))
+        raise RequestError(str(err))
+    
+    start_index = start_sector_index * BLD_MIN_SECTOR_SIZE
+    end_index = start_index + (sector_count * BLD_MIN_SECTOR_SIZE)
+    
+    # Checking which action needs to be taken.
+    if method == "POST":
+        logger.debug("User sent {} sector(s) starting from {}".format(sector_count, start_sector_index))
+        logger.debug("> Range: [{};{}[".format(start_index, end_index))
+        
+        data = decode_sectors(body, encoding)
+        
+        # Copying the data into memory, the store refuses any data that doesn't exactly cover the sectors.
+        try:
+            store.write(start_sector_index, sector_count, data)
+        except ValueError as err:
+            logger.warning("Refused the data: {}".format(err))
+            raise RequestError(str(err))
+        
+        return b""
+    
+    logger.debug("User requested {} sector(s) starting from {}".format(sector_count, start_sector_index))
+    logger.debug("> Range: [{};{}[".format(start_index, end_index))
+    
+    known_hashes = parse_known_hashes(params, encoding, sector_count)
+    if known_hashes is None:
+        return encode_sectors(store.read(start_sector_index, sector_count), encoding)
+    
+    return encode_sectors(store.read(start_sector_index, sector_count), encoding,
+                          known_hashes, store.sector_hashes(start_sector_index, sector_count))
+
+
+def handle_batch(store, method: str, params: dict, body: bytes) -> bytes:
+    """
+    Reads or writes several ranges of sectors at once for the "/batch/" route.
+    The ranges are given as "r=<ssi>:<sc>,<ssi>:<sc>,..." and their sectors are concatenated in the same order.
+    :param store: Store of the BLD
+    :param method: HTTP method of the request, POST writes the sectors and anything else reads them
+    :param params: Query parameters of the request
+    :param body: Body of the request
+    :return: Body of the response
+    :raises RequestError: If the parameters or the body are invalid
+    """
+    # Grabbing and validating URL parameters.
+    try:
+        ranges = [tuple(int(value) for value in part.split(":")) for part in params.get("r").split(",")]
+    except (AttributeError, ValueError):
+        raise RequestError("Missing or invalid 'r' parameter")
+    encoding = params.get("enc", BLD_ENCODING_BASE64)
+    
+    if encoding not in BLD_ENCODINGS:
+        logger.warning("The user requested the unsupported '{}' encoding !".format(encoding))
+        raise RequestError("Unsupported encoding")
+    
+    if len(ranges) > BLD_MAX_BATCH_RANGES:
+        raise RequestError("Too many ranges, at most {} can be given".format(BLD_MAX_BATCH_RANGES))
+    
+    # Checking every range before touching any sector so that invalid batches aren't partially written.
+    for sector_range in ranges:
+        if len(sector_range) != 2:
+            raise RequestError("Missing or invalid 'r' parameter")
+        
+        try:
+            store.check_range(*sector_range)
+        except ValueError as err:
+            logger.warning("The user requested invalid sectors: {}".format(err))
+            raise RequestError(str(err))
+    
+    total_size = sum(sector_count for _, sector_count in ranges) * BLD_MIN_SECTOR_SIZE
+    
+    if method == "POST":
+        logger.debug("User sent {} range(s) of sectors: {}".format(len(ranges), params.get("r")))
+        
+        data = decode_sectors(body, encoding)
+        
+        if len(data) != total_size:
+            logger.warning("Refused the data: expected {} byte(s), got {}".format(total_size, len(data)))
+            raise RequestError("Expected {} byte(s) of data, got {}".format(total_size, len(data)))
+        
+        view = memoryview(data)
+        offset = 0
+        try:
+            for start_sector_index, sector_count in ranges:
+                size = sector_count * BLD_MIN_SECTOR_SIZE
+                store.write(start_sector_index, sector_count, view[offset:offset + size])
+                offset += size
+        except ValueError as err:
+            logger.warning("Refused the data: {}".format(err))
+            raise RequestError(str(err))
+        
+        return b""
+    
+    logger.debug("User requested {} range(s) of sectors: {}".format(len(ranges), params.get("r")))
+    
+    known_hashes = parse_known_hashes(params, encoding, total_size // BLD_MIN_SECTOR_SIZE)
+    hashes = [] if known_hashes is not None else None
+    
+    data = bytearray(total_size)
+    offset = 0
+    for start_sector_index, sector_count in ranges:
+        size = sector_count * BLD_MIN_SECTOR_SIZE
+        data[offset:offset + size] = store.read(start_sector_index, sector_count)
+        offset += size
+        
+        if hashes is not None:
+            hashes += store.sector_hashes(start_sector_index, sector_count)
+    
+    return encode_sectors(data, encoding, known_hashes, hashes)
+
+
+def handle_bundle(store, params: dict) -> bytes:
+    """
+    Reads the sectors a client needs to mount the FAT volume of the BLD and read the given files for the "/bundle/"
+     route, which lets it boot from the BLD with a single request.
+    The files are given as "f=<path>,<path>,..." relative to the root of the volume, and the sectors are sent in the
+     order in which they are read, the boot sector, the root directory and the FAT sectors coming first.
+    The body starts with the ranges of the sectors as "<ssi>:<sc>,<ssi>:<sc>,...\n", like the "r" parameter of the
+     "/batch/" route, and is followed by the sectors in the same order.
+    :param store: Store of the BLD
+    :param params: Query parameters of the request, "max" being the number of sectors the client can keep
+    :return: Body of the response
+    :raises RequestError: If the parameters are invalid or if the BLD doesn't hold a FAT volume
+    """
+    paths = [path for path in params.get("f", "").split(",") if path]
+    try:
+        max_sectors = min(int(params.get("max", BLD_MAX_BUNDLE_SECTORS)), BLD_MAX_BUNDLE_SECTORS)
+    except ValueError:
+        raise RequestError("Invalid 'max' parameter")
+    encoding = params.get("enc", BLD_ENCODING_BASE64)
+    
+    if encoding not in BLD_ENCODINGS:
+        logger.warning("The user requested the unsupported '{}' encoding !".format(encoding))
+        raise RequestError("Unsupported encoding")
+    
+    # The client can write anything in its BLD, so a volume that can't be parsed only means it can't get a bundle.
+    try:
+        ranges = fat.FatVolume(store).bundle_ranges(paths, max_sectors)
+        data = bytearray()
+        for start_sector_index, sector_count in ranges:
+            data += store.read(start_sector_index, sector_count)
+    except (ValueError, struct.error) as err:
+        logger.warning("Unable to make a bundle: {}".format(err))
+        raise RequestError(str(err), status=409)
+    
+    logger.debug("User requested a bundle of {} file(s), sending {} sector(s)".format(
+        len(paths), len(data) // BLD_MIN_SECTOR_SIZE))
+    
+    header = ",".join("{}:{}".format(start_sector_index, sector_count) for start_sector_index, sector_count in ranges)
+    return (header + "\n").encode() + encode_sectors(data, encoding)
+
+
+def data_content_type(params: dict) -> str:
+    """
+    Returns the content type of the responses of the "/data/", "/batch/" and "/bundle/" routes.
+    :param params: Query parameters of the request
+    :return: The content type
+    """
+    if params.get("enc") in (BLD_ENCODING_RAW, BLD_ENCODING_ZLIB):
+        return "application/octet-stream"
+    return "text/plain"
+
+
+def handle_info(store) -> str:
+    """
+    Returns the BLD's info for the "/info/" route.
+    :param store: Store of the BLD
+    :return: JSON-encoded info
+    """
+    logger.debug("Sending BLD info...")
+    return json.dumps({
+        "sector_size": BLD_MIN_SECTOR_SIZE,
+        "sector_count": store.sector_count,
+        "encodings": BLD_ENCODINGS,
+        "features": ["sync", "batch", "hashes", "bundle"],
+        "server_time": int(time.time())
+    })
+
+
+def handle_sync(store) -> bytes:
+    """
+    Flushes the BLD for the "/sync/" route.
+    :param store: Store of the BLD
+    :return: Empty body
+    """
+    logger.debug("Flushing BLD...")
+    store.flush()
+    return b""
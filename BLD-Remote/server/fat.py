@@ -0,0 +1,420 @@
+# Parser of the FAT volume held in a BLD, which tells the server which sectors a client needs to read a given file.
+# It can also be run on a BLD file to print the sectors of the boot bundle of some files.
+
+# Imports
+import argparse
+import struct
+
+
+# Constants
+# Offsets and formats of the fields of the boot sector that are used.
+# Bytes per sector, sectors per cluster, reserved sectors, FAT count, root entries, 16-bit sector count, media and
+#  16-bit FAT size, which is 0 for FAT32 volumes.
+_BOOT_SECTOR_FORMAT = "<HBHBHHBH"
+_BOOT_SECTOR_OFFSET = 11
+_FAT32_FORMAT = "<IHHIH"  # 32-bit FAT size, flags, version, root cluster, FSInfo sector.
+_FAT32_OFFSET = 36
+_TOTAL_SECTORS_32_OFFSET = 32
+
+# Partition table of the MBR, which is used when the volume doesn't start at the first sector.
+_PARTITION_TABLE_OFFSET = 446
+_PARTITION_ENTRY_SIZE = 16
+_PARTITION_COUNT = 4
+_BOOT_SIGNATURE = b"\x55\xAA"
+
+# Volumes with fewer clusters than these are FAT12 and FAT16 volumes, as decided by the FAT specification.
+_FAT12_MAX_CLUSTERS = 4085
+_FAT16_MAX_CLUSTERS = 65525
+
+# Directory entries.
+_DIR_ENTRY_SIZE = 32
+_ATTR_VOLUME_ID = 0x08
+_ATTR_DIRECTORY = 0x10
+_ATTR_LONG_NAME = 0x0F
+_ENTRY_FREE = 0xE5
+_ENTRY_END = 0x00
+_LAST_LONG_ENTRY = 0x40
+
+# Flags set by Windows and FatFs in the short names that are entirely lowercase.
+_CASE_LOWER_BASE = 0x08
+_CASE_LOWER_EXTENSION = 0x10
+
+# Offsets of the 13 UTF-16 characters of each long name entry.
+_LONG_NAME_PARTS = [(1, 11), (14, 26), (28, 32)]
+
+
+# Code
+class FatEntry:
+    # File or folder found in a directory of the volume.
+    
+    name: str
+    short_name: str
+    attributes: int
+    first_cluster: int
+    size: int
+    
+    def __init__(self, name: str, short_name: str, attributes: int, first_cluster: int, size: int):
+        self.name = name
+        self.short_name = short_name
+        self.attributes = attributes
+        self.first_cluster = first_cluster
+        self.size = size
+    
+    @property
+    def is_folder(self) -> bool:
+        return bool(self.attributes & _ATTR_DIRECTORY)
+
+
+class FatVolume:
+    # FAT12, FAT16 or FAT32 volume held in the sectors of a store, either directly like the ones formatted by
+    #  CircuitPython's `VfsFat.mkfs`, or in the first partition of an MBR.
+    # Nothing is cached since the client can change any sector between two requests, so each call reads the sectors it
+    #  needs from the store again.
+    
+    # 12, 16 or 32.
+    fat_type: int
+    
+    # Sector of the store at which the volume starts, every other sector is relative to it.
+    partition_start: int
+    
+    sector_size: int
+    sectors_per_cluster: int
+    reserved_sectors: int
+    fat_count: int
+    fat_size: int
+    
+    # Fixed root directory of the FAT12 and FAT16 volumes, and first cluster of the root directory of FAT32 ones.
+    root_dir_start: int
+    root_dir_sectors: int
+    root_cluster: int
+    
+    # Sector of the FAT32 volumes' FSInfo structure, 0 if there is none.
+    fsinfo_sector: int
+    
+    data_start: int
+    cluster_count: int
+    
+    def __init__(self, store):
+        """
+        :param store: Store holding the sectors of the BLD, like a `storage.MemorySectorStore`
+        :raises ValueError: If the BLD doesn't hold a FAT volume that can be parsed
+        """
+        self.store = store
+        
+        self.partition_start = 0
+        boot_sector = bytes(store.read(0, 1))
+        if not self._is_boot_sector(boot_sector):
+            self.partition_start = self._find_partition(boot_sector)
+            boot_sector = bytes(store.read(self.partition_start, 1))
+            if not self._is_boot_sector(boot_sector):
+                raise ValueError("The BLD doesn't hold a FAT volume")
+        
+        (self.sector_size, self.sectors_per_cluster, self.reserved_sectors, self.fat_count, root_entries,
+         total_sectors, _, self.fat_size) = struct.unpack_from(_BOOT_SECTOR_FORMAT, boot_sector, _BOOT_SECTOR_OFFSET)
+        if self.sector_size != store.sector_size:
+            raise ValueError("The FAT volume uses {} bytes sectors instead of {}".format(
+                self.sector_size, store.sector_size))
+        
+        if total_sectors == 0:
+            total_sectors = struct.unpack_from("<I", boot_sector, _TOTAL_SECTORS_32_OFFSET)[0]
+        
+        self.root_cluster = 0
+        self.fsinfo_sector = 0
+        if self.fat_size == 0:
+            self.fat_size, _, _, self.root_cluster, self.fsinfo_sector = struct.unpack_from(
+                _FAT32_FORMAT, boot_sector, _FAT32_OFFSET)
+        
+        self.root_dir_start = self.reserved_sectors + self.fat_count * self.fat_size
+        self.root_dir_sectors = (root_entries * _DIR_ENTRY_SIZE + self.sector_size - 1) // self.sector_size
+        self.data_start = self.root_dir_start + self.root_dir_sectors
+        self.cluster_count = (total_sectors - self.data_start) // self.sectors_per_cluster
+        
+        if self.cluster_count < _FAT12_MAX_CLUSTERS:
+            self.fat_type = 12
+        elif self.cluster_count < _FAT16_MAX_CLUSTERS:
+            self.fat_type = 16
+        else:
+            self.fat_type = 32
+        
+        if (self.fat_type == 32) != (self.root_dir_sectors == 0):
+            raise ValueError("The FAT volume's root directory doesn't match its type")
+    
+    @staticmethod
+    def _is_boot_sector(sector: bytes) -> bool:
+        # Checking the jump instruction and the fields that must be set in any FAT volume.
+        if sector[0] not in (0xEB, 0xE9):
+            return False
+        
+        sector_size, sectors_per_cluster, reserved_sectors, fat_count = struct.unpack_from(
+            "<HBHB", sector, _BOOT_SECTOR_OFFSET)
+        return sector_size in (512, 1024, 2048, 4096) and sectors_per_cluster > 0 and \
+            sectors_per_cluster & (sectors_per_cluster - 1) == 0 and reserved_sectors > 0 and fat_count > 0
+    
+    @staticmethod
+    def _find_partition(sector: bytes) -> int:
+        """
+        Returns the first sector of the first partition listed in an MBR.
+        :param sector: First sector of the BLD
+        :return: Index of the partition's first sector
+        :raises ValueError: If the sector isn't an MBR or if it has no partition
+        """
+        if sector[510:512] != _BOOT_SIGNATURE:
+            raise ValueError("The BLD doesn't hold a FAT volume")
+        
+        for i in range(_PARTITION_COUNT):
+            offset = _PARTITION_TABLE_OFFSET + i * _PARTITION_ENTRY_SIZE
+            if sector[offset + 4] != 0:
+                return struct.unpack_from("<I", sector, offset + 8)[0]
+        
+        raise ValueError("The BLD's partition table is empty")
+    
+    def _fat_entry_sectors(self, cluster: int) -> list:
+        # Returns the sectors of the first FAT that hold the entry of a cluster, FAT12 entries can span two of them.
+        offset = cluster * self.fat_type // 8
+        first = self.reserved_sectors + offset // self.sector_size
+        last = self.reserved_sectors + (offset + (1 if self.fat_type == 12 else self.fat_type // 8 - 1)) // \
+            self.sector_size
+        return list(range(first, last + 1))
+    
+    def _next_cluster(self, cluster: int) -> int:
+        """
+        Reads the entry of a cluster in the first FAT.
+        :param cluster: Index of the cluster
+        :return: Index of the next cluster of the chain, or 0 if it is the last one
+        """
+        sectors = self._fat_entry_sectors(cluster)
+        data = bytes(self.store.read(self.partition_start + sectors[0], len(sectors)))
+        offset = cluster * self.fat_type // 8 % self.sector_size
+        
+        if self.fat_type == 12:
+            value = struct.unpack_from("<H", data, offset)[0]
+            value = value >> 4 if cluster & 1 else value & 0x0FFF
+            end = 0x0FF8
+        elif self.fat_type == 16:
+            value = struct.unpack_from("<H", data, offset)[0]
+            end = 0xFFF8
+        else:
+            value = struct.unpack_from("<I", data, offset)[0] & 0x0FFFFFFF
+            end = 0x0FFFFFF8
+        
+        return 0 if value >= end or not (2 <= value < self.cluster_count + 2) else value
+    
+    def cluster_chain(self, first_cluster: int) -> list:
+        """
+        Follows a chain of clusters in the first FAT.
+        Chains that loop or leave the volume are cut, since the client can write anything in the FAT.
+        :param first_cluster: First cluster of the chain, or 0 for an empty file
+        :return: List of the clusters
+        """
+        chain = []
+        cluster = first_cluster
+        while 2 <= cluster < self.cluster_count + 2 and len(chain) < self.cluster_count:
+            chain.append(cluster)
+            cluster = self._next_cluster(cluster)
+        return chain
+    
+    def chain_ranges(self, first_cluster: int) -> list:
+        """
+        Returns the sectors a client reads to follow a chain of clusters and read all of them.
+        :param first_cluster: First cluster of the chain, or 0 for an empty file
+        :return: List of [start sector, sector count] relative to the start of the BLD, the FAT sectors first
+        """
+        chain = self.cluster_chain(first_cluster)
+        
+        fat_sectors = []
+        for cluster in chain:
+            for sector in self._fat_entry_sectors(cluster):
+                if sector not in fat_sectors:
+                    fat_sectors.append(sector)
+        
+        return [[self.partition_start + sector, 1] for sector in fat_sectors] + self._cluster_ranges(chain)
+    
+    def _cluster_ranges(self, chain: list) -> list:
+        # Returns the sectors of the given clusters, relative to the start of the BLD.
+        return [[self.partition_start + self.data_start + (cluster - 2) * self.sectors_per_cluster,
+                 self.sectors_per_cluster] for cluster in chain]
+    
+    def _directory_data_ranges(self, first_cluster: int) -> list:
+        # Returns the sectors holding the entries of a directory, 0 being the root directory.
+        if first_cluster == 0 and self.fat_type != 32:
+            return [[self.partition_start + self.root_dir_start, self.root_dir_sectors]]
+        return self._cluster_ranges(self.cluster_chain(first_cluster or self.root_cluster))
+    
+    def directory_ranges(self, first_cluster: int) -> list:
+        """
+        Returns the sectors a client reads to list a directory.
+        :param first_cluster: First cluster of the directory, 0 for the root directory
+        :return: List of [start sector, sector count] relative to the start of the BLD
+        """
+        if first_cluster == 0 and self.fat_type != 32:
+            return self._directory_data_ranges(0)
+        return self.chain_ranges(first_cluster or self.root_cluster)
+    
+    def metadata_ranges(self) -> list:
+        """
+        Returns the sectors that are read when the volume is mounted, and the ones of its root directory.
+        :return: List of [start sector, sector count] relative to the start of the BLD
+        """
+        ranges = [[self.partition_start, 1]]
+        if self.fsinfo_sector not in (0, 0xFFFF):
+            ranges.append([self.partition_start + self.fsinfo_sector, 1])
+        return ranges + self.directory_ranges(0)
+    
+    def list_directory(self, first_cluster: int) -> list:
+        """
+        Lists the files and folders of a directory, "." and ".." excluded.
+        :param first_cluster: First cluster of the directory, 0 for the root directory
+        :return: List of `FatEntry`
+        """
+        entries = []
+        long_name_parts = {}
+        long_name_checksum = None
+        
+        for start_sector, sector_count in self._directory_data_ranges(first_cluster):
+            data = bytes(self.store.read(start_sector, sector_count))
+            for offset in range(0, len(data), _DIR_ENTRY_SIZE):
+                entry = data[offset:offset + _DIR_ENTRY_SIZE]
+                if entry[0] == _ENTRY_END:
+                    return entries
+                
+                if entry[0] == _ENTRY_FREE:
+                    long_name_parts = {}
+                    continue
+                
+                attributes = entry[11]
+                if attributes & 0x3F == _ATTR_LONG_NAME:
+                    # The parts of a long name come in reverse order before the short name they belong to.
+                    if entry[0] & _LAST_LONG_ENTRY:
+                        long_name_parts = {}
+                        long_name_checksum = entry[13]
+                    long_name_parts[entry[0] & 0x1F] = b"".join(entry[start:end] for start, end in _LONG_NAME_PARTS)
+                    continue
+                
+                if attributes & _ATTR_VOLUME_ID or entry[0] == ord("."):
+                    long_name_parts = {}
+                    continue
+                
+                short_name = self._short_name(entry)
+                name = short_name
+                if long_name_parts and long_name_checksum == self._checksum(entry[:11]):
+                    name = self._long_name(long_name_parts)
+                long_name_parts = {}
+                
+                first_cluster_high = struct.unpack_from("<H", entry, 20)[0] if self.fat_type == 32 else 0
+                entries.append(FatEntry(name, short_name, attributes,
+                                        (first_cluster_high << 16) | struct.unpack_from("<H", entry, 26)[0],
+                                        struct.unpack_from("<I", entry, 28)[0]))
+        
+        return entries
+    
+    @staticmethod
+    def _short_name(entry: bytes) -> str:
+        # Short names are padded with spaces, and their first byte is replaced by 0x05 when it is 0xE5.
+        base = (b"\xE5" + entry[1:8] if entry[0] == 0x05 else entry[:8]).rstrip(b" ").decode("cp437")
+        extension = entry[8:11].rstrip(b" ").decode("cp437")
+        
+        if entry[12] & _CASE_LOWER_BASE:
+            base = base.lower()
+        if entry[12] & _CASE_LOWER_EXTENSION:
+            extension = extension.lower()
+        return base + "." + extension if extension else base
+    
+    @staticmethod
+    def _long_name(parts: dict) -> str:
+        # The UTF-16 characters end with a null one when the name doesn't fill its last entry, which is then padded.
+        name = "".join(parts[index].decode("utf-16-le", "replace") for index in sorted(parts))
+        end = name.find("\0")
+        return name if end < 0 else name[:end]
+    
+    @staticmethod
+    def _checksum(short_name: bytes) -> int:
+        checksum = 0
+        for byte in short_name:
+            checksum = (((checksum & 1) << 7) + (checksum >> 1) + byte) & 0xFF
+        return checksum
+    
+    def find(self, path: str) -> tuple:
+        """
+        Looks a file or folder up, the names being compared without their case as FAT does.
+        :param path: Path relative to the root of the volume
+        :return: (`FatEntry` or None if it doesn't exist, list of [start sector, sector count] of the directories that
+                  were read to look it up)
+        """
+        ranges = []
+        entry = None
+        folder_cluster = 0
+        
+        for name in [name for name in path.split("/") if name and name != "."]:
+            if entry is not None and not entry.is_folder:
+                return None, ranges
+            
+            ranges += self.directory_ranges(folder_cluster)
+            wanted = name.upper()
+            entry = None
+            for child in self.list_directory(folder_cluster):
+                if child.name.upper() == wanted or child.short_name.upper() == wanted:
+                    entry = child
+                    break
+            
+            if entry is None:
+                return None, ranges
+            folder_cluster = entry.first_cluster
+        
+        return entry, ranges
+    
+    def bundle_ranges(self, paths: list, max_sectors: int) -> list:
+        """
+        Returns the sectors a client reads to mount the volume and read the given files, in that order.
+        The missing files are skipped, since clients can ask for modules that may not be there.
+        :param paths: Paths of the files relative to the root of the volume
+        :param max_sectors: Maximum number of sectors, the last ones are dropped beyond it
+        :return: List of [start sector, sector count] relative to the start of the BLD, each sector given once
+        """
+        ranges = self.metadata_ranges()
+        for path in paths:
+            entry, lookup_ranges = self.find(path)
+            ranges += lookup_ranges
+            if entry is not None and not entry.is_folder:
+                ranges += self.chain_ranges(entry.first_cluster)
+        
+        # Merging the ranges while keeping their order, so the sectors that are read first are the ones that are kept.
+        merged = []
+        seen = set()
+        for start_sector, sector_count in ranges:
+            for sector in range(start_sector, start_sector + sector_count):
+                if sector in seen or len(seen) >= max_sectors:
+                    continue
+                seen.add(sector)
+                
+                if merged and merged[-1][0] + merged[-1][1] == sector:
+                    merged[-1][1] += 1
+                else:
+                    merged.append([sector, 1])
+        
+        return merged
+
+
+if __name__ == '__main__':
+    import storage
+    
+    parser = argparse.ArgumentParser(description="Prints the sectors of the boot bundle of some files of a BLD file.")
+    parser.add_argument("file", help="Path of the BLD file.")
+    parser.add_argument("paths", nargs="*", help="Files of the bundle, relative to the root of the volume.")
+    parser.add_argument("--max-sectors", default=256, type=int,
+                        help="Maximum number of sectors in the bundle.  (Default: 256)")
+    args = parser.parse_args()
+    
+    volume = FatVolume(storage.MemorySectorStore(args.file, 512))
+    print("FAT{} volume starting at sector #{} with {} clusters of {} sector(s)".format(
+        volume.fat_type, volume.partition_start, volume.cluster_count, volume.sectors_per_cluster))
+    
+    for file_path in args.paths:
+        file_entry, _ = volume.find(file_path)
+        if file_entry is None:
+            print("> '{}' couldn't be found".format(file_path))
+        else:
+            print("> '{}': {} bytes from cluster #{}".format(file_path, file_entry.size, file_entry.first_cluster))
+    
+    bundle = volume.bundle_ranges(args.paths, args.max_sectors)
+    print("> {} sector(s): {}".format(sum(sector_count for _, sector_count in bundle),
+                                      ",".join("{}:{}".format(*sector_range) for sector_range in bundle)))
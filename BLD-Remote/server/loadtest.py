@@ -0,0 +1,139 @@
+# Load test that simulates many RemoteBlockDevice clients reading and writing sectors at the same time.
+# It either targets a running server, or starts the Flask and asyncio servers itself and compares them.
+
+# Imports
+import argparse
+import http.client
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Constants
+SECTOR_SIZE = 512
+SECTOR_COUNT = 2048
+
+SPAWN_HOST = "127.0.0.1"
+SPAWN_PORTS = {
+    "main.py": 18080,
+    "main_async.py": 18081,
+}
+
+
+# Code
+def simulate_client(base_url: str, request_count: int, max_sectors: int, write_ratio: float,
+                    latencies: list, errors: list) -> None:
+    # Reads and writes random ranges of sectors over a single keep-alive connection like a MCU would.
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    rng = random.Random()
+    
+    for _ in range(request_count):
+        sector_count = rng.randint(1, max_sectors)
+        start_sector = rng.randint(0, SECTOR_COUNT - sector_count)
+        path = "{}/data/?ssi={}&sc={}&enc=raw".format(url.path.rstrip("/"), start_sector, sector_count)
+        
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                connection.request("POST", path, body=os.urandom(sector_count * SECTOR_SIZE),
+                                   headers={"Content-Type": "application/octet-stream"})
+            else:
+                connection.request("GET", path)
+            
+            response = connection.getresponse()
+            response_body = response.read()
+            if response.status != 200:
+                errors.append("{} {}".format(response.status, response_body[:80]))
+        except (OSError, http.client.HTTPException) as err:
+            errors.append(str(err))
+            connection.close()
+        latencies.append(time.perf_counter() - start)
+    
+    connection.close()
+
+
+def run_load(base_url: str, client_count: int, request_count: int, max_sectors: int, write_ratio: float) -> dict:
+    latencies = []
+    errors = []
+    
+    threads = [
+        threading.Thread(target=simulate_client,
+                         args=(base_url, request_count, max_sectors, write_ratio, latencies, errors))
+        for _ in range(client_count)
+    ]
+    
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] if latencies else 0,
+        "p99": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] if latencies else 0,
+    }
+
+
+def print_results(name: str, results: dict) -> None:
+    print("> {:<14} {:>6} requests, {:>4} errors, {:>9.1f} req/s, p50 {:>7.2f} ms, p99 {:>7.2f} ms".format(
+        name, results["requests"], results["errors"], results["requests_per_second"],
+        results["p50"] * 1000, results["p99"] * 1000))
+
+
+def wait_for_server(host: str, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request("GET", "/info/")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("The server on port {} didn't start in time".format(port))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measures the throughput and latency of the BLD servers.")
+    parser.add_argument("--url", default=None,
+                        help="Base URL of a running server, both servers are started and compared if omitted.")
+    parser.add_argument("--clients", default=32, type=int, help="Number of simulated clients.  (Default: 32)")
+    parser.add_argument("--requests", default=200, type=int, help="Requests sent by each client.  (Default: 200)")
+    parser.add_argument("--max-sectors", default=8, type=int, help="Maximum sectors per request.  (Default: 8)")
+    parser.add_argument("--write-ratio", default=0.3, type=float, help="Share of writes.  (Default: 0.3)")
+    args = parser.parse_args()
+    
+    print("Simulating {} clients sending {} requests each...".format(args.clients, args.requests))
+    
+    if args.url is not None:
+        print_results(args.url, run_load(args.url, args.clients, args.requests, args.max_sectors, args.write_ratio))
+        sys.exit(0)
+    
+    server_folder = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for script, port in SPAWN_PORTS.items():
+            process = subprocess.Popen([
+                sys.executable, os.path.join(server_folder, script),
+                "--host", SPAWN_HOST, "--port", str(port), "--file", os.path.join(temp_dir, script + ".bin"),
+                "--sector-count", str(SECTOR_COUNT), "--log-level", "WARNING",
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            
+            try:
+                wait_for_server(SPAWN_HOST, port, 15)
+                print_results(script, run_load("http://{}:{}".format(SPAWN_HOST, port), args.clients, args.requests,
+                                               args.max_sectors, args.write_ratio))
+            finally:
+                process.terminate()
+                process.wait()
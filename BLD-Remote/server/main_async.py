@@ -0,0 +1,260 @@
+# Alternative entry point of the BLD server that uses asyncio instead of Flask's development server.
+# It serves the same routes, but handles many connections at once and keeps them alive between requests, while the
+#  blocking calls to the stores are done in a thread pool.
+
+# Imports
+import asyncio
+import concurrent.futures
+import os
+from urllib.parse import urlsplit, parse_qsl
+
+import bld_server
+from bld_server import logger, RequestError
+
+
+# Constants
+THREAD_POOL_SIZE = 8
+
+MAX_HEADER_COUNT = 100
+MAX_BODY_SIZE = 64 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+# Code
+class Reply:
+    # Response given by the routes, either held in memory or streamed from a file-like object.
+    
+    status: int
+    content_type: str
+    body: bytes
+    
+    def __init__(self, body, content_type: str = "text/plain", status: int = 200, stream=None, stream_length: int = 0,
+                 download_name: str = None):
+        self.status = status
+        self.content_type = content_type
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.stream = stream
+        self.stream_length = stream_length
+        self.download_name = download_name
+
+
+class AsyncBldServer:
+    # Parses the HTTP requests on each connection and calls the routes in the thread pool.
+    
+    server: bld_server.BldServer
+    
+    def __init__(self, server: bld_server.BldServer, pool_size: int):
+        self.server = server
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bld")
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        logger.debug("New connection from {}".format(peer))
+        
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send_reply(writer, Reply("Malformed request line", status=400), False)
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    if len(headers) >= MAX_HEADER_COUNT or b":" not in line:
+                        headers = None
+                        break
+                    
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                
+                if headers is None:
+                    await self.send_reply(writer, Reply("Malformed headers", status=400), False)
+                    break
+                
+                try:
+                    body_size = int(headers.get("content-length", "0"))
+                except ValueError:
+                    body_size = -1
+                if body_size < 0:
+                    await self.send_reply(writer, Reply("Bad Content-Length", status=400), False)
+                    break
+                if body_size > MAX_BODY_SIZE:
+                    await self.send_reply(writer, Reply("Body is too large", status=413), False)
+                    break
+                body = await reader.readexactly(body_size) if body_size > 0 else b""
+                
+                connection = headers.get("connection", "").lower()
+                if version == "HTTP/1.1":
+                    keep_alive = connection != "close"
+                else:
+                    keep_alive = connection == "keep-alive"
+                
+                url = urlsplit(target)
+                params = dict(parse_qsl(url.query))
+                logger.debug("{} {} {}".format(peer, method, target))
+                
+                reply = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, self.dispatch, method, url.path, params, body)
+                await self.send_reply(writer, reply, keep_alive)
+                
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def send_reply(self, writer: asyncio.StreamWriter, reply: Reply, keep_alive: bool) -> None:
+        if reply.stream is not None:
+            content_length = reply.stream_length
+        else:
+            content_length = len(reply.body)
+        
+        head = ["HTTP/1.1 {} {}".format(reply.status, STATUS_REASONS.get(reply.status, "Unknown")),
+                "Content-Type: {}".format(reply.content_type),
+                "Content-Length: {}".format(content_length),
+                "Connection: {}".format("keep-alive" if keep_alive else "close")]
+        if reply.download_name is not None:
+            head.append("Content-Disposition: attachment; filename={}".format(reply.download_name))
+        
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        
+        if reply.stream is None:
+            writer.write(reply.body)
+            await writer.drain()
+            return
+        
+        # Streaming the file without blocking the event loop on its reads.
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.pool, reply.stream.read, DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            reply.stream.close()
+    
+    def dispatch(self, method: str, path: str, params: dict, body: bytes) -> Reply:
+        # Called in the thread pool since the stores can block on their files and locks.
+        if not path.endswith("/"):
+            path += "/"
+        
+        try:
+            if path.startswith("/dev/"):
+                parts = path.split("/")
+                if len(parts) != 5:
+                    raise RequestError("Not found", status=404)
+                return self.route(method, "/" + parts[3] + "/", params, body, parts[2])
+            
+            return self.route(method, path, params, body, None)
+        except RequestError as err:
+            return Reply(str(err), status=err.status)
+        except Exception:
+            logger.exception("Failed to handle {} {}".format(method, path))
+            return Reply("Internal error", status=500)
+    
+    def route(self, method: str, path: str, params: dict, body: bytes, device_id: str) -> Reply:
+        server = self.server
+        
+        if path in ("/data/", "/batch/"):
+            handler = bld_server.handle_data if path == "/data/" else bld_server.handle_batch
+            if device_id is None:
+                data = handler(server.store, method, params, body)
+            else:
+                data = server.with_device(device_id, handler, method, params, body)
+            return Reply(data, bld_server.data_content_type(params))
+        
+        if method not in ("GET", "POST"):
+            raise RequestError("Method not allowed", status=405)
+        
+        if path == "/bundle/":
+            if device_id is None:
+                data = bld_server.handle_bundle(server.store, params)
+            else:
+                data = server.with_device(device_id, bld_server.handle_bundle, params)
+            return Reply(data, bld_server.data_content_type(params))
+        
+        if path == "/info/":
+            if device_id is None:
+                return Reply(bld_server.handle_info(server.store), "application/json")
+            return Reply(server.with_device(device_id, bld_server.handle_info), "application/json")
+        
+        if path == "/sync/":
+            if device_id is None:
+                return Reply(bld_server.handle_sync(server.store))
+            return Reply(server.with_device(device_id, bld_server.handle_sync))
+        
+        if path == "/stats/":
+            if device_id is not None and method == "GET":
+                raise RequestError("Method not allowed", status=405)
+            data = server.handle_stats(method, body, device_id)
+            return Reply(data, "application/json" if method == "GET" else "text/plain")
+        
+        if device_id is not None:
+            raise RequestError("Not found", status=404)
+        
+        if path == "/":
+            return Reply(bld_server.PANEL_HTML, "text/html")
+        
+        if path == "/save/":
+            logger.info("Saving BLD...")
+            server.store.flush()
+            return Reply(bld_server.SAVE_REPORT_HTML, "text/html")
+        
+        if path == "/download/":
+            # Sparse BLD files can be sent as-is to avoid sending all the sectors that were never written.
+            sparse_path = None
+            if params.get("format") == bld_server.BLD_STORE_SPARSE:
+                sparse_path = server.download_sparse()
+            
+            if sparse_path is not None:
+                logger.info("Sending sparse BLD copy to user...")
+                return Reply(b"", "application/octet-stream", stream=open(sparse_path, "rb"),
+                             stream_length=os.path.getsize(sparse_path), download_name="bld.sparse.bin")
+            
+            logger.info("Sending BLD copy to user...")
+            return Reply(b"", "application/octet-stream", stream=server.store.open_image(),
+                         stream_length=server.store.sector_count * server.store.sector_size, download_name="bld.bin")
+        
+        raise RequestError("Not found", status=404)
+
+
+async def serve(async_server: AsyncBldServer, host: str, port: int) -> None:
+    tcp_server = await asyncio.start_server(async_server.handle_connection, host, port)
+    logger.info("Running asyncio server on http://{}:{}".format(host, port))
+    
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = bld_server.build_argument_parser(
+        "Serves the sectors of a BLD file to a RemoteBlockDevice with asyncio.", "INFO")
+    parser.add_argument("--threads", default=THREAD_POOL_SIZE, type=int,
+                        help="Number of threads used to access the BLD files.  (Default: {})".format(THREAD_POOL_SIZE))
+    args = bld_server.parse_arguments(parser)
+    
+    try:
+        asyncio.run(serve(AsyncBldServer(bld_server.BldServer(args), args.threads), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,147 @@
+# Alternative entry point of the BLD server that uses a compact binary protocol over TCP instead of HTTP.
+# Each request starts with a 16 bytes header holding its opcode, start sector, sector count and payload length, and
+#  each reply with a 8 bytes header holding its status and payload length.  (See "client/bld_tcp.py")
+# Requests are handled one after the other on each connection, so clients can send many of them before reading the
+#  replies, while the blocking calls to the stores are done in a thread pool.
+
+# Imports
+import asyncio
+import concurrent.futures
+import struct
+
+import bld_server
+from bld_server import logger, RequestError
+
+
+# Constants
+PORT = 10809
+THREAD_POOL_SIZE = 8
+
+MAX_PAYLOAD_SIZE = 64 * 1024 * 1024
+
+BLDP_REQUEST_FORMAT = "<BxxxIII"
+BLDP_REQUEST_SIZE = struct.calcsize(BLDP_REQUEST_FORMAT)
+BLDP_REPLY_FORMAT = "<BxxxI"
+
+BLDP_OP_INFO = 0
+BLDP_OP_READ = 1
+BLDP_OP_WRITE = 2
+BLDP_OP_SYNC = 3
+BLDP_OP_DEVICE = 4
+
+BLDP_STATUS_OK = 0
+BLDP_STATUS_INVALID = 1
+BLDP_STATUS_NOT_FOUND = 2
+BLDP_STATUS_ERROR = 3
+
+
+# Code
+class TcpBldServer:
+    # Reads the requests on each connection and calls the handlers in the thread pool.
+    
+    server: bld_server.BldServer
+    
+    def __init__(self, server: bld_server.BldServer, pool_size: int):
+        self.server = server
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bld")
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        logger.debug("New connection from {}".format(peer))
+        
+        # Device whose BLD is used by the requests, chosen by the client with BLDP_OP_DEVICE.
+        device_id = None
+        
+        try:
+            while True:
+                opcode, start_sector, sector_count, payload_size = struct.unpack(
+                    BLDP_REQUEST_FORMAT, await reader.readexactly(BLDP_REQUEST_SIZE))
+                
+                if payload_size > MAX_PAYLOAD_SIZE:
+                    writer.write(struct.pack(BLDP_REPLY_FORMAT, BLDP_STATUS_INVALID, 0))
+                    await writer.drain()
+                    break
+                payload = await reader.readexactly(payload_size) if payload_size > 0 else b""
+                
+                logger.debug("{} #{} {} {}".format(peer, opcode, start_sector, sector_count))
+                status, data = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, self.dispatch, opcode, start_sector, sector_count, payload, device_id)
+                
+                if opcode == BLDP_OP_DEVICE and status == BLDP_STATUS_OK:
+                    device_id = payload.decode("latin-1")
+                
+                writer.write(struct.pack(BLDP_REPLY_FORMAT, status, len(data)))
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    def dispatch(self, opcode: int, start_sector: int, sector_count: int, payload: bytes, device_id: str) -> tuple:
+        # Called in the thread pool since the stores can block on their files and locks.
+        try:
+            if opcode == BLDP_OP_DEVICE:
+                # Making sure the device can be used before the next requests use it.
+                self.server.with_device(payload.decode("latin-1"), lambda store: b"")
+                return BLDP_STATUS_OK, b""
+            
+            if device_id is None:
+                return BLDP_STATUS_OK, handle_request(self.server.store, opcode, start_sector, sector_count, payload)
+            
+            return BLDP_STATUS_OK, self.server.with_device(
+                device_id, handle_request, opcode, start_sector, sector_count, payload)
+        except RequestError as err:
+            return BLDP_STATUS_NOT_FOUND if err.status == 404 else BLDP_STATUS_INVALID, str(err).encode()
+        except Exception:
+            logger.exception("Failed to handle the request #{}".format(opcode))
+            return BLDP_STATUS_ERROR, b"Internal error"
+
+
+def handle_request(store, opcode: int, start_sector: int, sector_count: int, payload: bytes) -> bytes:
+    """
+    Handles a request with the same handlers as the HTTP routes.
+    :param store: Store of the BLD
+    :param opcode: Operation requested by the client
+    :param start_sector: Index of the first sector
+    :param sector_count: Number of sectors
+    :param payload: Payload of the request
+    :return: Payload of the reply
+    :raises RequestError: If the request is invalid
+    """
+    params = {"ssi": start_sector, "sc": sector_count, "enc": bld_server.BLD_ENCODING_RAW}
+    
+    if opcode == BLDP_OP_READ:
+        return bld_server.handle_data(store, "GET", params, b"")
+    
+    if opcode == BLDP_OP_WRITE:
+        return bld_server.handle_data(store, "POST", params, payload)
+    
+    if opcode == BLDP_OP_INFO:
+        return struct.pack("<II", store.sector_size, store.sector_count)
+    
+    if opcode == BLDP_OP_SYNC:
+        return bld_server.handle_sync(store)
+    
+    raise RequestError("Unknown opcode {}".format(opcode))
+
+
+async def serve(tcp_bld_server: TcpBldServer, host: str, port: int) -> None:
+    tcp_server = await asyncio.start_server(tcp_bld_server.handle_connection, host, port)
+    logger.info("Running binary protocol server on {}:{}".format(host, port))
+    
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = bld_server.build_argument_parser(
+        "Serves the sectors of a BLD file to a RemoteBlockDevice over a binary protocol.", "INFO", PORT)
+    parser.add_argument("--threads", default=THREAD_POOL_SIZE, type=int,
+                        help="Number of threads used to access the BLD files.  (Default: {})".format(THREAD_POOL_SIZE))
+    args = bld_server.parse_arguments(parser)
+    
+    try:
+        asyncio.run(serve(TcpBldServer(bld_server.BldServer(args), args.threads), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,109 @@
+# Simulates a MCU using a RemoteBlockDevice over the binary protocol of "main_tcp.py" with CPython.
+# The client's modules are used as-is with the "socket" module standing in for CircuitPython's socketpool, and every
+#  sector read is checked against what was written before.
+
+# Imports
+import argparse
+import os
+import random
+import socket
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "client"))
+
+try:
+    import adafruit_requests
+except ImportError:
+    # Only its "Session" type is used by "bld_remote.py", which the transport doesn't need.
+    adafruit_requests = types.ModuleType("adafruit_requests")
+    adafruit_requests.Session = object
+    sys.modules["adafruit_requests"] = adafruit_requests
+
+import bld_remote
+import bld_tcp
+
+
+# Constants
+HOST = "127.0.0.1"
+PORT = 10809
+TIMEOUT = 10
+
+
+# Code
+def run_workload(bld: bld_remote.RemoteBlockDevice, operation_count: int, max_sectors: int,
+                 write_ratio: float) -> None:
+    # Reads and writes random ranges of sectors and checks the reads against a copy of the whole BLD.
+    sector_size = bld.sector_size
+    reference = bytearray(bld.sector_count * sector_size)
+    bld.readblocks(0, reference)
+    
+    rng = random.Random(0)
+    for i in range(operation_count):
+        sector_count = rng.randint(1, max_sectors)
+        start_sector = rng.randint(0, bld.sector_count - sector_count)
+        start = start_sector * sector_size
+        end = start + sector_count * sector_size
+        
+        if rng.random() < write_ratio:
+            data = bytearray(os.urandom(sector_count * sector_size))
+            bld.writeblocks(start_sector, data)
+            reference[start:end] = data
+        else:
+            data = bytearray(sector_count * sector_size)
+            bld.readblocks(start_sector, data)
+            if data != reference[start:end]:
+                raise RuntimeError("Operation #{} read the wrong sectors from sector #{} !".format(i, start_sector))
+    
+    bld.sync()
+    
+    # Making sure the server kept every write by reading the whole BLD without any cache.
+    data = bytearray(len(reference))
+    bld_remote.RemoteBlockDevice(None, None, TIMEOUT, bld.sector_count, sector_size, encoding=bld.encoding,
+                                 transport=bld.transport).readblocks(0, data)
+    if data != reference:
+        raise RuntimeError("The server's BLD doesn't match the writes !")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks and measures a RemoteBlockDevice over the binary protocol.")
+    parser.add_argument("--host", default=HOST, help="Address of the server.  (Default: {})".format(HOST))
+    parser.add_argument("--port", default=PORT, type=int, help="Port of the server.  (Default: {})".format(PORT))
+    parser.add_argument("--device", default=None, help="ID of the device whose BLD is used.  (Default: None)")
+    parser.add_argument("--operations", default=2000, type=int, help="Reads and writes to do.  (Default: 2000)")
+    parser.add_argument("--max-sectors", default=8, type=int, help="Maximum sectors per operation.  (Default: 8)")
+    parser.add_argument("--write-ratio", default=0.3, type=float, help="Share of writes.  (Default: 0.3)")
+    parser.add_argument("--cache-size", default=0, type=int, help="Size of the sector cache.  (Default: 0)")
+    parser.add_argument("--write-back-size", default=0, type=int, help="Size of the write-back buffer.  (Default: 0)")
+    args = parser.parse_args()
+    
+    print("Connecting to {}:{}...".format(args.host, args.port))
+    transport = bld_tcp.TcpTransport(socket, args.host, args.port, TIMEOUT, args.device)
+    bld_info = transport.info()
+    print("> {}".format(bld_info))
+    
+    bld = bld_remote.RemoteBlockDevice(
+        session=None,
+        server_base_address=None,
+        server_timeout=TIMEOUT,
+        sector_count=bld_info["sector_count"],
+        sector_size=bld_info["sector_size"],
+        cache_size=args.cache_size,
+        write_back_size=args.write_back_size,
+        encoding=bld_remote.BLD_ENCODING_RAW,
+        collect_garbage=False,
+        transport=transport,
+    )
+    
+    print("Running {} operations...".format(args.operations))
+    start_time = time.perf_counter()
+    run_workload(bld, args.operations, args.max_sectors, args.write_ratio)
+    duration = time.perf_counter() - start_time
+    
+    print("> Done in {:.2f} seconds, all the reads matched".format(duration))
+    print("> Requests: {}  ({:.0f} req/s)".format(transport.requests, transport.requests / duration))
+    print("> Setups:   {}".format(transport.setups))
+    print("> Sent:     {} bytes".format(bld.bytes_sent))
+    print("> Received: {} bytes".format(bld.bytes_received))
+    transport.close()
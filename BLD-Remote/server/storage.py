@@ -0,0 +1,501 @@
+# Imports
+import array
+import io
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+
+# Constants
+# Header of sparse BLD files: Magic, version, sector size, sector count.
+SPARSE_MAGIC = b"BLDS"
+SPARSE_VERSION = 1
+SPARSE_HEADER_FORMAT = "<4sIII"
+SPARSE_HEADER_SIZE = struct.calcsize(SPARSE_HEADER_FORMAT)
+
+# Size of each entry in the sector index of sparse BLD files.
+SPARSE_INDEX_ENTRY_SIZE = 4
+
+
+# Code
+class SectorHashTable:
+    # CRC32 of each sector of a store, computed the first time they are needed and forgotten when the sector is written.
+    # They are used as versions of the sectors so that clients can skip the ones they already have.
+    
+    sector_count: int
+    
+    def __init__(self, sector_count: int):
+        self.sector_count = sector_count
+        self._hashes = array.array("I", bytes(sector_count * array.array("I").itemsize))
+        self._known = bytearray(sector_count)
+        
+        # Prevents a hash computed from old data from being kept when a write happens at the same time.
+        self._lock = threading.Lock()
+    
+    def get(self, store, start_sector: int, sector_count: int) -> list:
+        """
+        Returns the CRC32 of the given sectors, and computes the missing ones.
+        :param store: Store that holds the sectors
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: List of CRC32
+        """
+        with self._lock:
+            for sector in range(start_sector, start_sector + sector_count):
+                if not self._known[sector]:
+                    self._hashes[sector] = zlib.crc32(store.read(sector, 1))
+                    self._known[sector] = 1
+            
+            return self._hashes[start_sector:start_sector + sector_count].tolist()
+    
+    def invalidate(self, start_sector: int, sector_count: int) -> None:
+        """
+        Forgets the CRC32 of the given sectors, must be called after they are written.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: None
+        """
+        with self._lock:
+            self._known[start_sector:start_sector + sector_count] = bytes(sector_count)
+
+
+class MemorySectorStore:
+    # Sector storage that keeps the whole BLD file in memory until it is flushed back to it.
+    
+    path: str
+    
+    sector_size: int
+    sector_count: int
+    
+    data: bytearray
+    
+    hash_table: SectorHashTable
+    
+    def __init__(self, path: str, sector_size: int):
+        self.path = path
+        self.sector_size = sector_size
+        
+        with open(path, "rb") as f:
+            self.data = bytearray(f.read())
+        
+        self.sector_count = len(self.data) // sector_size
+        self._view = memoryview(self.data)
+        self.hash_table = SectorHashTable(self.sector_count)
+    
+    def check_range(self, start_sector: int, sector_count: int) -> None:
+        """
+        Checks if the given range of sectors is within the BLD.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: None
+        :raises ValueError: If the range is empty or goes out of bounds
+        """
+        if start_sector < 0 or start_sector >= self.sector_count:
+            raise ValueError("First requested sector #{} is out-of-bounds".format(start_sector))
+        
+        if sector_count < 1 or start_sector + sector_count > self.sector_count:
+            raise ValueError("Out-of-bounds sector(s) requested, the BLD only has {}".format(self.sector_count))
+    
+    def read(self, start_sector: int, sector_count: int) -> memoryview:
+        """
+        Returns a view of the given sectors without copying them.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: A memoryview of the sectors' data
+        :raises ValueError: If the range goes out of bounds
+        """
+        self.check_range(start_sector, sector_count)
+        
+        start_index = start_sector * self.sector_size
+        return self._view[start_index:start_index + sector_count * self.sector_size]
+    
+    def write(self, start_sector: int, sector_count: int, data) -> None:
+        """
+        Overwrites the given sectors in a single slice assignment.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :param data: Bytes-like object holding exactly `sector_count` sectors
+        :return: None
+        :raises ValueError: If the range goes out of bounds or if the data's size doesn't match it
+        """
+        self.check_range(start_sector, sector_count)
+        
+        if len(data) != sector_count * self.sector_size:
+            raise ValueError("Expected {} byte(s) for {} sector(s), got {}".format(
+                sector_count * self.sector_size, sector_count, len(data)))
+        
+        start_index = start_sector * self.sector_size
+        self._view[start_index:start_index + len(data)] = data
+        self.hash_table.invalidate(start_sector, sector_count)
+    
+    def sector_hashes(self, start_sector: int, sector_count: int) -> list:
+        """
+        Returns the CRC32 of the given sectors, which change whenever they are written.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: List of CRC32
+        :raises ValueError: If the range goes out of bounds
+        """
+        self.check_range(start_sector, sector_count)
+        return self.hash_table.get(self, start_sector, sector_count)
+    
+    def flush(self) -> None:
+        """
+        Saves the BLD to its file.
+        :return: None
+        """
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def memory_usage(self) -> int:
+        """
+        Returns the amount of memory used to hold the sectors.
+        :return: Number of bytes held in memory
+        """
+        return len(self.data)
+    
+    def open_image(self) -> io.BytesIO:
+        """
+        Returns a file-like object containing a copy of the whole BLD.
+        :return: File-like object of the BLD
+        """
+        return io.BytesIO(self.data)
+    
+    def close(self) -> None:
+        """
+        Releases the store, the BLD is only saved when `flush` is called.
+        :return: None
+        """
+        pass
+
+
+class MappedSectorStore(MemorySectorStore):
+    # Sector storage that maps the BLD file in memory and lets the OS load and persist its sectors when needed.
+    
+    # Minimum number of seconds between two automatic flushes after a write, 0 disables them.
+    sync_interval: float
+    
+    readonly: bool
+    
+    data: mmap.mmap
+    
+    def __init__(self, path: str, sector_size: int, sync_interval: float = 0, readonly: bool = False):
+        self.path = path
+        self.sector_size = sector_size
+        self.sync_interval = sync_interval
+        self.readonly = readonly
+        
+        if readonly:
+            self._file = open(path, "rb")
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._file = open(path, "r+b")
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE)
+        
+        self.sector_count = len(self.data) // sector_size
+        self._view = memoryview(self.data)
+        self.hash_table = SectorHashTable(self.sector_count)
+        
+        self._dirty = False
+        self._last_flush = time.monotonic()
+    
+    def write(self, start_sector: int, sector_count: int, data) -> None:
+        if self.readonly:
+            raise ValueError("The BLD is read-only")
+        
+        super().write(start_sector, sector_count, data)
+        self._dirty = True
+        
+        if self.sync_interval > 0 and time.monotonic() - self._last_flush >= self.sync_interval:
+            self.flush()
+    
+    def flush(self) -> None:
+        """
+        Makes sure every written sector has reached the BLD file.
+        :return: None
+        """
+        if self._dirty:
+            self._dirty = False
+            self.data.flush()
+        self._last_flush = time.monotonic()
+    
+    def memory_usage(self) -> int:
+        """
+        Returns the amount of memory used to hold the sectors.
+        The OS only loads the sectors that are accessed, so this is an upper bound.
+        :return: Number of bytes mapped in memory
+        """
+        return len(self.data)
+    
+    def open_image(self) -> io.BufferedReader:
+        """
+        Returns a file-like object that reads the whole BLD from its file.
+        :return: File-like object of the BLD
+        """
+        self.flush()
+        return open(self.path, "rb")
+    
+    def close(self) -> None:
+        """
+        Flushes and unmaps the BLD file.
+        :return: None
+        """
+        self.flush()
+        self._view.release()
+        self.data.close()
+        self._file.close()
+
+
+class SparseSectorStore:
+    # Sector storage that only keeps the sectors that were written in its file and reads the others from a base BLD.
+    # If no base BLD is given, the sectors that were never written are full of zeros.
+    
+    # The file starts with a header, followed by an index that holds the slot+1 of each sector, or 0 if it isn't
+    #  allocated, and the slots in which the allocated sectors are written in the order they were allocated.
+    
+    path: str
+    
+    sector_size: int
+    sector_count: int
+    
+    # Read-only BLD from which the unallocated sectors are read, its sectors are never written to.
+    base: MemorySectorStore
+    
+    hash_table: SectorHashTable
+    
+    def __init__(self, path: str, base: MemorySectorStore = None):
+        self.path = path
+        self.base = base
+        
+        self._file = open(path, "r+b")
+        self._lock = threading.Lock()
+        
+        magic, version, self.sector_size, self.sector_count = struct.unpack(
+            SPARSE_HEADER_FORMAT, self._file.read(SPARSE_HEADER_SIZE))
+        
+        if magic != SPARSE_MAGIC or version != SPARSE_VERSION:
+            self._file.close()
+            raise ValueError("'{}' isn't a sparse BLD file".format(path))
+        
+        if base is not None and (base.sector_size != self.sector_size or base.sector_count != self.sector_count):
+            self._file.close()
+            raise ValueError("The base BLD doesn't have the same geometry as '{}'".format(path))
+        
+        # The index is kept in memory and is stored as little-endian integers in the file.
+        self._index = array.array("I")
+        if self._index.itemsize != SPARSE_INDEX_ENTRY_SIZE:
+            self._file.close()
+            raise ValueError("Unsupported platform, the sector index needs 4 bytes integers")
+        
+        self._index.frombytes(self._file.read(self.sector_count * SPARSE_INDEX_ENTRY_SIZE))
+        if sys.byteorder != "little":
+            self._index.byteswap()
+        
+        self._data_offset = SPARSE_HEADER_SIZE + self.sector_count * SPARSE_INDEX_ENTRY_SIZE
+        self._file.seek(0, os.SEEK_END)
+        self._slot_count = (self._file.tell() - self._data_offset) // self.sector_size
+        
+        self._zero_sector = bytes(self.sector_size)
+        self.hash_table = SectorHashTable(self.sector_count)
+    
+    def check_range(self, start_sector: int, sector_count: int) -> None:
+        """
+        Checks if the given range of sectors is within the BLD.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: None
+        :raises ValueError: If the range is empty or goes out of bounds
+        """
+        if start_sector < 0 or start_sector >= self.sector_count:
+            raise ValueError("First requested sector #{} is out-of-bounds".format(start_sector))
+        
+        if sector_count < 1 or start_sector + sector_count > self.sector_count:
+            raise ValueError("Out-of-bounds sector(s) requested, the BLD only has {}".format(self.sector_count))
+    
+    def allocated_sector_count(self) -> int:
+        """
+        Returns the number of sectors that are held in the sparse file.
+        :return: Number of allocated sectors
+        """
+        return self._slot_count
+    
+    def memory_usage(self) -> int:
+        """
+        Returns the amount of memory used to hold the sector index, the base BLD isn't included.
+        :return: Number of bytes held in memory
+        """
+        return len(self._index) * SPARSE_INDEX_ENTRY_SIZE
+    
+    def read(self, start_sector: int, sector_count: int) -> bytearray:
+        """
+        Returns a copy of the given sectors, the unallocated ones are read without touching the disk.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: The sectors' data
+        :raises ValueError: If the range goes out of bounds
+        """
+        self.check_range(start_sector, sector_count)
+        
+        data = bytearray(sector_count * self.sector_size)
+        view = memoryview(data)
+        
+        with self._lock:
+            i = 0
+            while i < sector_count:
+                slot = self._index[start_sector + i]
+                
+                # Grouping the sectors that are in the same state and whose slots follow each other.
+                run_end = i + 1
+                while run_end < sector_count:
+                    next_slot = self._index[start_sector + run_end]
+                    if (slot == 0 and next_slot != 0) or (slot != 0 and next_slot != slot + run_end - i):
+                        break
+                    run_end += 1
+                
+                run_view = view[i * self.sector_size:run_end * self.sector_size]
+                if slot != 0:
+                    self._file.seek(self._data_offset + (slot - 1) * self.sector_size)
+                    self._file.readinto(run_view)
+                elif self.base is not None:
+                    run_view[:] = self.base.read(start_sector + i, run_end - i)
+                
+                i = run_end
+        
+        return data
+    
+    def write(self, start_sector: int, sector_count: int, data) -> None:
+        """
+        Overwrites the given sectors, allocating them if they weren't already.
+        Unallocated sectors that would be left unchanged by the write are not allocated.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :param data: Bytes-like object holding exactly `sector_count` sectors
+        :return: None
+        :raises ValueError: If the range goes out of bounds or if the data's size doesn't match it
+        """
+        self.check_range(start_sector, sector_count)
+        
+        if len(data) != sector_count * self.sector_size:
+            raise ValueError("Expected {} byte(s) for {} sector(s), got {}".format(
+                sector_count * self.sector_size, sector_count, len(data)))
+        
+        view = memoryview(data)
+        
+        with self._lock:
+            for i in range(sector_count):
+                sector = start_sector + i
+                sector_data = view[i * self.sector_size:(i + 1) * self.sector_size]
+                slot = self._index[sector]
+                
+                if slot == 0:
+                    if self.base is None:
+                        unchanged = sector_data == self._zero_sector
+                    else:
+                        unchanged = sector_data == self.base.read(sector, 1)
+                    
+                    if unchanged:
+                        continue
+                    
+                    # The sector's data is written before its index entry in case the server is stopped midway.
+                    self._slot_count += 1
+                    slot = self._slot_count
+                    self._file.seek(self._data_offset + (slot - 1) * self.sector_size)
+                    self._file.write(sector_data)
+                    
+                    self._index[sector] = slot
+                    self._file.seek(SPARSE_HEADER_SIZE + sector * SPARSE_INDEX_ENTRY_SIZE)
+                    self._file.write(struct.pack("<I", slot))
+                else:
+                    self._file.seek(self._data_offset + (slot - 1) * self.sector_size)
+                    self._file.write(sector_data)
+        
+        self.hash_table.invalidate(start_sector, sector_count)
+    
+    def sector_hashes(self, start_sector: int, sector_count: int) -> list:
+        """
+        Returns the CRC32 of the given sectors, which change whenever they are written.
+        :param start_sector: Index of the first sector
+        :param sector_count: Number of sectors
+        :return: List of CRC32
+        :raises ValueError: If the range goes out of bounds
+        """
+        self.check_range(start_sector, sector_count)
+        return self.hash_table.get(self, start_sector, sector_count)
+    
+    def flush(self) -> None:
+        """
+        Makes sure every written sector has reached the sparse file.
+        :return: None
+        """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def open_image(self) -> io.BufferedReader:
+        """
+        Returns a file-like object that reads the whole BLD as a regular BLD file.
+        :return: File-like object of the BLD
+        """
+        return io.BufferedReader(SectorStoreReader(self), buffer_size=128 * self.sector_size)
+    
+    def close(self) -> None:
+        """
+        Flushes and closes the sparse file, the base BLD is left open since it can be shared with other stores.
+        :return: None
+        """
+        self.flush()
+        self._file.close()
+
+
+class SectorStoreReader(io.RawIOBase):
+    # Reads all the sectors of a store in order as if it was a regular BLD file.
+    
+    def __init__(self, store):
+        self._store = store
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        sector_index = self._position // self._store.sector_size
+        sector_count = min(len(buffer) // self._store.sector_size, self._store.sector_count - sector_index)
+        
+        if sector_count <= 0:
+            return 0
+        
+        byte_count = sector_count * self._store.sector_size
+        buffer[:byte_count] = self._store.read(sector_index, sector_count)
+        self._position += byte_count
+        return byte_count
+
+
+def create_sparse_image(path: str, sector_count: int, sector_size: int) -> None:
+    """
+    Creates an empty sparse BLD file in which no sector is allocated.
+    :param path: Path of the sparse BLD file
+    :param sector_count: Number of sectors in the BLD
+    :param sector_size: Size of each sector in bytes
+    :return: None
+    """
+    with open(path, "wb") as f:
+        f.write(struct.pack(SPARSE_HEADER_FORMAT, SPARSE_MAGIC, SPARSE_VERSION, sector_size, sector_count))
+        f.truncate(SPARSE_HEADER_SIZE + sector_count * SPARSE_INDEX_ENTRY_SIZE)
+
+
+def create_image(path: str, sector_count: int, sector_size: int) -> None:
+    """
+    Creates an empty BLD file without writing its content, most file systems will not allocate it until it is written to.
+    :param path: Path of the BLD file
+    :param sector_count: Number of sectors in the BLD
+    :param sector_size: Size of each sector in bytes
+    :return: None
+    """
+    with open(path, "wb") as f:
+        f.truncate(sector_count * sector_size)
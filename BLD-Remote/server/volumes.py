@@ -0,0 +1,216 @@
+# Imports
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+# Constants
+# Device IDs are used as filenames, so they are restricted to characters that can't be used to escape their folder.
+DEVICE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+logger = logging.getLogger("bld")
+
+
+# Code
+class Volume:
+    # BLD of a single device and the lock that prevents concurrent requests from using it at the same time.
+    # The lock is also held while the store is being opened or closed, which is done without holding the manager's
+    #  lock so that the requests of the other devices aren't blocked by it.
+    
+    device_id: str
+    store: object
+    
+    def __init__(self, device_id: str, store):
+        self.device_id = device_id
+        self.store = store
+        self.lock = threading.Lock()
+        
+        # Number of requests that are using or waiting for this volume, it can only be closed when it reaches 0.
+        self.users = 0
+
+
+class VolumeManager:
+    # Opens the BLD of each device when it is first used, and closes the least recently used ones once the memory
+    #  used by the open BLDs goes over a given budget.
+    # The manager's lock only guards the bookkeeping of the volumes, the stores are opened, flushed and closed while
+    #  only holding the lock of their own volume.
+    
+    directory: str
+    memory_budget: int
+    
+    def __init__(self, directory: str, open_store, memory_budget: int):
+        """
+        :param directory: Folder in which the "<device id>.bin" BLD files are stored
+        :param open_store: Function that opens or creates the BLD file at the given path and returns its store
+        :param memory_budget: Amount of bytes the open BLDs can use before the least recently used ones get closed
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        
+        self._open_store = open_store
+        self._lock = threading.Lock()
+        
+        # Device ID => Volume, ordered from least to most recently used.
+        # The volumes whose store is being opened are in it too, without a store until it is opened.
+        self._volumes = OrderedDict()
+        
+        # Device ID => Volume that was evicted and is being closed, its BLD file can't be opened again until then.
+        self._closing = {}
+        
+        os.makedirs(directory, exist_ok=True)
+    
+    def acquire(self, device_id: str) -> Volume:
+        """
+        Opens the device's BLD if needed and waits until no other request is using it.
+        `release` must be called once the volume isn't used anymore.
+        :param device_id: ID of the device
+        :return: The device's volume
+        :raises ValueError: If the device ID is invalid
+        """
+        if not DEVICE_ID_PATTERN.match(device_id):
+            raise ValueError("Invalid device ID")
+        
+        while True:
+            with self._lock:
+                closing = self._closing.get(device_id)
+                
+                if closing is None:
+                    volume = self._volumes.pop(device_id, None)
+                    
+                    # The lock of a new volume is taken right away so that the other requests wait until it is opened.
+                    opening = volume is None
+                    if opening:
+                        volume = Volume(device_id, None)
+                        volume.lock.acquire()
+                    
+                    self._volumes[device_id] = volume
+                    volume.users += 1
+                    victims = self._take_victims()
+            
+            if closing is not None:
+                # Waiting until the evicted volume is saved before opening its BLD file again.
+                with closing.lock:
+                    pass
+                continue
+            
+            self._close_victims(victims)
+            
+            if opening:
+                try:
+                    volume.store = self._open_store(os.path.join(self.directory, device_id + ".bin"))
+                except Exception:
+                    with self._lock:
+                        volume.users -= 1
+                        if self._volumes.get(device_id) is volume:
+                            del self._volumes[device_id]
+                    volume.lock.release()
+                    raise
+                
+                # The memory used by the new store is only known once it is opened.
+                with self._lock:
+                    victims = self._take_victims()
+                self._close_victims(victims)
+                return volume
+            
+            volume.lock.acquire()
+            if volume.store is not None:
+                return volume
+            
+            # The request that was opening it failed, the next attempt opens it again.
+            volume.lock.release()
+            with self._lock:
+                volume.users -= 1
+    
+    def release(self, volume: Volume) -> None:
+        """
+        Lets other requests use the given volume.
+        :param volume: Volume returned by `acquire`
+        :return: None
+        """
+        volume.lock.release()
+        
+        with self._lock:
+            volume.users -= 1
+            victims = self._take_victims()
+        self._close_victims(victims)
+    
+    def memory_usage(self) -> int:
+        """
+        Returns the amount of memory used by all the open BLDs.
+        :return: Number of bytes
+        """
+        with self._lock:
+            return self._memory_usage()
+    
+    def flush_all(self) -> None:
+        """
+        Flushes the BLD of every open volume.
+        :return: None
+        """
+        with self._lock:
+            volumes = list(self._volumes.values())
+            for volume in volumes:
+                volume.users += 1
+        
+        for volume in volumes:
+            volume.lock.acquire()
+            try:
+                if volume.store is not None:
+                    volume.store.flush()
+            finally:
+                self.release(volume)
+    
+    def close_all(self) -> None:
+        """
+        Saves and closes the BLD of every open volume.
+        :return: None
+        """
+        with self._lock:
+            for volume in self._volumes.values():
+                if volume.store is not None:
+                    volume.store.flush()
+                    volume.store.close()
+            self._volumes.clear()
+    
+    def _memory_usage(self) -> int:
+        # Must be called while holding the manager's lock.
+        return sum(volume.store.memory_usage() for volume in self._volumes.values() if volume.store is not None)
+    
+    def _take_victims(self) -> list:
+        """
+        Takes the least recently used volumes that aren't in use out of the open ones until they fit in the budget.
+        Must be called while holding the manager's lock, and the victims must then be given to `_close_victims`.
+        :return: List of the volumes to close, whose locks are held
+        """
+        memory_usage = self._memory_usage()
+        victims = []
+        
+        for device_id in list(self._volumes):
+            if memory_usage <= self.memory_budget:
+                break
+            
+            volume = self._volumes[device_id]
+            if volume.users > 0 or not volume.lock.acquire(False):
+                continue
+            
+            memory_usage -= volume.store.memory_usage()
+            del self._volumes[device_id]
+            self._closing[device_id] = volume
+            victims.append(volume)
+        
+        return victims
+    
+    def _close_victims(self, victims: list) -> None:
+        # Closing the volumes given by `_take_victims`, without holding the manager's lock.
+        for volume in victims:
+            logger.info("Closing the BLD of device '{}' to free some memory...".format(volume.device_id))
+            try:
+                # Stores that are held in memory are only saved when flushed.
+                volume.store.flush()
+                volume.store.close()
+            finally:
+                with self._lock:
+                    del self._closing[volume.device_id]
+                volume.lock.release()
@@ -1,6 +1,13 @@
 # Imports
 import io
 
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import AnyStr, Iterator, Tuple, Union
+    from storage import VfsFat
+except ImportError:
+    pass
+
 # Code
 class BlankMemoryFileSystem:
     # The filesystem label, up to 11 case-insensitive bytes.
@@ -9,16 +16,28 @@ class BlankMemoryFileSystem:
     # Whether the sile system should be in read-only mode or not.
     readonly: bool
     
-    def __init__(self, label: str = "BLANK", readonly: bool = False):
+    def __init__(self, label: str = "BLANK", readonly: bool = False, path_cache=None):
         # Note: We don't pass a block-device object in the constructor since we won't be interacting with one in this
         #        file system.
         
+        # Note: The optional `path_cache` is a `PathCache` from "FS-Common/path_cache.py" that remembers the result of
+        #        each lookup, see the `stat` method.
+        
         # Preliminary check
         if len(label.encode('utf-8')) > 11:
             raise OSError("The given label '{}' is longer than 11 bytes !".format(label))
         
         self.label = label
         self.readonly = readonly
+        self._path_cache = path_cache
+    
+    def _resolve(self, path: str) -> Union[None, Tuple[int, int, int, int, int, int, int, int, int, int]]:
+        # Given to the path cache, which calls it with a normalized path (No leading or trailing "/", root being "")
+        #  the first time it is asked for it, and returns what it returned for the next ones.
+        # It returns whatever the file system needs to know about a file or folder, or None if it doesn't exist.
+        if path == "":
+            return (0x4000, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        return None
     
     def mkfs(self) -> None:
         # Called when the filesystem needs to be reformatted and have all its data deleted.
@@ -75,8 +94,17 @@ class BlankMemoryFileSystem:
         #   * The "silently called" part comes from the fact that `print()` calls during a proper and successfull mount
         #       don't appear in the REPL shell.
         
+        # If a path cache was given, it is used to look the path up, which is worth it for file systems whose lookups
+        #  are slow since CircuitPython looks for the same paths on each import.
+        # The file systems that can change have to call its `invalidate` method each time a file or folder is added or
+        #  removed.
+        if self._path_cache is not None:
+            entry = self._path_cache.lookup(path, self._resolve)
+            if entry is not None:
+                return entry
+        
         # If the file system's root folder is request, we just say it exists
-        if path == "/":
+        elif path == "/":
             return (0x4000, 0, 0, 0, 0, 0, 0, 0, 0, 0)
         
         # Saying we don't have the requested file or folder.
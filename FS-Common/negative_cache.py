@@ -0,0 +1,172 @@
+# Imports
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import AnyStr, Iterator, Tuple, Union
+except ImportError:
+    pass
+
+from path_cache import normalize_path
+
+
+# Code
+class NegativeLookupFileSystem:
+    # Wraps a file system, like a `VfsFat` on top of a remote BLD, in order to answer the lookups of missing paths
+    #  without asking it.
+    # Once a file system is at the front of `sys.path`, the import of each module that lives elsewhere first looks for
+    #  "module", "module.mpy" and "module.py" on it, which costs round trips to the server for a remote BLD.
+    # The first lookup that fails in a folder lists it, and the hashes of the names of its children are kept, so the
+    #  next lookups of names that aren't among them fail right away.
+    # The hashes are small ints that are stored without allocating objects, and two names sharing a hash only means
+    #  that the wrapped file system is asked, which is why they can be used instead of the names.
+    # Everything is dropped when a file or folder is created through the wrapper, the changes made to the wrapped file
+    #  system in any other way require a call to `invalidate`.
+    
+    # Maximum number of folders whose children are kept.
+    folder_capacity: int
+    
+    # Lookups answered without the wrapped file system, and failed lookups that were given to it.
+    hits: int
+    misses: int
+    
+    def __init__(self, filesystem, folder_capacity: int = 8):
+        """
+        :param filesystem: File system to wrap, which mustn't be mounted on its own
+        :param folder_capacity: Maximum number of folders whose children are kept, the oldest one is dropped first
+        """
+        self.filesystem = filesystem
+        self.folder_capacity = folder_capacity
+        self.hits = 0
+        self.misses = 0
+        
+        # Normalized path of a folder => Set of the hashes of its children's names, which is empty for missing folders.
+        self._children = {}
+        self._folder_ring = [None] * folder_capacity
+        self._folder_ring_next = 0
+    
+    @property
+    def label(self) -> str:
+        return self.filesystem.label
+    
+    @label.setter
+    def label(self, label: str) -> None:
+        self.filesystem.label = label
+    
+    @property
+    def readonly(self) -> bool:
+        return self.filesystem.readonly
+    
+    def invalidate(self) -> None:
+        """
+        Drops the children of every folder, which has to be done when the wrapped file system is changed directly.
+        :return: None
+        """
+        self._children.clear()
+        for i in range(self.folder_capacity):
+            self._folder_ring[i] = None
+        self._folder_ring_next = 0
+    
+    def _is_missing(self, path: str) -> bool:
+        """
+        Checks if a path is known to be missing from the children of its folder.
+        :param path: Path given by CircuitPython
+        :return: True if the path doesn't exist, False if the wrapped file system has to be asked
+        """
+        # The relative paths depend on the current folder of the wrapped file system, so they are always given to it.
+        normalized = normalize_path(path)
+        if not normalized or not path.startswith("/"):
+            return False
+        
+        parent, name = normalized.rsplit("/", 1) if "/" in normalized else ("", normalized)
+        children = self._children.get(parent)
+        if children is not None and hash(name) not in children:
+            self.hits += 1
+            return True
+        return False
+    
+    def _learn(self, path: str) -> None:
+        """
+        Lists the folder of a path that wasn't found, so that the next lookups in it can be answered.
+        :param path: Path given by CircuitPython
+        :return: None
+        """
+        self.misses += 1
+        if not path.startswith("/"):
+            return
+        
+        normalized = normalize_path(path)
+        parent = normalized.rsplit("/", 1)[0] if "/" in normalized else ""
+        if parent in self._children:
+            return
+        
+        # A missing folder has no children, which makes every path inside of it missing too.
+        try:
+            children = set(hash(entry[0]) for entry in self.filesystem.ilistdir("/" + parent))
+        except OSError:
+            children = set()
+        
+        old_parent = self._folder_ring[self._folder_ring_next]
+        if old_parent is not None:
+            self._children.pop(old_parent, None)
+        self._children[parent] = children
+        self._folder_ring[self._folder_ring_next] = parent
+        self._folder_ring_next = (self._folder_ring_next + 1) % self.folder_capacity
+    
+    def stat(self, path: str) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
+        if self._is_missing(path):
+            raise OSError("[Errno 2] No such file/directory")
+        
+        try:
+            return self.filesystem.stat(path)
+        except OSError:
+            self._learn(path)
+            raise
+    
+    def open(self, path: str, mode: str):
+        # Files opened in the "w" and "a" modes can be created.
+        if "r" in mode:
+            if self._is_missing(path):
+                raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        else:
+            self.invalidate()
+        return self.filesystem.open(path, mode)
+    
+    def ilistdir(self, path: str) -> Iterator[Union[Tuple[AnyStr, int, int, int], Tuple[AnyStr, int, int]]]:
+        return self.filesystem.ilistdir(path)
+    
+    def statvfs(self, path: int) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
+        return self.filesystem.statvfs(path)
+    
+    def mkfs(self, *args) -> None:
+        self.invalidate()
+        return self.filesystem.mkfs(*args)
+    
+    def mkdir(self, path: str) -> None:
+        self.invalidate()
+        return self.filesystem.mkdir(path)
+    
+    def rmdir(self, path: str) -> None:
+        # Removing a file or folder cannot make a missing path exist, so the children that are kept stay valid.
+        return self.filesystem.rmdir(path)
+    
+    def remove(self, path: str) -> None:
+        return self.filesystem.remove(path)
+    
+    def rename(self, old_path: str, new_path: str) -> None:
+        self.invalidate()
+        return self.filesystem.rename(old_path, new_path)
+    
+    def mount(self, readonly: bool, mkfs) -> None:
+        # The wrapped file system is never formatted when it is mounted, since `mkfs` may not be a boolean.
+        return self.filesystem.mount(readonly, False)
+    
+    def umount(self) -> None:
+        return self.filesystem.umount()
+    
+    def chdir(self, path: str) -> None:
+        return self.filesystem.chdir(path)
+    
+    def getcwd(self) -> str:
+        return self.filesystem.getcwd()
+    
+    def utime(self, path: str, times: tuple) -> None:
+        return self.filesystem.utime(path, times)
@@ -0,0 +1,142 @@
+# Imports
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import Callable
+except ImportError:
+    pass
+
+
+# Constants
+# Stored for the paths that don't exist, since None cannot be told apart from a missing key with `dict.get`.
+_NEGATIVE = object()
+
+
+# Code
+def normalize_path(path: str) -> str:
+    """
+    Removes the leading, trailing and repeated "/" of a path, and resolves its "." and "..".
+    :param path: Path relative to the root of a file system
+    :return: Normalized path, which is "" for the root folder
+    """
+    names = []
+    for name in path.split("/"):
+        if name == "..":
+            if names:
+                names.pop()
+        elif name and name != ".":
+            names.append(name)
+    return "/".join(names)
+
+
+class PathCache:
+    # Cache of the path lookups of a file system, which any of them can use by resolving its paths through `lookup`.
+    # CircuitPython looks for many paths on each import, like "module.py", "module.mpy" and "module/__init__.py", and
+    #  asks again for the same ones on each import, so the cache keeps the results of the lookups that failed too.
+    # The paths are normalized once, when they are first looked up, and the results are kept under the path as it was
+    #  given so that the next lookups of the same string only cost a dict lookup.
+    # The names of the children of the listed folders are kept too, which answers the lookups of paths that aren't in
+    #  them without asking the file system.
+    
+    # Maximum number of lookups, and of folders whose children are kept.
+    capacity: int
+    folder_capacity: int
+    
+    # Lookups that were answered by the cache, and lookups that were given to the file system.
+    hits: int
+    misses: int
+    
+    def __init__(self, capacity: int = 64, folder_capacity: int = 8):
+        """
+        :param capacity: Maximum number of lookups kept, the oldest one is dropped once it is reached
+        :param folder_capacity: Maximum number of folders whose children are kept
+        :raises ValueError: If either capacity is lower than 1
+        """
+        if capacity < 1 or folder_capacity < 1:
+            raise ValueError("The capacities of a path cache must be at least 1 !")
+        
+        self.capacity = capacity
+        self.folder_capacity = folder_capacity
+        self.hits = 0
+        self.misses = 0
+        
+        # Given path => Entry given by the file system, or `_NEGATIVE`.
+        # The ring holds the paths in the order they were added, so that the oldest one is dropped first.
+        self._entries = {}
+        self._ring = [None] * capacity
+        self._ring_next = 0
+        
+        # Normalized path of a folder => Set of the names of its children.
+        self._children = {}
+        self._folder_ring = [None] * folder_capacity
+        self._folder_ring_next = 0
+    
+    def lookup(self, path: str, resolve: Callable[[str], object]) -> object:
+        """
+        Returns the entry of a path, which is only looked up by the file system the first time.
+        :param path: Path given to the file system
+        :param resolve: Function that takes a normalized path and returns its entry, or None if it doesn't exist
+        :return: The entry, or None if the path doesn't exist
+        """
+        entry = self._entries.get(path)
+        if entry is not None:
+            self.hits += 1
+            return None if entry is _NEGATIVE else entry
+        
+        normalized = normalize_path(path)
+        
+        # The paths that aren't in a folder whose children are known don't exist.
+        parent, name = normalized.rsplit("/", 1) if "/" in normalized else ("", normalized)
+        children = self._children.get(parent)
+        if normalized and children is not None and name not in children:
+            self.hits += 1
+            entry = None
+        else:
+            self.misses += 1
+            entry = resolve(normalized)
+        
+        self._add(path, _NEGATIVE if entry is None else entry)
+        return entry
+    
+    def listdir(self, path: str, list_folder: Callable[[str], list]) -> list:
+        """
+        Lists a folder through the file system and keeps the names of its children.
+        The listing itself isn't kept, since the sizes it holds can change without the paths changing.
+        :param path: Path of the folder given to the file system
+        :param list_folder: Function that takes a normalized path and returns the `ilistdir` tuples of the folder
+        :return: What the function returned
+        """
+        normalized = normalize_path(path)
+        entries = list_folder(normalized)
+        
+        if normalized not in self._children:
+            old_path = self._folder_ring[self._folder_ring_next]
+            if old_path is not None:
+                self._children.pop(old_path, None)
+            self._folder_ring[self._folder_ring_next] = normalized
+            self._folder_ring_next = (self._folder_ring_next + 1) % self.folder_capacity
+        self._children[normalized] = set(entry[0] for entry in entries)
+        
+        return entries
+    
+    def invalidate(self) -> None:
+        """
+        Drops everything, which has to be done by the file systems each time a file or folder is added or removed.
+        :return: None
+        """
+        self._entries.clear()
+        self._children.clear()
+        for i in range(self.capacity):
+            self._ring[i] = None
+        for i in range(self.folder_capacity):
+            self._folder_ring[i] = None
+        self._ring_next = 0
+        self._folder_ring_next = 0
+    
+    def _add(self, path: str, entry: object) -> None:
+        old_path = self._ring[self._ring_next]
+        if old_path is not None:
+            self._entries.pop(old_path, None)
+        
+        self._entries[path] = entry
+        self._ring[self._ring_next] = path
+        self._ring_next = (self._ring_next + 1) % self.capacity
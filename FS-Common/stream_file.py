@@ -0,0 +1,217 @@
+# Imports
+import io
+
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import Union
+except ImportError:
+    pass
+
+
+# Constants
+# Requests of the MicroPython stream protocol that are given to `StreamFile.ioctl`.
+_STREAM_FLUSH = 1
+_STREAM_CLOSE = 4
+_EINVAL = 22
+
+# CircuitPython only accepts the streams it implements from `open`, or classes built on `io.IOBase` which it reads and
+#  writes through their `readinto` and `write` methods.
+# The file systems check it before opening a `StreamFile`, since builds without it can only get the files copied whole
+#  into an `io.BytesIO` or an `io.StringIO`.
+STREAM_BASE = getattr(io, "IOBase", None)
+
+
+# Code
+class StreamFile(STREAM_BASE or object):
+    # Base of the files that the file systems of this repo open as streams instead of copying them whole.
+    # It reads through `_read_raw`, which each file implements by returning the bytes that follow its position, and
+    #  takes care of decoding text, reading lines, seeking, iterating, and answering CircuitPython's `ioctl` calls.
+    # Text files take and return strings, in which case the sizes given to `read` and `seek` are counted in bytes.
+    
+    # Size of the file in bytes, which the files can also provide as a property.
+    size: int
+    
+    def __init__(self, filesystem, text: bool, position: int = 0):
+        """
+        :param filesystem: File system the file comes from, which is forgotten when the file is closed
+        :param text: Whether strings are used instead of bytes
+        :param position: Initial position in the file
+        """
+        self._filesystem = filesystem
+        self._text = text
+        self._position = position
+    
+    def _check(self) -> None:
+        """
+        Checks that the file can still be used.
+        :return: None
+        :raises OSError: If the file is closed
+        """
+        if self._filesystem is None:
+            raise OSError("[Errno 9] Bad file descriptor")
+    
+    def _read_raw(self) -> memoryview:
+        """
+        Returns the bytes that follow the current position without moving it, at most a chunk or a block of them.
+        :return: Memoryview of the bytes, which is empty at the end of the file
+        :raises OSError: If the file is closed or its content couldn't be read
+        """
+        raise NotImplementedError
+    
+    def _read_bytes(self, size: int) -> bytes:
+        """
+        Reads bytes from the current position.
+        :param size: Number of bytes to read, or -1 to read everything that is left
+        :return: The bytes that were read
+        """
+        self._check()
+        left = max(0, self.size - self._position)
+        if size < 0 or size > left:
+            size = left
+        
+        data = bytearray(size)
+        count = self.readinto(data)
+        return bytes(data[:count]) if count < size else bytes(data)
+    
+    def _decode(self, data: bytes) -> str:
+        """
+        Decodes bytes read from a text file, reading the rest of the last character if it was cut.
+        :param data: Bytes that were read
+        :return: Decoded text
+        """
+        # Looking for the first byte of the last character among the last bytes.
+        for i in range(1, min(4, len(data)) + 1):
+            byte = data[-i]
+            if byte & 0xC0 == 0x80:
+                continue
+            
+            needed = 4 if byte & 0xF8 == 0xF0 else 3 if byte & 0xF0 == 0xE0 else 2 if byte & 0xE0 == 0xC0 else 1
+            if needed > i:
+                data += self._read_bytes(needed - i)
+            break
+        
+        return str(data, "utf-8")
+    
+    def readinto(self, buf) -> int:
+        """
+        Reads bytes from the current position into the given buffer, which is what CircuitPython calls on its own.
+        :param buf: Buffer that is filled
+        :return: Number of bytes that were read, which is lower than the buffer's size at the end of the file
+        """
+        view = memoryview(buf)
+        total = 0
+        
+        while total < len(view):
+            chunk = self._read_raw()
+            if len(chunk) == 0:
+                break
+            
+            count = min(len(chunk), len(view) - total)
+            view[total:total + count] = chunk[:count]
+            total += count
+            self._position += count
+        
+        return total
+    
+    def read(self, size: int = -1) -> Union[str, bytes]:
+        """
+        Reads from the current position.
+        :param size: Number of bytes to read, or -1 to read everything that is left
+        :return: The content that was read
+        """
+        data = self._read_bytes(-1 if size is None else size)
+        return self._decode(data) if self._text else data
+    
+    def readline(self, size: int = -1) -> Union[str, bytes]:
+        """
+        Reads from the current position up to the end of the line, which is kept.
+        :param size: Maximum number of bytes to read, or -1 to read the whole line
+        :return: The line that was read, which is empty at the end of the file
+        """
+        line = bytearray()
+        
+        while size is None or size < 0 or len(line) < size:
+            chunk = self._read_raw()
+            if len(chunk) == 0:
+                break
+            
+            # The chunks are bounded by the files, so copying them to look for the end of the line is bounded too.
+            end = bytes(chunk).find(b"\n")
+            count = len(chunk) if end < 0 else end + 1
+            if size is not None and size >= 0:
+                count = min(count, size - len(line))
+            
+            line += chunk[:count]
+            self._position += count
+            if 0 <= end < count:
+                break
+        
+        return self._decode(bytes(line)) if self._text else bytes(line)
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """
+        Moves the current position, nothing is read until the next read.
+        :param offset: Offset from the position given by `whence`
+        :param whence: 0 for the start of the file, 1 for the current position, and 2 for the end of the file
+        :return: The new position
+        :raises OSError: If the file is closed or if `whence` is invalid
+        """
+        self._check()
+        if whence == 0:
+            position = offset
+        elif whence == 1:
+            position = self._position + offset
+        elif whence == 2:
+            position = self.size + offset
+        else:
+            raise OSError("[Errno 22] Invalid argument")
+        
+        self._position = max(0, position)
+        return self._position
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def flush(self) -> None:
+        return None
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def writable(self) -> bool:
+        return False
+    
+    @property
+    def closed(self) -> bool:
+        return self._filesystem is None
+    
+    def close(self) -> None:
+        self._filesystem = None
+    
+    def ioctl(self, request: int, arg: int) -> int:
+        # Called by CircuitPython for the requests of its stream protocol, seeking cannot be done from here since its
+        #  argument is a pointer.
+        if request == _STREAM_CLOSE:
+            self.close()
+            return 0
+        if request == _STREAM_FLUSH:
+            return 0
+        return -_EINVAL
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> Union[str, bytes]:
+        line = self.readline()
+        if len(line) == 0:
+            raise StopIteration
+        return line
@@ -0,0 +1,19 @@
+# Constants
+# Characters of the paths that are sent as-is in the query of a URL, the other ones are percent-encoded.
+_UNRESERVED_CHARACTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.~/"
+
+
+# Code
+def quote_path(path: str) -> str:
+    """
+    Percent-encodes a path for the query of a URL, since CircuitPython has no `urllib`.
+    :param path: Path to encode, whose "/" are kept
+    :return: Encoded path
+    """
+    encoded = []
+    for byte in path.encode("utf-8"):
+        if byte in _UNRESERVED_CHARACTERS:
+            encoded.append(chr(byte))
+        else:
+            encoded.append("%{:02X}".format(byte))
+    return "".join(encoded)
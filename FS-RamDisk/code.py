@@ -0,0 +1,68 @@
+# MCU's entrypoint
+
+# Checking if we are on CircuitPython.
+import sys
+if sys.implementation.name != "circuitpython":
+    print("ERROR: You are not using a CircuitPython-based implementation of Python !")
+    sys.exit(1)
+
+# Imports
+import os
+import storage
+
+# Requires "FS-Common/stream_file.py"
+import fs_ram
+
+# CONSTANTS
+MOUNTING_POINT = "/ram"
+
+# Code
+print("Preparing the RAM disk file system...")
+fs = fs_ram.RamDiskFileSystem(block_size=512, block_count=32)
+
+
+print("Mounting the file system in '{}' ...".format(MOUNTING_POINT))
+storage.mount(fs, MOUNTING_POINT)
+
+
+print("Checking if we can see it in the MCU's root folder:")
+if MOUNTING_POINT.lstrip("/") in os.listdir("/"):
+    print("> It is present !")
+else:
+    print("> It couldn't be found, exiting !")
+    sys.exit(2)
+
+
+print("Writing a log in '{}' ...".format(MOUNTING_POINT + "/logs/log.txt"))
+os.mkdir(MOUNTING_POINT + "/logs")
+for i in range(3):
+    with open(MOUNTING_POINT + "/logs/log.txt", "a") as f:
+        f.write("Line #{}\n".format(i))
+
+with open(MOUNTING_POINT + "/logs/log.txt", "r") as f:
+    for line in f:
+        print("> {}".format(line.rstrip()))
+
+
+print("Writing a module in '{}' and importing it ...".format(MOUNTING_POINT + "/scratch.py"))
+with open(MOUNTING_POINT + "/scratch.py", "w") as f:
+    f.write("print(\"> Hello world from a module written in RAM :)\")\n")
+
+sys.path.insert(0, MOUNTING_POINT)
+import scratch
+
+
+print("Listing of '{}':".format(MOUNTING_POINT))
+for element in os.listdir(MOUNTING_POINT):
+    print("> {}".format(element))
+
+print("Usage of the file system:")
+stats = os.statvfs(MOUNTING_POINT)
+print("> {} of {} bytes free".format(stats[3] * stats[0], stats[2] * stats[0]))
+
+
+print("Removing the files ...")
+os.remove(MOUNTING_POINT + "/logs/log.txt")
+os.rmdir(MOUNTING_POINT + "/logs")
+os.remove(MOUNTING_POINT + "/scratch.py")
+print("> {}".format(os.listdir(MOUNTING_POINT)))
@@ -0,0 +1,521 @@
+# Imports
+import array
+import io
+import time
+
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import AnyStr, Iterator, Tuple, Union
+except ImportError:
+    pass
+
+try:
+    from storage import VfsFat
+except ImportError:
+    # Only available on CircuitPython.
+    VfsFat = None
+
+from stream_file import STREAM_BASE, StreamFile
+
+# Constants
+# Flags used in the results of `stat` and `ilistdir`, which are also the kinds of the nodes.
+_FLAG_FOLDER = 0x4000
+_FLAG_FILE = 0x8000
+
+# Node of the root folder, which is never freed.
+_ROOT_NODE = 0
+
+
+# Code
+class RamFile(StreamFile):
+    # File of a `RamDiskFileSystem`, which reads and writes the blocks of its node directly.
+    # Builds without `io.IOBase` can only read the files, which are copied whole into an `io.BytesIO` or an
+    #  `io.StringIO`.
+    
+    def __init__(self, filesystem, node: int, text: bool, writable: bool, position: int = 0):
+        """
+        :param filesystem: File system holding the file's node
+        :param node: Index of the file's node
+        :param text: Whether strings are used instead of bytes
+        :param writable: Whether the file was opened in a "w" or "a" mode
+        :param position: Initial position in the file
+        """
+        super().__init__(filesystem, text, position)
+        self._node = node
+        self._generation = filesystem._node_generations[node]
+        self._writable = writable
+    
+    @property
+    def size(self) -> int:
+        return self._filesystem._node_sizes[self._node]
+    
+    def _check(self) -> None:
+        """
+        Checks that the file is still open and that its node wasn't removed in the meantime.
+        :return: None
+        :raises OSError: If the file cannot be used anymore
+        """
+        if self._filesystem is None or self._filesystem._node_generations[self._node] != self._generation:
+            raise OSError("[Errno 9] Bad file descriptor")
+    
+    def _read_raw(self) -> memoryview:
+        """
+        Returns the next bytes of the file without moving its position, up to the end of their block.
+        :return: Memoryview of the bytes, which is empty at the end of the file
+        :raises OSError: If the file cannot be used anymore
+        """
+        self._check()
+        size = self.size
+        if self._position >= size:
+            return memoryview(b"")
+        
+        block_size = self._filesystem.block_size
+        index, offset = divmod(self._position, block_size)
+        block = self._filesystem._node_data[self._node][index]
+        return memoryview(block)[offset:min(block_size, offset + size - self._position)]
+    
+    def write(self, data) -> int:
+        """
+        Writes at the current position, the file grows by whole blocks that are never moved once allocated.
+        :param data: String or bytes-like object to write
+        :return: Number of characters or bytes that were written
+        :raises OSError: If the file is read-only or if there isn't enough space left for the whole data
+        """
+        self._check()
+        if not self._writable:
+            raise OSError("[Errno 9] Bad file descriptor")
+        
+        written = len(data)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        
+        filesystem = self._filesystem
+        blocks = filesystem._node_data[self._node]
+        block_size = filesystem.block_size
+        end = self._position + len(data)
+        
+        # Allocating the missing blocks first so that nothing is written if they cannot all be allocated.
+        needed_blocks = -(-end // block_size) - len(blocks)
+        if needed_blocks > 0:
+            filesystem._allocate_blocks(blocks, needed_blocks)
+        
+        view = memoryview(data)
+        done = 0
+        while done < len(view):
+            index, offset = divmod(self._position, block_size)
+            count = min(block_size - offset, len(view) - done)
+            blocks[index][offset:offset + count] = view[done:done + count]
+            done += count
+            self._position += count
+        
+        if end > filesystem._node_sizes[self._node]:
+            filesystem._node_sizes[self._node] = end
+        filesystem._node_times[self._node] = filesystem._now()
+        
+        return written
+    
+    def writable(self) -> bool:
+        return self._writable
+
+
+class RamDiskFileSystem:
+    # Writable file system held in RAM, meant as a scratch area for logs and temporary data that would otherwise wear
+    #  out the flash and wait for its writes.
+    # Its nodes are kept in a table of fixed size made of arrays, and the content of the files is kept in blocks of
+    #  `block_size` bytes which are allocated as the files grow, and reused once the files are removed or truncated.
+    
+    # The filesystem label, up to 11 case-insensitive bytes.
+    label: str
+    
+    # Whether the file system refuses writes or not.
+    readonly: bool
+    
+    # Size of the blocks, and maximum number of blocks the files can use.
+    block_size: int
+    block_count: int
+    
+    # Maximum number of files and folders, including the root folder.
+    max_nodes: int
+    
+    def __init__(self, label: str = "RAMDISK", readonly: bool = False, block_size: int = 512, block_count: int = 64,
+                 max_nodes: int = 32, path_cache=None):
+        """
+        :param label: Label of the file system, at most 11 bytes long
+        :param readonly: Whether the file system refuses writes
+        :param block_size: Size of the blocks holding the content of the files
+        :param block_count: Maximum number of blocks, which is the capacity of the file system
+        :param max_nodes: Maximum number of files and folders, including the root folder
+        :param path_cache: `PathCache` of "FS-Common/path_cache.py" through which the paths are resolved, or None
+        :raises OSError: If the label is too long
+        """
+        # Preliminary check
+        if len(label.encode('utf-8')) > 11:
+            raise OSError("The given label '{}' is longer than 11 bytes !".format(label))
+        
+        self.label = label
+        self.readonly = readonly
+        self.block_size = block_size
+        self.block_count = block_count
+        self.max_nodes = max_nodes
+        
+        # Node table, indexed by node.
+        # The kinds are 0 for free nodes, and `_FLAG_FILE` or `_FLAG_FOLDER` shifted to fit in a byte otherwise.
+        # The data is the list of blocks of a file, or the name => node dict of a folder.
+        # The generations are incremented each time a node is freed so that the files that are still open on it fail.
+        self._node_kinds = bytearray(max_nodes)
+        self._node_sizes = array.array("L", [0] * max_nodes)
+        self._node_times = array.array("L", [0] * max_nodes)
+        self._node_generations = array.array("H", [0] * max_nodes)
+        self._node_data = [None] * max_nodes
+        
+        # Blocks used by the files, and blocks that were freed and can be given to another file without allocating.
+        self._used_blocks = 0
+        self._free_blocks = []
+        
+        self._cwd = "/"
+        self._path_cache = path_cache
+        self.mkfs()
+    
+    def _now(self) -> int:
+        return int(time.time())
+    
+    def _split(self, path: str) -> list:
+        """
+        Splits a path into the names leading to it from the root folder, resolving "." and "..".
+        :param path: Absolute path, or path relative to the current folder
+        :return: List of names, which is empty for the root folder
+        """
+        if not path.startswith("/"):
+            path = self._cwd + "/" + path
+        
+        names = []
+        for name in path.split("/"):
+            if name == "..":
+                if names:
+                    names.pop()
+            elif name not in ("", "."):
+                names.append(name)
+        return names
+    
+    def _find(self, names: list) -> int:
+        """
+        Looks a node up from the root folder.
+        :param names: Names leading to the node
+        :return: Index of the node, or -1 if it doesn't exist
+        """
+        node = _ROOT_NODE
+        for name in names:
+            if self._node_kinds[node] != _FLAG_FOLDER >> 8:
+                return -1
+            node = self._node_data[node].get(name, -1)
+            if node < 0:
+                return -1
+        return node
+    
+    def _absolute(self, path: str) -> str:
+        # The relative paths are made absolute for the path cache, since the current folder isn't part of its keys.
+        return path if path.startswith("/") else self._cwd + "/" + path
+    
+    def _resolve(self, path: str) -> int:
+        node = self._find(self._split("/" + path))
+        return None if node < 0 else node
+    
+    def _lookup(self, path: str) -> int:
+        """
+        Looks a node up through the path cache if there is one.
+        :param path: Absolute path, or path relative to the current folder
+        :return: Index of the node, or -1 if it doesn't exist
+        """
+        if self._path_cache is None:
+            return self._find(self._split(path))
+        
+        node = self._path_cache.lookup(self._absolute(path), self._resolve)
+        return -1 if node is None else node
+    
+    def _invalidate(self) -> None:
+        # Called each time a file or folder is added or removed, which changes the results of the lookups.
+        if self._path_cache is not None:
+            self._path_cache.invalidate()
+    
+    def _find_parent(self, names: list, path: str) -> int:
+        """
+        Looks up the folder in which a node is, or would be, created.
+        :param names: Names leading to the node
+        :param path: Path used in the errors
+        :return: Index of the folder's node
+        :raises OSError: If the folder doesn't exist, or if the path is the root folder
+        """
+        if not names:
+            raise OSError("[Errno 1] Operation not permitted: {}".format(path))
+        
+        parent = self._find(names[:-1])
+        if parent < 0:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        if self._node_kinds[parent] != _FLAG_FOLDER >> 8:
+            raise OSError("[Errno 20] Not a directory: {}".format(path))
+        return parent
+    
+    def _check_writable(self) -> None:
+        if self.readonly:
+            raise OSError("[Errno 30] Read-only file system")
+    
+    def _create_node(self, parent: int, name: str, kind: int) -> int:
+        """
+        Takes a free node of the table and adds it to a folder.
+        :param parent: Node of the folder
+        :param name: Name of the node in the folder
+        :param kind: `_FLAG_FILE` or `_FLAG_FOLDER`
+        :return: Index of the new node
+        :raises OSError: If the node table is full
+        """
+        for node in range(self.max_nodes):
+            if self._node_kinds[node] == 0:
+                break
+        else:
+            raise OSError("[Errno 28] No space left on device")
+        
+        self._node_kinds[node] = kind >> 8
+        self._node_sizes[node] = 0
+        self._node_times[node] = self._now()
+        self._node_data[node] = [] if kind == _FLAG_FILE else {}
+        
+        self._node_data[parent][name] = node
+        self._node_times[parent] = self._node_times[node]
+        self._invalidate()
+        return node
+    
+    def _free_node(self, parent: int, name: str) -> None:
+        """
+        Removes a node from its folder and frees it along with its blocks.
+        :param parent: Node of the folder
+        :param name: Name of the node in the folder
+        :return: None
+        """
+        node = self._node_data[parent].pop(name)
+        if self._node_kinds[node] == _FLAG_FILE >> 8:
+            self._release_blocks(self._node_data[node])
+        
+        self._node_kinds[node] = 0
+        self._node_data[node] = None
+        self._node_generations[node] = (self._node_generations[node] + 1) & 0xFFFF
+        self._node_times[parent] = self._now()
+        self._invalidate()
+    
+    def _allocate_blocks(self, blocks: list, count: int) -> None:
+        """
+        Appends zeroed blocks to the blocks of a file.
+        :param blocks: Blocks of the file
+        :param count: Number of blocks to append
+        :return: None
+        :raises OSError: If there aren't enough free blocks left
+        """
+        if self._used_blocks + count > self.block_count:
+            raise OSError("[Errno 28] No space left on device")
+        
+        for _ in range(count):
+            if self._free_blocks:
+                block = self._free_blocks.pop()
+                block[:] = bytes(self.block_size)
+            else:
+                block = bytearray(self.block_size)
+            blocks.append(block)
+        self._used_blocks += count
+    
+    def _release_blocks(self, blocks: list) -> None:
+        """
+        Takes all the blocks of a file, which keeps its list, and keeps them for the next files.
+        :param blocks: Blocks of the file
+        :return: None
+        """
+        self._used_blocks -= len(blocks)
+        self._free_blocks.extend(blocks)
+        del blocks[:]
+    
+    def mkfs(self) -> None:
+        # Deletes every file and folder, the blocks that were allocated are kept to be reused.
+        for node in range(self.max_nodes):
+            if self._node_kinds[node] == _FLAG_FILE >> 8:
+                self._release_blocks(self._node_data[node])
+            if self._node_kinds[node] != 0:
+                self._node_generations[node] = (self._node_generations[node] + 1) & 0xFFFF
+            self._node_kinds[node] = 0
+            self._node_data[node] = None
+        
+        self._node_kinds[_ROOT_NODE] = _FLAG_FOLDER >> 8
+        self._node_sizes[_ROOT_NODE] = 0
+        self._node_times[_ROOT_NODE] = self._now()
+        self._node_data[_ROOT_NODE] = {}
+        self._cwd = "/"
+        self._invalidate()
+    
+    def open(self, path: str, mode: str) -> Union[RamFile, io.StringIO, io.BytesIO]:
+        # Modes "r" open an existing file, "w" create or truncate one, and "a" create one or write at its end.
+        if mode not in ["r", "rb", "rt", "w", "wb", "wt", "a", "ab", "at"]:
+            raise ValueError("Invalid mode")
+        text = not mode.endswith("b")
+        
+        node = self._lookup(path)
+        
+        if mode[0] == "r":
+            if node < 0:
+                raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        else:
+            self._check_writable()
+            if STREAM_BASE is None:
+                raise OSError("[Errno 95] Writing requires 'io.IOBase': {}".format(path))
+            
+            if node < 0:
+                names = self._split(path)
+                node = self._create_node(self._find_parent(names, path), names[-1], _FLAG_FILE)
+            elif mode[0] == "w" and self._node_kinds[node] == _FLAG_FILE >> 8:
+                self._release_blocks(self._node_data[node])
+                self._node_sizes[node] = 0
+                self._node_times[node] = self._now()
+        
+        if self._node_kinds[node] == _FLAG_FOLDER >> 8:
+            raise OSError("[Errno 21] Is a directory: {}".format(path))
+        
+        if STREAM_BASE is None:
+            file = RamFile(self, node, False, False)
+            data = file.read()
+            return io.StringIO(str(data, "utf-8")) if text else io.BytesIO(data)
+        
+        return RamFile(self, node, text, mode[0] != "r", self._node_sizes[node] if mode[0] == "a" else 0)
+    
+    def stat(self, path: str) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
+        node = self._lookup(path)
+        if node < 0:
+            # This is required by CircuitPython to tell that a module doesn't exist while processing imports.
+            raise OSError("[Errno 2] No such file/directory")
+        
+        timestamp = self._node_times[node]
+        return (self._node_kinds[node] << 8, 0, 0, 0, 0, 0, self._node_sizes[node], timestamp, timestamp, timestamp)
+    
+    def statvfs(self, path: int) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
+        # We return a tuple saying the following:
+        #   * Our blocks(0) and fragments(1) are `block_size` bytes long
+        #   * We have a total of `block_count` blocks(3), and the ones that aren't used by files are available(4)(5)
+        #   * We have `max_nodes` inodes in total(6), and the ones that aren't used by files and folders are free(7)(8)
+        #   * We don't have mount flags (9)
+        #   * The maximum filename is 255(10)
+        free_blocks = self.block_count - self._used_blocks
+        free_nodes = self._node_kinds.count(0) if hasattr(self._node_kinds, "count") else \
+            len([kind for kind in self._node_kinds if kind == 0])
+        return (self.block_size, self.block_size, self.block_count, free_blocks, free_blocks,
+                self.max_nodes, free_nodes, free_nodes, 0, 255)
+    
+    def ilistdir(self, path: str) -> Iterator[Union[Tuple[AnyStr, int, int, int], Tuple[AnyStr, int, int]]]:
+        node = self._lookup(path)
+        if node < 0:
+            raise OSError("[Errno 2] No such file/directory")
+        if self._node_kinds[node] != _FLAG_FOLDER >> 8:
+            raise OSError("[Errno 20] Not a directory")
+        
+        # The listing is copied so that the folder can be changed while it is iterated.
+        # The path cache keeps the names of the folder's children, which answers the lookups of the missing ones.
+        if self._path_cache is not None:
+            return iter(self._path_cache.listdir(self._absolute(path), lambda normalized: self._list_folder(node)))
+        return iter(self._list_folder(node))
+    
+    def _list_folder(self, node: int) -> list:
+        return [
+            (name, self._node_kinds[child] << 8, 0, self._node_sizes[child])
+            for name, child in self._node_data[node].items()
+        ]
+    
+    def mkdir(self, path: str) -> None:
+        self._check_writable()
+        names = self._split(path)
+        if self._find(names) >= 0:
+            raise OSError("[Errno 17] File exists: {}".format(path))
+        self._create_node(self._find_parent(names, path), names[-1], _FLAG_FOLDER)
+    
+    def rmdir(self, path: str) -> None:
+        self._check_writable()
+        names = self._split(path)
+        node = self._find(names)
+        if node < 0:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        if node == _ROOT_NODE:
+            raise OSError("[Errno 1] Operation not permitted: {}".format(path))
+        if self._node_kinds[node] != _FLAG_FOLDER >> 8:
+            raise OSError("[Errno 20] Not a directory: {}".format(path))
+        if self._node_data[node]:
+            raise OSError("[Errno 39] Directory not empty: {}".format(path))
+        
+        self._free_node(self._find(names[:-1]), names[-1])
+    
+    def mount(self, readonly: bool, mkfs: VfsFat) -> None:
+        # Called when mounting with `storage.mount`, the content is kept between mounts.
+        if readonly:
+            self.readonly = True
+        return None
+    
+    def umount(self) -> None:
+        return None
+    
+    def remove(self, path: str) -> None:
+        # Called when deleting a file, with the same signature as `os.remove`.
+        self._check_writable()
+        names = self._split(path)
+        node = self._find(names)
+        if node < 0:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        if self._node_kinds[node] != _FLAG_FILE >> 8:
+            raise OSError("[Errno 21] Is a directory: {}".format(path))
+        
+        self._free_node(self._find(names[:-1]), names[-1])
+    
+    def chdir(self, path: str) -> None:
+        # Called by `os.chdir` with a path relative to the mounting point.
+        names = self._split(path)
+        node = self._find(names)
+        if node < 0:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        if self._node_kinds[node] != _FLAG_FOLDER >> 8:
+            raise OSError("[Errno 20] Not a directory: {}".format(path))
+        
+        self._cwd = "/" + "/".join(names)
+    
+    def getcwd(self) -> str:
+        # Called by `os.getcwd`, which adds the mounting point in front of it.
+        return self._cwd
+    
+    def rename(self, old_path: str, new_path: str) -> None:
+        # Called when renaming or moving a file or folder, with the same signature as `os.rename`.
+        # An existing file is replaced by a file, while existing folders are never replaced.
+        self._check_writable()
+        old_names = self._split(old_path)
+        new_names = self._split(new_path)
+        
+        node = self._find(old_names)
+        if node < 0:
+            raise OSError("[Errno 2] No such file/directory: {}".format(old_path))
+        if node == _ROOT_NODE:
+            raise OSError("[Errno 22] Invalid argument: {}".format(new_path))
+        
+        # Renaming a path to itself does nothing, while a folder cannot be moved into itself.
+        if new_names == old_names:
+            return
+        if len(new_names) > len(old_names) and new_names[:len(old_names)] == old_names:
+            raise OSError("[Errno 22] Invalid argument: {}".format(new_path))
+        
+        new_parent = self._find_parent(new_names, new_path)
+        existing = self._node_data[new_parent].get(new_names[-1], -1)
+        if existing >= 0:
+            if self._node_kinds[existing] != _FLAG_FILE >> 8 or self._node_kinds[node] != _FLAG_FILE >> 8:
+                raise OSError("[Errno 17] File exists: {}".format(new_path))
+            self._free_node(new_parent, new_names[-1])
+        
+        old_parent = self._find(old_names[:-1])
+        del self._node_data[old_parent][old_names[-1]]
+        self._node_data[new_parent][new_names[-1]] = node
+        self._node_times[old_parent] = self._node_times[new_parent] = self._now()
+        self._invalidate()
+    
+    def utime(self, path: str, times: tuple) -> None:
+        # Called by `os.utime`, only the modification time is kept.
+        node = self._lookup(path)
+        if node < 0:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        self._node_times[node] = int(times[1])
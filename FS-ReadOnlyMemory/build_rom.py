@@ -0,0 +1,115 @@
+# Desktop tool that packs a folder into a ROM image which "fs_rom.py" can mount from a file or a buffer.
+# The image is checked by mounting it once it is written.
+
+# Imports
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+# "fs_rom.py" is built on the stream base of "FS-Common", which is only next to this folder in the repository.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FS-Common"))
+
+from fs_rom import ROM_IMAGE_MAGIC, ROM_IMAGE_VERSION, ROM_IMAGE_HEADER_FORMAT, ROM_IMAGE_HEADER_SIZE, \
+    ROM_IMAGE_ENTRY_FORMAT, ROM_IMAGE_ENTRY_SIZE, ROM_IMAGE_FLAG_ZLIB, ReadOnlyMemoryFileSystem
+
+
+# Constants
+# Files and folders that are never packed.
+IGNORED_NAMES = ["__pycache__", ".git", ".DS_Store"]
+
+
+# Code
+def collect_files(source_folder: str) -> list:
+    """
+    Lists the files of a folder and its sub-folders, sorted by path so that the images are reproducible.
+    :param source_folder: Folder to pack
+    :return: List of (path relative to the folder using "/", path on the disk) tuples
+    """
+    files = []
+    
+    for folder, sub_folders, file_names in os.walk(source_folder):
+        sub_folders[:] = [name for name in sub_folders if name not in IGNORED_NAMES]
+        for file_name in file_names:
+            if file_name in IGNORED_NAMES:
+                continue
+            disk_path = os.path.join(folder, file_name)
+            files.append((os.path.relpath(disk_path, source_folder).replace(os.sep, "/"), disk_path))
+    
+    return sorted(files)
+
+
+def build_image(files: list, compress: bool = False) -> bytes:
+    """
+    Packs the given files into a ROM image.
+    :param files: List of (path in the image, content) tuples
+    :param compress: Whether the files are compressed with zlib when it makes them smaller
+    :return: The image
+    :raises ValueError: If a path or a file is too large for the image's format
+    """
+    names = bytearray()
+    blobs = []
+    entries = []
+    
+    for path, content in files:
+        name = path.strip("/").encode("utf-8")
+        if len(name) > 0xFFFF:
+            raise ValueError("The path '{}' is too long !".format(path))
+        
+        stored, flags = content, 0
+        if compress:
+            compressed = zlib.compress(content, 9)
+            if len(compressed) < len(content):
+                stored, flags = compressed, ROM_IMAGE_FLAG_ZLIB
+        
+        entries.append([0, len(stored), len(content), len(names), len(name), flags])
+        names += name
+        blobs.append(stored)
+    
+    # The offsets of the data are only known once the size of the directory table and the names is.
+    offset = ROM_IMAGE_HEADER_SIZE + len(entries) * ROM_IMAGE_ENTRY_SIZE + len(names)
+    for entry, blob in zip(entries, blobs):
+        entry[0] = offset
+        offset += len(blob)
+    if offset > 0xFFFFFFFF:
+        raise ValueError("The image would be larger than 4 GiB !")
+    
+    image = bytearray(struct.pack(ROM_IMAGE_HEADER_FORMAT, ROM_IMAGE_MAGIC, ROM_IMAGE_VERSION, 0, len(entries),
+                                  len(names)))
+    for entry in entries:
+        image += struct.pack(ROM_IMAGE_ENTRY_FORMAT, *entry)
+    image += names
+    for blob in blobs:
+        image += blob
+    
+    return bytes(image)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Packs a folder into a ROM image for \"fs_rom.py\".")
+    parser.add_argument("source", help="Folder to pack.")
+    parser.add_argument("output", help="Image file to write.")
+    parser.add_argument("--compress", action="store_true",
+                        help="Compresses each file with zlib when it makes it smaller.  (Requires the 'zlib' module)")
+    args = parser.parse_args()
+    
+    print("Packing '{}' ...".format(args.source))
+    source_files = []
+    for file_path, file_disk_path in collect_files(args.source):
+        with open(file_disk_path, "rb") as f:
+            source_files.append((file_path, f.read()))
+    
+    rom_image = build_image(source_files, args.compress)
+    with open(args.output, "wb") as f:
+        f.write(rom_image)
+    
+    print("Checking '{}' ...".format(args.output))
+    filesystem = ReadOnlyMemoryFileSystem(image=args.output)
+    for file_path, file_content in source_files:
+        if filesystem.read_file(file_path) != file_content:
+            raise ValueError("The file '{}' doesn't match its source !".format(file_path))
+    filesystem.close()
+    
+    print("> Done !  ({} files, {} bytes of content, {} bytes in the image)".format(
+        len(source_files), sum(len(file_content) for _, file_content in source_files), len(rom_image)))
@@ -10,14 +10,29 @@ if sys.implementation.name != "circuitpython":
 import os
 import storage
 
+# Requires "FS-Common/stream_file.py"
 import fs_rom
 
 # CONSTANTS
 MOUNTING_POINT = "/rom"
 
+# Image made by "build_rom.py" that is mounted instead of the files of "fs_rom.py", or None.
+# The image has to contain the "test.txt", "test.py" and "package/module.py" files used below.
+ROM_IMAGE_PATH = None
+
+# Whether the calls made by CircuitPython to the file system should be counted and printed at the end.
+# (Requires "Harness/instrumentation.py")
+INSTRUMENT = False
+
 # Code
 print("Preparing the read-only memory file system...")
-fs = fs_rom.ReadOnlyMemoryFileSystem()
+fs = fs_rom.ReadOnlyMemoryFileSystem(image=ROM_IMAGE_PATH)
+
+fs_instrumentation = None
+if INSTRUMENT:
+    import instrumentation
+    fs_instrumentation = instrumentation.Instrumentation()
+    instrumentation.instrument(fs, fs_instrumentation)
 
 
 print("Mounting the file system in '{}' ...".format(MOUNTING_POINT))
@@ -68,3 +83,12 @@ print("> New: {}".format(sys.path))
 
 print("Importing the 'test' module from '{}'".format(MOUNTING_POINT + "/test.py"))
 import test
+
+
+print("Importing the 'package.module' module from '{}'".format(MOUNTING_POINT + "/package/module.py"))
+import package.module
+
+
+if fs_instrumentation is not None:
+    print("Calls made to the file system:")
+    fs_instrumentation.dump()
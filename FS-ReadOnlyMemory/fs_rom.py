@@ -1,84 +1,405 @@
 # Imports
 import io
+import struct
+
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import AnyStr, Iterator, Tuple, Union
+except ImportError:
+    pass
+
+try:
+    from storage import VfsFat
+except ImportError:
+    # Only available on CircuitPython, "build_rom.py" imports this file on a computer.
+    VfsFat = None
+
+from stream_file import STREAM_BASE, StreamFile
+
+# Only needed by the compressed files of packed images, CircuitPython's version can only decompress data.
+try:
+    import zlib
+except ImportError:
+    zlib = None
 
 # Constants
-__FILE_SYSTEM_CONTENT = [
-    ["test.txt",    "Hello world from a text file !"],
-    ["test.py",     "print(\"> Hello world from a fake .py file :)\")"],
-    ["__init__.py", ""],
+# Files provided by the file system, given as their path relative to its root and their content.
+# Folders are created from the paths, so "package/module.py" creates the "package" folder.
+_FILE_SYSTEM_CONTENT = [
+    ["test.txt",             "Hello world from a text file !"],
+    ["test.py",              "print(\"> Hello world from a fake .py file :)\")"],
+    ["__init__.py",          ""],
+    ["package/__init__.py",  ""],
+    ["package/module.py",    "print(\"> Hello world from a nested .py file :)\")"],
 ]
 
+# Flags used in the results of `stat` and `ilistdir`.
+_FLAG_FOLDER = 0x4000
+_FLAG_FILE = 0x8000
+
+# Packed images, as made by "build_rom.py", are laid out as follows:
+#   * Header: Magic, version, reserved, number of files, size of the names.
+#   * Directory table: One entry per file with the absolute offset of its data, its stored size, its size, the offset
+#      and length of its path in the names, and its flags.
+#   * Names: The UTF-8 paths of the files, one after the other.
+#   * Data: The content of each file, one after the other, optionally compressed with zlib.
+# Every value is little-endian, and the data of a file is contiguous so it can be served as a slice of the image.
+ROM_IMAGE_MAGIC = b"ROMF"
+ROM_IMAGE_VERSION = 1
+ROM_IMAGE_HEADER_FORMAT = "<4sHHII"
+ROM_IMAGE_HEADER_SIZE = 16
+ROM_IMAGE_ENTRY_FORMAT = "<IIIIHH"
+ROM_IMAGE_ENTRY_SIZE = 20
+
+# Flags of the directory table's entries.
+ROM_IMAGE_FLAG_ZLIB = 0x0001
+
+# Bytes read at once by the streamed files, and size below which files are copied whole into the usual stream types.
+DEFAULT_CHUNK_SIZE = 512
+
 # Code
+class RomFile(StreamFile):
+    # Read-only file of a `ReadOnlyMemoryFileSystem` which reads its content on demand instead of copying it whole.
+    # Files held in a buffer are sliced directly, while the ones held by the image's file are read through a chunk
+    #  buffer that is given back to the file system when the file is closed, so that the next file can reuse it.
+    
+    def __init__(self, filesystem, source, offset: int, size: int, text: bool):
+        """
+        :param filesystem: File system from which the image's file and the chunk buffer come from
+        :param source: Memoryview holding the file's content, or None if it is in the image's file
+        :param offset: Offset of the file's content in its source
+        :param size: Size of the file
+        :param text: Whether strings are returned instead of bytes
+        """
+        super().__init__(filesystem, text)
+        self.size = size
+        self._source = source
+        self._offset = offset
+        
+        # Position in the file of the chunk buffer's first byte, and number of bytes it holds.
+        self._buffer = filesystem._take_buffer() if source is None else None
+        self._buffer_start = 0
+        self._buffer_length = 0
+    
+    def _read_raw(self) -> memoryview:
+        """
+        Returns the next bytes of the file without moving its position, at most a chunk of them.
+        :return: Memoryview of the bytes, which is empty at the end of the file
+        :raises OSError: If the file is closed or the image is truncated
+        """
+        self._check()
+        
+        if self._source is not None:
+            start = self._offset + self._position
+            return self._source[start:min(start + self._filesystem.chunk_size, self._offset + self.size)]
+        
+        index = self._position - self._buffer_start
+        if not (0 <= index < self._buffer_length):
+            length = max(0, min(len(self._buffer), self.size - self._position))
+            image_file = self._filesystem._image_file
+            image_file.seek(self._offset + self._position)
+            if length > 0 and image_file.readinto(memoryview(self._buffer)[:length]) != length:
+                raise OSError("The ROM image is truncated !")
+            
+            self._buffer_start = self._position
+            self._buffer_length = length
+            index = 0
+        
+        return memoryview(self._buffer)[index:self._buffer_length]
+    
+    def _read_bytes(self, size: int) -> bytes:
+        # Files held in a buffer are sliced in one go instead of a chunk at a time.
+        if self._source is None:
+            return super()._read_bytes(size)
+        
+        self._check()
+        left = max(0, self.size - self._position)
+        if size < 0 or size > left:
+            size = left
+        
+        start = self._offset + self._position
+        self._position += size
+        return bytes(self._source[start:start + size])
+    
+    def close(self) -> None:
+        """
+        Closes the file and gives its chunk buffer back to the file system.
+        :return: None
+        """
+        if self._filesystem is not None:
+            if self._buffer is not None:
+                self._filesystem._release_buffer(self._buffer)
+                self._buffer = None
+            super().close()
+
+
 class ReadOnlyMemoryFileSystem:
     label: str
     readonly: bool
     
+    # Bytes read at once by the streamed files.
+    chunk_size: int
     
-    def __init__(self, label: str = "ROM", readonly: bool = False):
+    
+    def __init__(self, label: str = "ROM", readonly: bool = False, content: list = None, image=None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, path_cache=None):
+        """
+        :param label: Label of the file system, at most 11 bytes long
+        :param readonly: Unused, the file system is always read-only
+        :param content: List of [path, text] files, `_FILE_SYSTEM_CONTENT` is used if neither it or `image` are given
+        :param image: Packed image made by "build_rom.py", given as the path of a file or as a bytes-like buffer
+        :param chunk_size: Bytes read at once by the opened files, larger files are streamed instead of being copied
+        :param path_cache: `PathCache` of "FS-Common/path_cache.py" through which the paths are resolved, or None
+        :raises OSError: If the label, the paths or the image are invalid
+        """
         # Preliminary check
         if len(label.encode('utf-8')) > 11:
             raise OSError("The given label '{}' is longer than 11 bytes !".format(label))
         
         self.label = label
         self.readonly = readonly
+        self.chunk_size = chunk_size
+        self._path_cache = path_cache
+        
+        # Chunk buffers of the streamed files that were closed, which are reused by the next ones.
+        self._free_buffers = []
+        
+        # Building the index once since CircuitPython calls `stat` many times for each import.
+        # Path => (Stat tuple, source, offset, stored size, flags) for the files, and (Stat tuple, ilistdir tuples) for
+        #  the folders.
+        # The source is a memoryview holding the data, or None if it has to be read from the image's file.
+        # The paths have no leading or trailing "/", the root folder being "".
+        self._files = {}
+        self._folders = {"": ((_FLAG_FOLDER, 0, 0, 0, 0, 0, 0, 0, 0, 0), [])}
+        self._image_file = None
+        
+        if image is not None:
+            self._load_image(image)
+        else:
+            for file_path, text in (_FILE_SYSTEM_CONTENT if content is None else content):
+                data = text.encode("utf-8")
+                self._add_file(file_path, memoryview(data), 0, len(data), len(data), 0)
+    
+    
+    def _add_file(self, file_path: str, source, offset: int, stored_size: int, size: int, flags: int) -> None:
+        """
+        Adds a file to the index, along with any missing parent folder.
+        :param file_path: Path of the file relative to the root
+        :param source: Memoryview holding the file's data, or None if it is in the image's file
+        :param offset: Offset of the file's data in its source
+        :param stored_size: Bytes used by the file's data in its source
+        :param size: Size of the file once decompressed
+        :param flags: Flags of the image's directory table
+        :return: None
+        :raises OSError: If the path is already used
+        """
+        file_path = file_path.strip("/")
+        
+        if file_path in self._files or file_path in self._folders:
+            raise OSError("The path '{}' is given more than once !".format(file_path))
+        self._files[file_path] = ((_FLAG_FILE, 0, 0, 0, 0, 0, size, 0, 0, 0), source, offset, stored_size, flags)
+        
+        # Adding the file and any missing parent folder to the listing of their parent.
+        name = file_path
+        entry = (file_path.rsplit("/", 1)[-1], _FLAG_FILE, 0, size)
+        while True:
+            parent = name.rsplit("/", 1)[0] if "/" in name else ""
+            is_new_parent = parent not in self._folders
+            if is_new_parent:
+                if parent in self._files:
+                    raise OSError("The path '{}' is used by a file and a folder !".format(parent))
+                self._folders[parent] = ((_FLAG_FOLDER, 0, 0, 0, 0, 0, 0, 0, 0, 0), [])
+            
+            self._folders[parent][1].append(entry)
+            if not is_new_parent:
+                break
+            
+            name = parent
+            entry = (parent.rsplit("/", 1)[-1], _FLAG_FOLDER, 0, 0)
+    
+    
+    def _load_image(self, image) -> None:
+        """
+        Indexes the files of a packed image without reading their data.
+        Buffers are kept as-is and sliced when a file is read, while files are only read for their directory table and
+         kept open to read the data of each file when it is opened.
+        :param image: Path of the image's file, or bytes-like buffer holding the image
+        :return: None
+        :raises OSError: If the image is invalid or truncated
+        """
+        source = None
+        if isinstance(image, str):
+            self._image_file = open(image, "rb")
+            header = self._image_file.read(ROM_IMAGE_HEADER_SIZE)
+        else:
+            source = memoryview(image)
+            header = source[:ROM_IMAGE_HEADER_SIZE]
+        
+        if len(header) != ROM_IMAGE_HEADER_SIZE:
+            raise OSError("The ROM image is truncated !")
+        magic, version, _, file_count, names_size = struct.unpack(ROM_IMAGE_HEADER_FORMAT, header)
+        if magic != ROM_IMAGE_MAGIC:
+            raise OSError("The given image isn't a ROM image !")
+        if version != ROM_IMAGE_VERSION:
+            raise OSError("The ROM image's version '{}' isn't supported !".format(version))
+        
+        table_size = file_count * ROM_IMAGE_ENTRY_SIZE
+        if source is None:
+            table = self._image_file.read(table_size + names_size)
+        else:
+            table = source[ROM_IMAGE_HEADER_SIZE:ROM_IMAGE_HEADER_SIZE + table_size + names_size]
+        if len(table) != table_size + names_size:
+            raise OSError("The ROM image is truncated !")
+        
+        for i in range(file_count):
+            offset, stored_size, size, name_offset, name_length, flags = struct.unpack_from(
+                ROM_IMAGE_ENTRY_FORMAT, table, i * ROM_IMAGE_ENTRY_SIZE)
+            name_offset += table_size
+            self._add_file(str(table[name_offset:name_offset + name_length], "utf-8"),
+                           source, offset, stored_size, size, flags)
+    
+    
+    def _resolve(self, path: str) -> tuple:
+        """
+        Returns the index's entry of a file or folder.
+        :param path: Path without leading or trailing "/"
+        :return: Entry of the file or folder, or None if it doesn't exist
+        """
+        entry = self._files.get(path)
+        if entry is None:
+            entry = self._folders.get(path)
+        return entry
+    
+    
+    def _lookup(self, path: str) -> tuple:
+        """
+        Returns the index's entry of a file or folder through the path cache if there is one.
+        :param path: Path given by CircuitPython
+        :return: Entry of the file or folder, or None if it doesn't exist
+        """
+        if self._path_cache is not None:
+            return self._path_cache.lookup(path, self._resolve)
+        
+        # The strip call is required since CircuitPython gives paths starting with "/".
+        return self._resolve(path.strip("/"))
+    
+    
+    def read_file(self, path: str) -> memoryview:
+        """
+        Returns the content of a file, which is a slice of the image's buffer if it isn't compressed.
+        Files that are compressed, or held by the image's file, are read in a buffer of their own size.
+        :param path: Path of the file
+        :return: Memoryview of the file's content
+        :raises OSError: If the file doesn't exist or cannot be read
+        """
+        file_entry = self._lookup(path)
+        if file_entry is None or file_entry[0][0] & _FLAG_FOLDER:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        
+        _, source, offset, stored_size, flags = file_entry
+        if source is not None:
+            data = source[offset:offset + stored_size]
+        else:
+            data = bytearray(stored_size)
+            self._image_file.seek(offset)
+            if self._image_file.readinto(data) != stored_size:
+                raise OSError("The ROM image is truncated !")
+        
+        if flags & ROM_IMAGE_FLAG_ZLIB:
+            if zlib is None:
+                raise OSError("The file '{}' is compressed and the 'zlib' module isn't available !".format(path))
+            data = zlib.decompress(data)
+        
+        return memoryview(data)
+    
+    
+    def _take_buffer(self) -> bytearray:
+        """
+        Returns a chunk buffer for a streamed file, reusing the one of a closed file if possible.
+        :return: Buffer of `chunk_size` bytes
+        """
+        if self._free_buffers:
+            return self._free_buffers.pop()
+        return bytearray(self.chunk_size)
+    
+    
+    def _release_buffer(self, buffer: bytearray) -> None:
+        """
+        Keeps the chunk buffer of a closed file for the next streamed file.
+        :param buffer: Buffer given by `_take_buffer`
+        :return: None
+        """
+        self._free_buffers.append(buffer)
+    
+    
+    def close(self) -> None:
+        """
+        Closes the image's file, if the image was given as one.
+        :return: None
+        """
+        if self._image_file is not None:
+            self._image_file.close()
+            self._image_file = None
     
     
     def open(self, path: str, mode: str) -> Union[None, io.StringIO, io.BytesIO]:
         # Preliminary checks
         if not (mode in ["r", "rb", "rt"]):
             raise OSError("The mode '{}' isn't supported".format(mode))
-            
-        # Checking if the requested file exists
-        requested_content: Union[None, str] = None
         
-        for file_data in __FILE_SYSTEM_CONTENT:
-            # Checking the filename  (The lstrip call is required !)
-            if file_data[0] == path.lstrip("/"):
-                requested_content = file_data[1]
-                break
+        # Checking if the requested file exists
+        file_entry = self._lookup(path)
         
-        if requested_content is None:
+        if file_entry is None:
             # The file wasn't found.
             raise OSError("[Errno 2] No such file/directory: {}".format(path))
         
+        if file_entry[0][0] & _FLAG_FOLDER:
+            raise OSError("[Errno 21] Is a directory: {}".format(path))
+        
         # Returning the file's content.
+        # Files that fit in a chunk are copied once into CircuitPython's own stream types, directly from the slice.
+        # Larger ones are streamed, except if they are compressed since CircuitPython can only decompress them whole.
+        size = file_entry[0][6]
+        
+        if size > self.chunk_size and STREAM_BASE is not None:
+            if file_entry[4] & ROM_IMAGE_FLAG_ZLIB:
+                return RomFile(self, self.read_file(path), 0, size, not mode.endswith("b"))
+            return RomFile(self, file_entry[1], file_entry[2], size, not mode.endswith("b"))
+        
+        data = self.read_file(path)
         if mode.endswith("b"):
-            return io.BytesIO(requested_content)
+            return io.BytesIO(data)
         else:
-            return io.StringIO(requested_content)
+            return io.StringIO(str(data, "utf-8"))
     
     
     def stat(self, path: str) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
-        # If the file system's root folder is request, we just say it exists.
-        if path == "/":
-            return (0x4000, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-        
-        # If we have any other path, we check if it is corresponds to one of the files provided by this file system.
-        requested_content: Union[None, str] = None
-        
-        for file_data in __FILE_SYSTEM_CONTENT:
-            # Checking the filename  (The lstrip call is required !)
-            if file_data[0] == path.lstrip("/"):
-                requested_content = file_data[1]
-                break
+        # The stat tuples are built with the index, so they are returned as-is.
+        entry = self._lookup(path)
         
-        if not (requested_content is None):
-            # We found the file.
-            return (0x8000, 0, 0, 0, 0, 0, len(requested_content.encode("utf-8")), 0, 0, 0)
+        if entry is not None:
+            return entry[0]
         
         # Saying we don't have the requested file or folder.
         raise OSError("[Errno 2] No such file/directory")
     
     
     def ilistdir(self, path: str) -> Iterator[Union[Tuple[AnyStr, int, int, int], Tuple[AnyStr, int, int]]]:
-        # Returning the basic info of all the files in the root folder if requested.
-        if path == "/":
-            return iter([
-                (file_data[0], 0x8000, 0, len(file_data[1].encode("utf-8"))) for file_data in __FILE_SYSTEM_CONTENT
-            ])
+        # Returning the basic info of all the files and folders in the requested folder.
+        folder = self._lookup(path)
         
-        # An invalid path was given
-        raise OSError("[Errno 2] No such file/directory")
+        if folder is None:
+            # An invalid path was given
+            raise OSError("[Errno 2] No such file/directory")
+        
+        if not (folder[0][0] & _FLAG_FOLDER):
+            raise OSError("[Errno 20] Not a directory")
+        
+        # The path cache keeps the names of the folder's children, which answers the lookups of the missing ones.
+        if self._path_cache is not None:
+            return iter(self._path_cache.listdir(path, lambda normalized: folder[1]))
+        return iter(folder[1])
     
     
     def statvfs(self, path: int) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
@@ -0,0 +1,146 @@
+# MCU's entrypoint
+
+# Checking if we are on CircuitPython.
+import sys
+if sys.implementation.name != "circuitpython":
+    print("ERROR: You are not using a CircuitPython-based implementation of Python !")
+    sys.exit(1)
+
+
+# Checking if we have access to the required optional modules.
+try:
+    import wifi
+except ImportError:
+    print("Unable to import the 'wifi' module !")
+    print("You need to use a MCU and firmware that supports this module.")
+    sys.exit(2)
+
+try:
+    import adafruit_requests
+except ImportError:
+    print("Unable to import the 'adafruit_requests' module !")
+    print("You need to download and install it onto your device.")
+    sys.exit(3)
+
+try:
+    import secrets
+except ImportError:
+    print("Unable to import the 'secrets' module !")
+    print("You need to use the one provided in the repository and add your values.")
+    sys.exit(4)
+
+try:
+    import stream_file
+    import url_quote
+except ImportError:
+    print("Unable to import the 'stream_file' and 'url_quote' modules !")
+    print("You need to copy them from the 'FS-Common' folder of the repository.")
+    sys.exit(5)
+
+
+# Imports
+import os
+import socketpool
+import storage
+import time
+
+import fs_remote
+from secrets import secrets
+
+
+# CONSTANTS
+MOUNTING_POINT = "/remote"
+
+WIFI_SSID = secrets["ssid"]
+WIFI_PASS = secrets["password"]
+
+SERVER_TIMEOUT = 10
+SERVER_BASE_ADDRESS = "http://{}:{}".format(secrets["server_host"], secrets["server_port"])
+
+# Bytes of file content kept on the device, set it to 0 to disable the cache.
+FS_CACHE_SIZE = 16 * 1024  # 16 KiB
+
+# Files up to this size are grabbed in one request, larger ones are streamed in chunks of the given size.
+FS_MAX_WHOLE_SIZE = 16 * 1024  # 16 KiB
+FS_CHUNK_SIZE = 4 * 1024  # 4 KiB
+
+# Whether the file system should use the connection of "BLD-Remote/client/bld_connection.py", which is kept alive and
+#  reconnects by itself, instead of the one of adafruit_requests.
+FS_MANAGED_CONNECTION = True
+
+# Module served from the root of the server's folder that is imported once the file system is mounted.
+TEST_MODULE = "test"
+
+
+# Code
+print("Preparing the Wi-Fi connection...")
+wifi.radio.enabled = True
+
+print("> Connecting to '{}'".format(WIFI_SSID))
+try:
+    wifi.radio.connect(WIFI_SSID, WIFI_PASS)
+    print("> Done !")
+    print("> IPv4: {}".format(wifi.radio.ipv4_address))
+except:
+    print("ERROR: Failed to establish a Wi-Fi connection !")
+    sys.exit(6)
+
+
+print("Preparing the socketpool and session for the file system...")
+pool = socketpool.SocketPool(wifi.radio)
+if FS_MANAGED_CONNECTION:
+    import bld_connection
+    session = bld_connection.ManagedSession(pool, secrets["server_host"], secrets["server_port"], SERVER_TIMEOUT)
+else:
+    session = adafruit_requests.Session(pool)
+
+
+print("Preparing the remote file system...")
+print("> Server:         {}".format(SERVER_BASE_ADDRESS))
+print("> Cache size:     {}".format(FS_CACHE_SIZE))
+print("> Max whole size: {}".format(FS_MAX_WHOLE_SIZE))
+print("> Chunk size:     {}".format(FS_CHUNK_SIZE))
+fs = fs_remote.RemoteFileSystem(
+    session=session,
+    server_base_address=SERVER_BASE_ADDRESS,
+    server_timeout=SERVER_TIMEOUT,
+    max_whole_size=FS_MAX_WHOLE_SIZE,
+    chunk_size=FS_CHUNK_SIZE,
+    cache_size=FS_CACHE_SIZE,
+)
+
+print("> Mounting the file system at '{}' in RO mode...".format(MOUNTING_POINT))
+storage.mount(fs, MOUNTING_POINT, readonly=True)
+
+
+print("Checking if we can see it in the MCU's root folder:")
+if MOUNTING_POINT.lstrip("/") in os.listdir("/"):
+    print("> It is present !")
+else:
+    print("> It couldn't be found, exiting !")
+    sys.exit(7)
+
+print("Listing of '{}':".format(MOUNTING_POINT))
+for element in os.listdir(MOUNTING_POINT):
+    print("> {}".format(element))
+
+
+print("Preparing the 'sys.path' list to let us import from the new file system")
+sys.path.insert(0, MOUNTING_POINT)
+print("> New: {}".format(sys.path))
+
+print("Importing the '{}' module from '{}'".format(TEST_MODULE, MOUNTING_POINT))
+start_requests = fs.requests
+start_time = time.monotonic()
+__import__(TEST_MODULE)
+print("> Done in {:.2f} seconds with {} request(s)".format(time.monotonic() - start_time,
+                                                          fs.requests - start_requests))
+
+
+print("File cache statistics:")
+print("> Hits:   {}".format(fs.hits))
+print("> Misses: {}".format(fs.misses))
+
+print("Transfer statistics:")
+print("> Requests: {}".format(fs.requests))
+print("> Received: {} bytes".format(fs.bytes_received))
@@ -0,0 +1,446 @@
+# Imports
+import io
+from collections import OrderedDict
+
+try:
+    # Only used by the annotations, which CircuitPython ignores but CPython evaluates.
+    from typing import AnyStr, Iterator, Tuple, Union
+except ImportError:
+    pass
+
+try:
+    from storage import VfsFat
+except ImportError:
+    # Only available on CircuitPython.
+    VfsFat = None
+
+from stream_file import STREAM_BASE, StreamFile
+from url_quote import quote_path
+
+# Constants
+# Flags used in the results of `stat` and `ilistdir`, and in the listings sent by the server.
+_FLAG_FOLDER = 0x4000
+_FLAG_FILE = 0x8000
+
+# Entry of the root folder, which is never listed by its parent.
+_ROOT_ENTRY = (_FLAG_FOLDER, 0, 0)
+
+# Files up to this size are grabbed in one request and opened from memory, larger ones are streamed in chunks.
+DEFAULT_MAX_WHOLE_SIZE = 16 * 1024
+
+# Bytes grabbed by each request of the streamed files.
+DEFAULT_CHUNK_SIZE = 4 * 1024
+
+# Bytes of file content kept by the on-device cache, and number of folders whose listing is kept.
+DEFAULT_CACHE_SIZE = 16 * 1024
+DEFAULT_FOLDER_CAPACITY = 8
+
+
+# Code
+class RemoteFile(StreamFile):
+    # Read-only file of a `RemoteFileSystem` which grabs its content from the server a chunk at a time.
+    # The chunk buffer comes from the file system and is given back to it when the file is closed, so that the next
+    #  streamed file can reuse it.
+    
+    def __init__(self, filesystem, path: str, size: int, text: bool):
+        """
+        :param filesystem: File system from which the content and the chunk buffer come from
+        :param path: Normalized path of the file
+        :param size: Size of the file, as it was listed by the server
+        :param text: Whether strings are returned instead of bytes
+        """
+        super().__init__(filesystem, text)
+        self.size = size
+        self._path = path
+        
+        # Position in the file of the chunk buffer's first byte, and number of bytes it holds.
+        self._buffer = filesystem._take_buffer()
+        self._buffer_start = 0
+        self._buffer_length = 0
+    
+    def _read_raw(self) -> memoryview:
+        """
+        Returns the next bytes of the file without moving its position, grabbing the next chunk if needed.
+        :return: Memoryview of the bytes, which is empty at the end of the file
+        :raises OSError: If the file is closed or the chunk couldn't be grabbed
+        """
+        self._check()
+        
+        index = self._position - self._buffer_start
+        if not (0 <= index < self._buffer_length):
+            length = max(0, min(len(self._buffer), self.size - self._position))
+            if length > 0:
+                length = self._filesystem._fetch_range(self._path, self._position, self._buffer, length)
+            
+            self._buffer_start = self._position
+            self._buffer_length = length
+            index = 0
+        
+        return memoryview(self._buffer)[index:self._buffer_length]
+    
+    def close(self) -> None:
+        """
+        Closes the file and gives its chunk buffer back to the file system.
+        :return: None
+        """
+        if self._filesystem is not None:
+            self._filesystem._release_buffer(self._buffer)
+            self._buffer = None
+            super().close()
+
+
+class RemoteFileSystem:
+    # Read-only file system whose files are served by "server/main.py", one request listing a folder or grabbing a
+    #  file, instead of running FAT over a `RemoteBlockDevice` sector by sector.
+    # The lookups made by CircuitPython are answered with the listing of the path's folder, which is grabbed the first
+    #  time one of its paths is looked up and kept, so the many lookups made by each import cost a single request.
+    # The small files are grabbed whole and kept in a bounded LRU cache, which is checked against the size and
+    #  modification time given by the listings, and the larger ones are streamed through `RemoteFile`.
+    # The listings are kept until they are evicted or `invalidate` is called, so the files that are changed on the
+    #  server are only seen once it is called.
+    
+    # The filesystem label, up to 11 case-insensitive bytes.
+    label: str
+    
+    # Always True, the file system cannot be written to.
+    readonly: bool
+    
+    # Files up to this size are grabbed whole, and bytes grabbed by each request of the larger ones.
+    max_whole_size: int
+    chunk_size: int
+    
+    # Maximum bytes of file content kept by the cache, and number of folders whose listing is kept.
+    cache_size: int
+    folder_capacity: int
+    
+    # Opened files that were found in the cache, and the ones that had to be grabbed.
+    hits: int
+    misses: int
+    
+    # Requests sent to the server, and bytes of content received from it.
+    requests: int
+    bytes_received: int
+    
+    def __init__(self, session, server_base_address: str, label: str = "REMOTE", readonly: bool = True,
+                 server_timeout: float = 10, max_whole_size: int = DEFAULT_MAX_WHOLE_SIZE,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, cache_size: int = DEFAULT_CACHE_SIZE,
+                 folder_capacity: int = DEFAULT_FOLDER_CAPACITY):
+        """
+        :param session: An adafruit_requests.Session, or a ManagedSession of "BLD-Remote/client/bld_connection.py"
+        :param server_base_address: URL of the server, like "http://192.168.1.2:8081"
+        :param label: Label of the file system, at most 11 bytes long
+        :param readonly: Unused, the file system is always read-only
+        :param server_timeout: Seconds after which a request fails
+        :param max_whole_size: Files up to this size are grabbed in one request, larger ones are streamed
+        :param chunk_size: Bytes grabbed by each request of the streamed files
+        :param cache_size: Bytes of file content kept on the device, 0 to disable the cache
+        :param folder_capacity: Maximum number of folders whose listing is kept, the oldest one is dropped first
+        :raises OSError: If the label is too long
+        """
+        # Preliminary check
+        if len(label.encode('utf-8')) > 11:
+            raise OSError("The given label '{}' is longer than 11 bytes !".format(label))
+        
+        self.label = label
+        self.readonly = True
+        self.max_whole_size = max_whole_size
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.folder_capacity = folder_capacity
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.bytes_received = 0
+        
+        self._session = session
+        self._server_base_address = server_base_address.rstrip("/")
+        self._server_timeout = server_timeout
+        self._cwd = "/"
+        
+        # Normalized path of a folder => Name => (Flags, size, modification time) of its children.
+        # The ring holds the folders in the order they were listed, so that the oldest one is dropped first.
+        self._listings = {}
+        self._folder_ring = [None] * folder_capacity
+        self._folder_ring_next = 0
+        
+        # Normalized path of a file => (Size, modification time, content), from least to most recently used.
+        self._files = OrderedDict()
+        self._cached_bytes = 0
+        
+        # Chunk buffers of the streamed files that were closed, which are reused by the next ones.
+        self._free_buffers = []
+    
+    def _normalize(self, path: str) -> str:
+        """
+        Resolves a path against the current folder.
+        :param path: Absolute path, or path relative to the current folder
+        :return: Path without leading or trailing "/", which is "" for the root folder
+        """
+        if not path.startswith("/"):
+            path = self._cwd + "/" + path
+        
+        names = []
+        for name in path.split("/"):
+            if name == "..":
+                if names:
+                    names.pop()
+            elif name and name != ".":
+                names.append(name)
+        return "/".join(names)
+    
+    def _request(self, route: str, path: str, query: str = ""):
+        """
+        Sends a request to one of the server's routes and checks its status.
+        :param route: Route of the server, like "list"
+        :param path: Normalized path given to the route
+        :param query: Additional query parameters, starting with "&"
+        :return: The response, whose content has to be read and which has to be closed
+        :raises OSError: If the path doesn't exist or the server failed to answer
+        """
+        self.requests += 1
+        response = self._session.get("{}/{}/?p=/{}{}".format(self._server_base_address, route, quote_path(path), query),
+                                     timeout=self._server_timeout)
+        
+        if response.status_code == 200:
+            return response
+        
+        status = response.status_code
+        response.close()
+        if status == 404:
+            raise OSError("[Errno 2] No such file/directory: /{}".format(path))
+        raise OSError("[Errno 5] Input/output error: /{}  (HTTP {})".format(path, status))
+    
+    def _list(self, folder: str) -> dict:
+        """
+        Returns the children of a folder, which are only grabbed from the server the first time.
+        :param folder: Normalized path of an existing folder
+        :return: Dict of the children's name => (Flags, size, modification time)
+        :raises OSError: If the server failed to answer
+        """
+        children = self._listings.get(folder)
+        if children is not None:
+            return children
+        
+        response = self._request("list", folder)
+        content = response.content
+        response.close()
+        self.bytes_received += len(content)
+        
+        children = {}
+        for line in str(content, "utf-8").split("\n"):
+            if line:
+                flags, size, mtime, name = line.split(" ", 3)
+                children[name] = (int(flags), int(size), int(mtime))
+        
+        old_folder = self._folder_ring[self._folder_ring_next]
+        if old_folder is not None:
+            self._listings.pop(old_folder, None)
+        self._listings[folder] = children
+        self._folder_ring[self._folder_ring_next] = folder
+        self._folder_ring_next = (self._folder_ring_next + 1) % self.folder_capacity
+        
+        return children
+    
+    def _resolve(self, path: str) -> tuple:
+        """
+        Returns the entry of a file or folder from the listing of its parent.
+        The parents are resolved first, so the folders that don't exist are never listed.
+        :param path: Normalized path
+        :return: (Flags, size, modification time) of the file or folder, or None if it doesn't exist
+        :raises OSError: If the server failed to answer
+        """
+        if not path:
+            return _ROOT_ENTRY
+        
+        parent, name = path.rsplit("/", 1) if "/" in path else ("", path)
+        
+        # The listings of the parents are checked first, since the ones that were grabbed are enough.
+        children = self._listings.get(parent)
+        if children is None:
+            parent_entry = self._resolve(parent)
+            if parent_entry is None or not (parent_entry[0] & _FLAG_FOLDER):
+                return None
+            children = self._list(parent)
+        
+        return children.get(name)
+    
+    def _fetch_range(self, path: str, offset: int, buffer: bytearray, length: int) -> int:
+        """
+        Grabs a part of a file into a buffer.
+        :param path: Normalized path of the file
+        :param offset: Offset of the first byte
+        :param buffer: Buffer that is filled from its start
+        :param length: Number of bytes to grab, at most the buffer's size
+        :return: Number of bytes that were grabbed, which is lower than the length if the file got shorter
+        :raises OSError: If the file doesn't exist anymore or the server failed to answer
+        """
+        response = self._request("file", path, "&o={}&n={}".format(offset, length))
+        content = response.content
+        response.close()
+        
+        count = min(len(content), length)
+        buffer[:count] = content[:count]
+        self.bytes_received += count
+        return count
+    
+    def _fetch_file(self, path: str, entry: tuple) -> bytes:
+        """
+        Returns the content of a file from the cache if it didn't change, or grabs it whole.
+        :param path: Normalized path of the file
+        :param entry: (Flags, size, modification time) given by the listing of its folder
+        :return: The content of the file
+        :raises OSError: If the file doesn't exist anymore or the server failed to answer
+        """
+        cached = self._files.pop(path, None)
+        if cached is not None:
+            self._cached_bytes -= len(cached[2])
+            if cached[0] == entry[1] and cached[1] == entry[2]:
+                self.hits += 1
+                self._add_to_cache(path, cached)
+                return cached[2]
+        
+        self.misses += 1
+        response = self._request("file", path)
+        content = response.content
+        response.close()
+        self.bytes_received += len(content)
+        
+        self._add_to_cache(path, (entry[1], entry[2], content))
+        return content
+    
+    def _add_to_cache(self, path: str, cached: tuple) -> None:
+        """
+        Keeps the content of a file as the most recently used one, evicting the least recently used ones if needed.
+        :param path: Normalized path of the file
+        :param cached: (Size, modification time, content) of the file
+        :return: None
+        """
+        size = len(cached[2])
+        if self.cache_size <= 0 or size > self.cache_size:
+            return
+        
+        while self._cached_bytes + size > self.cache_size:
+            evicted_path = next(iter(self._files))
+            self._cached_bytes -= len(self._files.pop(evicted_path)[2])
+        
+        self._files[path] = cached
+        self._cached_bytes += size
+    
+    def _take_buffer(self) -> bytearray:
+        """
+        Returns a chunk buffer for a streamed file, reusing the one of a closed file if possible.
+        :return: Buffer of `chunk_size` bytes
+        """
+        if self._free_buffers:
+            return self._free_buffers.pop()
+        return bytearray(self.chunk_size)
+    
+    def _release_buffer(self, buffer: bytearray) -> None:
+        """
+        Keeps the chunk buffer of a closed file for the next streamed file.
+        :param buffer: Buffer given by `_take_buffer`
+        :return: None
+        """
+        self._free_buffers.append(buffer)
+    
+    def invalidate(self) -> None:
+        """
+        Drops the listings and the cached files, which has to be done once files were changed on the server.
+        :return: None
+        """
+        self._listings.clear()
+        for i in range(self.folder_capacity):
+            self._folder_ring[i] = None
+        self._folder_ring_next = 0
+        
+        self._files = OrderedDict()
+        self._cached_bytes = 0
+    
+    def open(self, path: str, mode: str) -> Union[RemoteFile, io.StringIO, io.BytesIO]:
+        # Preliminary checks
+        if not (mode in ["r", "rb", "rt"]):
+            raise OSError("[Errno 30] Read-only file system")
+        
+        normalized = self._normalize(path)
+        entry = self._resolve(normalized)
+        
+        if entry is None:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        
+        if entry[0] & _FLAG_FOLDER:
+            raise OSError("[Errno 21] Is a directory: {}".format(path))
+        
+        # Larger files are streamed so that they only cost a chunk of RAM, the other ones are grabbed in one request.
+        if entry[1] > self.max_whole_size and STREAM_BASE is not None:
+            return RemoteFile(self, normalized, entry[1], not mode.endswith("b"))
+        
+        content = self._fetch_file(normalized, entry)
+        if mode.endswith("b"):
+            return io.BytesIO(content)
+        else:
+            return io.StringIO(str(content, "utf-8"))
+    
+    def stat(self, path: str) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
+        entry = self._resolve(self._normalize(path))
+        
+        if entry is None:
+            raise OSError("[Errno 2] No such file/directory")
+        
+        return (entry[0], 0, 0, 0, 0, 0, entry[1], entry[2], entry[2], entry[2])
+    
+    def ilistdir(self, path: str) -> Iterator[Union[Tuple[AnyStr, int, int, int], Tuple[AnyStr, int, int]]]:
+        normalized = self._normalize(path)
+        entry = self._resolve(normalized)
+        
+        if entry is None:
+            raise OSError("[Errno 2] No such file/directory")
+        
+        if not (entry[0] & _FLAG_FOLDER):
+            raise OSError("[Errno 20] Not a directory")
+        
+        children = self._list(normalized)
+        return iter([(name, child[0], 0, child[1]) for name, child in children.items()])
+    
+    def statvfs(self, path: int) -> Tuple[int, int, int, int, int, int, int, int, int, int]:
+        # The capacity of the server's disk is unknown, so it is reported as a full file system of 512 bytes blocks
+        #  whose filenames can be up to 255 bytes long.
+        return (512, 512, 0, 0, 0, 0, 0, 0, 0, 255)
+    
+    def mkfs(self) -> None:
+        raise OSError("[Errno 30] Read-only file system")
+    
+    def mkdir(self, path: str) -> None:
+        raise OSError("[Errno 30] Read-only file system")
+    
+    def rmdir(self, path: str) -> None:
+        raise OSError("[Errno 30] Read-only file system")
+    
+    def mount(self, readonly: bool, mkfs: VfsFat) -> None:
+        return None
+    
+    def umount(self) -> None:
+        return None
+    
+    def remove(self, path: str) -> None:
+        raise OSError("[Errno 30] Read-only file system")
+    
+    def chdir(self, path: str) -> None:
+        # Called by `os.chdir` with a path relative to the mounting point.
+        normalized = self._normalize(path)
+        entry = self._resolve(normalized)
+        if entry is None:
+            raise OSError("[Errno 2] No such file/directory: {}".format(path))
+        if not (entry[0] & _FLAG_FOLDER):
+            raise OSError("[Errno 20] Not a directory: {}".format(path))
+        
+        self._cwd = "/" + normalized
+    
+    def getcwd(self) -> str:
+        # Called by `os.getcwd`, which adds the mounting point in front of it.
+        return self._cwd
+    
+    def rename(self, old_path: str, new_path: str) -> None:
+        raise OSError("[Errno 30] Read-only file system")
+    
+    def utime(self, path: str, times: tuple) -> None:
+        raise OSError("[Errno 30] Read-only file system")
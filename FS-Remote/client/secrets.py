@@ -0,0 +1,6 @@
+secrets = {
+    'ssid': "CHANGE-ME",
+    'password': "CHANGE-ME.",
+    'server_host': "IPV4 OF WHICH SERVER IS RUNNING",
+    'server_port': 8081
+}
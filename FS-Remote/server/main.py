@@ -0,0 +1,160 @@
+# Serves the files of a folder to a RemoteFileSystem, which lists a folder or grabs a file in a single request.
+
+# Imports
+import argparse
+import logging
+import os
+
+from flask import Flask, request, Response
+
+# Constants
+HOST = "0.0.0.0"
+PORT = 8081
+
+ROOT_FOLDER = "./files"
+
+# Files and folders that are never served, the names with a line break would also break the listings' format.
+IGNORED_NAMES = ["__pycache__", ".git", ".DS_Store"]
+
+# Flags used in the listings, which are the ones of the results of `stat` and `ilistdir`.
+FLAG_FOLDER = 0x4000
+FLAG_FILE = 0x8000
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+logger = logging.getLogger("fs")
+
+
+# Code
+class RequestError(Exception):
+    # Raised by the handlers when a request can't be fulfilled, it is sent back with the given HTTP status code.
+    
+    status: int
+    
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def resolve_path(root_folder: str, path: str) -> str:
+    """
+    Returns the path on the disk of a path given by a client, which cannot leave the served folder.
+    :param root_folder: Absolute path of the served folder
+    :param path: Path relative to the root of the remote file system
+    :return: Path on the disk
+    :raises RequestError: If the path is invalid or doesn't exist
+    """
+    if path is None:
+        raise RequestError("Missing 'p' parameter")
+    
+    names = []
+    for name in path.split("/"):
+        if name == ".." or "\\" in name or "\0" in name:
+            raise RequestError("Invalid path: {}".format(path))
+        if name in IGNORED_NAMES:
+            raise RequestError("No such file/directory: {}".format(path), status=404)
+        if name and name != ".":
+            names.append(name)
+    
+    disk_path = os.path.join(root_folder, *names)
+    if not os.path.exists(disk_path):
+        raise RequestError("No such file/directory: {}".format(path), status=404)
+    return disk_path
+
+
+def handle_list(root_folder: str, params: dict) -> str:
+    """
+    Lists a folder for the "/list/" route.
+    Each child is given on its own line as "<flags> <size> <modification time> <name>".
+    :param root_folder: Absolute path of the served folder
+    :param params: Query parameters of the request
+    :return: Body of the response
+    :raises RequestError: If the path is invalid, doesn't exist, or isn't a folder
+    """
+    disk_path = resolve_path(root_folder, params.get("p"))
+    if not os.path.isdir(disk_path):
+        raise RequestError("Not a directory: {}".format(params.get("p")), status=409)
+    
+    logger.debug("User listed '{}'".format(params.get("p")))
+    
+    lines = []
+    with os.scandir(disk_path) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.name in IGNORED_NAMES or "\n" in entry.name:
+                continue
+            
+            entry_stat = entry.stat()
+            if entry.is_dir():
+                lines.append("{} 0 {} {}\n".format(FLAG_FOLDER, int(entry_stat.st_mtime), entry.name))
+            else:
+                lines.append("{} {} {} {}\n".format(
+                    FLAG_FILE, entry_stat.st_size, int(entry_stat.st_mtime), entry.name))
+    
+    return "".join(lines)
+
+
+def handle_file(root_folder: str, params: dict) -> bytes:
+    """
+    Reads a file for the "/file/" route, either whole or the "n" bytes starting at the "o" offset.
+    :param root_folder: Absolute path of the served folder
+    :param params: Query parameters of the request
+    :return: Body of the response, which is shorter than requested at the end of the file
+    :raises RequestError: If the path or the range are invalid, or if the path isn't a file
+    """
+    disk_path = resolve_path(root_folder, params.get("p"))
+    if not os.path.isfile(disk_path):
+        raise RequestError("Is a directory: {}".format(params.get("p")), status=409)
+    
+    try:
+        offset = int(params.get("o", 0))
+        count = int(params.get("n", -1))
+    except ValueError:
+        raise RequestError("Invalid 'o' and 'n' parameters")
+    if offset < 0:
+        raise RequestError("Invalid 'o' parameter")
+    
+    logger.debug("User requested {} byte(s) of '{}' starting from {}".format(
+        "all the" if count < 0 else count, params.get("p"), offset))
+    
+    with open(disk_path, "rb") as f:
+        f.seek(offset)
+        return f.read(count)
+
+
+parser = argparse.ArgumentParser(description="Serves the files of a folder to a RemoteFileSystem.")
+parser.add_argument("--root", default=ROOT_FOLDER,
+                    help="Folder whose files are served.  (Default: {})".format(ROOT_FOLDER))
+parser.add_argument("--host", default=HOST, help="Address to listen on.  (Default: {})".format(HOST))
+parser.add_argument("--port", default=PORT, type=int, help="Port to listen on.  (Default: {})".format(PORT))
+parser.add_argument("--log-level", default="DEBUG", choices=LOG_LEVELS,
+                    help="Use DEBUG to log every request and the files it reads.  (Default: DEBUG)")
+args = parser.parse_args()
+
+logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(message)s")
+
+served_folder = os.path.abspath(args.root)
+if not os.path.isdir(served_folder):
+    parser.error("The folder '{}' doesn't exist".format(served_folder))
+logger.info("Serving the files of '{}' ...".format(served_folder))
+
+logger.info("Preparing the Flask app...")
+app = Flask(__name__)
+
+
+@app.errorhandler(RequestError)
+def handle_request_error(err: RequestError):
+    return Response(str(err), status=err.status)
+
+
+@app.route('/list/', methods=['GET'])
+def route_list():
+    return Response(handle_list(served_folder, request.args), status=200, mimetype="text/plain")
+
+
+@app.route('/file/', methods=['GET'])
+def route_file():
+    return Response(handle_file(served_folder, request.args), status=200, mimetype="application/octet-stream")
+
+
+if __name__ == '__main__':
+    app.run(args.host, args.port)
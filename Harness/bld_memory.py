@@ -0,0 +1,49 @@
+# Imports
+import time
+
+from bld_stub import StubBlockDevice, MIN_SECTOR_SIZE
+
+
+# Code
+class MemoryBlockDevice(StubBlockDevice):
+    # Working version of the stub whose sectors are held in memory, used by "harness.py" as a baseline and to replay
+    #  traces without a server.
+    # An artificial latency can be added to each call in order to imitate a slow storage medium.
+    
+    sector_count: int
+    sector_size: int
+    
+    # Seconds added to each call.
+    latency: float
+    
+    data: bytearray
+    
+    def __init__(self, sector_count: int, sector_size: int = MIN_SECTOR_SIZE, latency: float = 0):
+        super().__init__()
+        self.sector_count = sector_count
+        self.sector_size = sector_size
+        self.latency = latency
+        self.data = bytearray(sector_count * sector_size)
+    
+    def count(self) -> int:
+        return self.sector_count
+    
+    def readblocks(self, start_block: int, buf: bytearray) -> None:
+        start = start_block * self.sector_size
+        if start < 0 or start + len(buf) > len(self.data):
+            raise OSError("Sectors #{} to #{} are out-of-bounds !".format(
+                start_block, start_block + len(buf) // self.sector_size - 1))
+        
+        if self.latency > 0:
+            time.sleep(self.latency)
+        buf[:] = self.data[start:start + len(buf)]
+    
+    def writeblocks(self, start_block: int, buf) -> None:
+        start = start_block * self.sector_size
+        if start < 0 or start + len(buf) > len(self.data):
+            raise OSError("Sectors #{} to #{} are out-of-bounds !".format(
+                start_block, start_block + len(buf) // self.sector_size - 1))
+        
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self.data[start:start + len(buf)] = buf
@@ -0,0 +1,134 @@
+# Imports
+import time
+
+
+# Constants
+# Operations that can appear in a trace.
+TRACE_OP_READ = "r"
+TRACE_OP_WRITE = "w"
+TRACE_OP_SYNC = "s"
+
+# Prefix of the lines printed by `TracingBlockDevice.dump`, which lets the trace be picked out of a whole serial log.
+TRACE_LINE_PREFIX = "TRACE "
+
+
+# Code
+class TracingBlockDevice:
+    # Wraps any BLD and records the sectors each of its calls accessed and how long it took.
+    # It can be given to `storage.VfsFat` on the MCU in order to record the accesses of a real mount, and the trace can
+    #  then be replayed on a computer with "harness.py".
+    
+    bld: object
+    sector_size: int
+    
+    # List of (operation, start block, block count, elapsed nanoseconds) tuples.
+    entries: list
+    
+    # Maximum number of entries that are kept, and how many were dropped once it was reached.
+    max_entries: int
+    dropped: int
+    
+    def __init__(self, bld, max_entries: int = 4096):
+        """
+        :param bld: BLD whose calls are recorded, its `sector_size` field is used if it has one
+        :param max_entries: Maximum number of entries that are kept in memory
+        """
+        self.bld = bld
+        self.sector_size = getattr(bld, "sector_size", 512)
+        self.entries = []
+        self.max_entries = max_entries
+        self.dropped = 0
+    
+    def count(self) -> int:
+        return self.bld.count()
+    
+    def readblocks(self, start_block: int, buf) -> None:
+        start = time.monotonic_ns()
+        self.bld.readblocks(start_block, buf)
+        self._record(TRACE_OP_READ, start_block, len(buf), time.monotonic_ns() - start)
+    
+    def writeblocks(self, start_block: int, buf) -> None:
+        start = time.monotonic_ns()
+        self.bld.writeblocks(start_block, buf)
+        self._record(TRACE_OP_WRITE, start_block, len(buf), time.monotonic_ns() - start)
+    
+    def sync(self) -> None:
+        start = time.monotonic_ns()
+        self.bld.sync()
+        self._record(TRACE_OP_SYNC, 0, 0, time.monotonic_ns() - start)
+    
+    def deinit(self) -> None:
+        self.bld.deinit()
+    
+    def save(self, path: str) -> None:
+        """
+        Writes the trace to the given file, which requires a writable file system on the MCU.
+        :param path: Path of the trace file
+        :return: None
+        """
+        with open(path, "w") as f:
+            for entry in self.entries:
+                f.write(format_entry(entry))
+                f.write("\n")
+    
+    def dump(self) -> None:
+        """
+        Prints the trace on the serial console, each line starts with "TRACE " so the log can be given as-is to
+         "harness.py".
+        :return: None
+        """
+        for entry in self.entries:
+            print(TRACE_LINE_PREFIX + format_entry(entry))
+        
+        if self.dropped > 0:
+            print("# {} entries were dropped".format(self.dropped))
+    
+    def _record(self, operation: str, start_block: int, size: int, elapsed_ns: int) -> None:
+        if len(self.entries) >= self.max_entries:
+            self.dropped += 1
+            return
+        
+        self.entries.append((operation, start_block, size // self.sector_size, elapsed_ns))
+
+
+def format_entry(entry: tuple) -> str:
+    """
+    Formats a trace entry as a line of text without its line ending.
+    :param entry: (operation, start block, block count, elapsed nanoseconds) tuple
+    :return: Formatted entry
+    """
+    return "{} {} {} {}".format(*entry)
+
+
+def load_trace(path: str) -> list:
+    """
+    Reads a trace file written by `TracingBlockDevice.save`, or a serial log holding the lines printed by `dump`.
+    :param path: Path of the file
+    :return: List of (operation, start block, block count, elapsed nanoseconds) tuples
+    :raises ValueError: If a line of the trace is malformed
+    """
+    with open(path, "r") as f:
+        lines = f.readlines()
+    
+    # Only the lines printed by `dump` are used in serial logs, they can be preceded by what the console added.
+    is_log = any(TRACE_LINE_PREFIX in line for line in lines)
+    
+    entries = []
+    for line_number, line in enumerate(lines, 1):
+        if is_log:
+            prefix_index = line.find(TRACE_LINE_PREFIX)
+            if prefix_index < 0:
+                continue
+            line = line[prefix_index + len(TRACE_LINE_PREFIX):]
+        
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        
+        fields = line.split()
+        if len(fields) != 4 or fields[0] not in (TRACE_OP_READ, TRACE_OP_WRITE, TRACE_OP_SYNC):
+            raise ValueError("Line {} of '{}' isn't a valid trace entry !".format(line_number, path))
+        
+        entries.append((fields[0], int(fields[1]), int(fields[2]), int(fields[3])))
+    
+    return entries
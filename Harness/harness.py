@@ -0,0 +1,668 @@
+# Benchmark and trace-replay harness for the BLDs and file systems of this repository that runs on CPython.
+# It measures each call made to a device or file system, and reports its latency, the bytes it moved and the number of
+#  requests it sent to the server.
+# The "storage" and "adafruit_requests" modules are replaced by the stubs of the "stubs" folder if they are missing.
+
+# Imports
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HARNESS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_FOLDER = os.path.dirname(HARNESS_FOLDER)
+
+sys.path[:0] = [os.path.join(REPOSITORY_FOLDER, folder) for folder in [
+    "BLD-Stub", os.path.join("BLD-Remote", "client"), "FS-Blank", "FS-ReadOnlyMemory", "FS-RamDisk", "FS-Common",
+    os.path.join("FS-Remote", "client"),
+]]
+sys.path.append(os.path.join(HARNESS_FOLDER, "stubs"))
+
+import adafruit_requests
+import bld_connection
+import bld_memory
+import bld_remote
+import bld_tcp
+import bld_trace
+import instrumentation
+import storage
+
+
+# Constants
+SECTOR_SIZE = 512
+SECTOR_COUNT = 2048
+
+SPAWN_HOST = "127.0.0.1"
+SPAWN_PORTS = {
+    "main.py": 18090,
+    "main_async.py": 18091,
+    "main_tcp.py": 18092,
+}
+SPAWN_FILE_SERVER_PORT = 18093
+SERVER_TIMEOUT = 10
+
+# Upper bounds of the buckets of the latency histograms, in microseconds.
+HISTOGRAM_BUCKETS = [2 ** i for i in range(4, 24)]
+HISTOGRAM_WIDTH = 40
+
+TARGETS = ["memory", "remote", "tcp", "fs-rom", "fs-blank", "fs-ram", "fs-remote"]
+WORKLOADS = ["random", "sequential", "verify", "replay"]
+
+
+# Code
+class OperationStats:
+    # Measurements of all the calls of a single operation.
+    
+    name: str
+    
+    # Nanoseconds taken by each call.
+    latencies: list
+    
+    # Bytes given to or returned by the calls, and bytes sent and received by the device to do them.
+    data_bytes: int
+    wire_bytes: int
+    
+    # Requests sent to the server by the calls.
+    round_trips: int
+    
+    errors: int
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.data_bytes = 0
+        self.wire_bytes = 0
+        self.round_trips = 0
+        self.errors = 0
+    
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the latency under which the given share of the calls took, in microseconds.
+        :param percent: Share of the calls, from 0 to 100
+        :return: Latency in microseconds
+        """
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * percent / 100), len(latencies) - 1)] / 1000
+    
+    def histogram(self) -> list:
+        """
+        Counts the calls that fall in each bucket of `HISTOGRAM_BUCKETS`, the last one holding the slower ones.
+        :return: List of counts
+        """
+        counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for latency in self.latencies:
+            bucket = 0
+            while bucket < len(HISTOGRAM_BUCKETS) and latency / 1000 >= HISTOGRAM_BUCKETS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+
+class Recorder:
+    # Measures the calls made to a device or file system and sorts them by operation.
+    
+    stats: dict
+    
+    def __init__(self, counters=None):
+        """
+        :param counters: Function returning the bytes moved and the requests sent by the device so far, or None
+        """
+        self.stats = {}
+        self._counters = counters if counters is not None else lambda: (0, 0)
+    
+    def measure(self, name: str, data_bytes: int, function, *function_args):
+        """
+        Calls the given function and adds its measurements to the given operation.
+        :param name: Name of the operation
+        :param data_bytes: Bytes given to or expected from the call
+        :param function: Function to call
+        :param function_args: Arguments given to the function
+        :return: What the function returned
+        """
+        if name not in self.stats:
+            self.stats[name] = OperationStats(name)
+        stats = self.stats[name]
+        
+        wire_bytes, round_trips = self._counters()
+        start = time.perf_counter_ns()
+        try:
+            return function(*function_args)
+        except OSError:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latencies.append(time.perf_counter_ns() - start)
+            
+            end_wire_bytes, end_round_trips = self._counters()
+            stats.data_bytes += data_bytes
+            stats.wire_bytes += end_wire_bytes - wire_bytes
+            stats.round_trips += end_round_trips - round_trips
+
+
+class CountingSession:
+    # Wraps a session and counts the requests it sends, its other fields are used as-is.
+    
+    requests: int
+    
+    def __init__(self, session):
+        self.requests = 0
+        self._session = session
+    
+    def __getattr__(self, name: str):
+        return getattr(self._session, name)
+    
+    def get(self, url: str, **kw):
+        self.requests += 1
+        return self._session.get(url, **kw)
+    
+    def post(self, url: str, **kw):
+        self.requests += 1
+        return self._session.post(url, **kw)
+
+
+def spawn_server(script: str, port: int, folder: str, sector_count: int) -> subprocess.Popen:
+    """
+    Starts one of the servers of "BLD-Remote/server" on a temporary BLD file and waits until it accepts connections.
+    :param script: Name of the server's script
+    :param port: Port the server listens on
+    :param folder: Folder in which the BLD file is created
+    :param sector_count: Number of sectors of the BLD
+    :return: The server's process
+    :raises OSError: If the server didn't start in time
+    """
+    process = subprocess.Popen([
+        sys.executable, os.path.join(REPOSITORY_FOLDER, "BLD-Remote", "server", script),
+        "--host", SPAWN_HOST, "--port", str(port), "--file", os.path.join(folder, "bld.bin"),
+        "--sector-count", str(sector_count), "--log-level", "WARNING",
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return wait_for_server(process, script, port)
+
+
+def spawn_file_server(port: int, folder: str) -> subprocess.Popen:
+    """
+    Starts the server of "FS-Remote/server" on the given folder and waits until it accepts connections.
+    :param port: Port the server listens on
+    :param folder: Folder whose files are served
+    :return: The server's process
+    :raises OSError: If the server didn't start in time
+    """
+    process = subprocess.Popen([
+        sys.executable, os.path.join(REPOSITORY_FOLDER, "FS-Remote", "server", "main.py"),
+        "--host", SPAWN_HOST, "--port", str(port), "--root", folder, "--log-level", "WARNING",
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return wait_for_server(process, "main.py", port)
+
+
+def wait_for_server(process: subprocess.Popen, script: str, port: int) -> subprocess.Popen:
+    # Returns the process once its server accepts connections, or terminates it if it takes too long.
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((SPAWN_HOST, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    
+    process.terminate()
+    raise OSError("The '{}' server didn't start in time !".format(script))
+
+
+def open_remote_device(args: argparse.Namespace, host: str, port: int):
+    # Returns the RemoteBlockDevice and a function giving the bytes it moved and the requests it sent.
+    if args.session == "managed":
+        session = bld_connection.ManagedSession(socket, host, port, SERVER_TIMEOUT, args.max_in_flight)
+    else:
+        session = adafruit_requests.Session(socket)
+    session = CountingSession(session)
+    
+    base_address = "http://{}:{}".format(host, port)
+    res = session.get("{}/info/".format(base_address), timeout=SERVER_TIMEOUT)
+    if res.status_code != 200:
+        raise OSError("Unable to grab the BLD info !  ({})".format(res.status_code))
+    bld_info = json.loads(res.content)
+    res.close()
+    
+    bld = bld_remote.RemoteBlockDevice(
+        session=session,
+        server_base_address=base_address,
+        server_timeout=SERVER_TIMEOUT,
+        sector_count=bld_info["sector_count"],
+        sector_size=bld_info["sector_size"],
+        cache_size=args.cache_size,
+        read_ahead_size=args.read_ahead_size,
+        write_back_size=args.write_back_size,
+        encoding=args.encoding,
+        collect_garbage=False,
+        server_sync="sync" in bld_info.get("features", []),
+        server_batch="batch" in bld_info.get("features", []),
+    )
+    return bld, lambda: (bld.bytes_sent + bld.bytes_received, session.requests)
+
+
+def open_tcp_device(args: argparse.Namespace, host: str, port: int):
+    # Returns the RemoteBlockDevice using the binary protocol and a function giving the bytes it moved and the
+    #  requests it sent.
+    transport = bld_tcp.TcpTransport(socket, host, port, SERVER_TIMEOUT)
+    bld_info = transport.info()
+    
+    bld = bld_remote.RemoteBlockDevice(
+        session=None,
+        server_base_address=None,
+        server_timeout=SERVER_TIMEOUT,
+        sector_count=bld_info["sector_count"],
+        sector_size=bld_info["sector_size"],
+        cache_size=args.cache_size,
+        read_ahead_size=args.read_ahead_size,
+        write_back_size=args.write_back_size,
+        encoding=bld_remote.BLD_ENCODING_RAW,
+        collect_garbage=False,
+        transport=transport,
+    )
+    return bld, lambda: (bld.bytes_sent + bld.bytes_received, transport.requests)
+
+
+def open_remote_file_system(args: argparse.Namespace, folder: str):
+    # Returns the RemoteFileSystem, a function giving the bytes it received and the requests it sent, and the process
+    #  of the server if one had to be started on a folder holding the files of the ROM file system and a large asset.
+    import fs_remote
+    import fs_rom
+    
+    process = None
+    host, port = args.host, args.port
+    if host is None:
+        served_folder = os.path.join(folder, "files")
+        for file_path, text in fs_rom._FILE_SYSTEM_CONTENT + [["assets/large.bin", "#" * 64 * 1024]]:
+            disk_path = os.path.join(served_folder, *file_path.split("/"))
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with open(disk_path, "w") as f:
+                f.write(text)
+        
+        host, port = SPAWN_HOST, SPAWN_FILE_SERVER_PORT
+        print("> Starting 'FS-Remote/server/main.py' on {}:{}".format(host, port))
+        process = spawn_file_server(port, served_folder)
+    
+    if args.session == "managed":
+        session = bld_connection.ManagedSession(socket, host, port, SERVER_TIMEOUT, args.max_in_flight)
+    else:
+        session = adafruit_requests.Session(socket)
+    
+    filesystem = fs_remote.RemoteFileSystem(session, "http://{}:{}".format(host, port), server_timeout=SERVER_TIMEOUT,
+                                            cache_size=args.cache_size)
+    return filesystem, lambda: (filesystem.bytes_received, filesystem.requests), process
+
+
+def run_random(bld, recorder: Recorder, operation_count: int, max_sectors: int, write_ratio: float) -> None:
+    # Reads and writes random ranges of sectors, and syncs the device at the end.
+    sector_size = bld.sector_size
+    rng = random.Random(0)
+    
+    for _ in range(operation_count):
+        sector_count = rng.randint(1, max_sectors)
+        start_sector = rng.randint(0, bld.count() - sector_count)
+        buf = bytearray(sector_count * sector_size)
+        
+        if rng.random() < write_ratio:
+            buf[:] = rng.randbytes(len(buf))
+            recorder.measure("write", len(buf), bld.writeblocks, start_sector, buf)
+        else:
+            recorder.measure("read", len(buf), bld.readblocks, start_sector, buf)
+    
+    recorder.measure("sync", 0, bld.sync)
+
+
+def run_sequential(bld, recorder: Recorder, chunk_sectors: int) -> None:
+    # Reads the whole device from start to end like a file being copied would.
+    buf = bytearray(chunk_sectors * bld.sector_size)
+    for start_sector in range(0, bld.count() - chunk_sectors + 1, chunk_sectors):
+        recorder.measure("read", len(buf), bld.readblocks, start_sector, buf)
+
+
+def run_verify(bld, recorder: Recorder, operation_count: int, max_sectors: int) -> None:
+    # Mixes sequential reads with writes just ahead of them and random accesses, and checks each read against what
+    #  was written, which catches the stale sectors that the cache, the read-ahead or the write-back could return.
+    # The sectors that weren't written yet are checked against what they held the first time they were read.
+    sector_size = bld.sector_size
+    rng = random.Random(0)
+    known = {}
+    position = 0
+    
+    def check(start_sector: int, buf: bytearray) -> None:
+        for i in range(len(buf) // sector_size):
+            data = bytes(buf[i * sector_size:(i + 1) * sector_size])
+            expected = known.setdefault(start_sector + i, data)
+            if data != expected:
+                raise ValueError("Sector #{} doesn't hold what was written to it !".format(start_sector + i))
+    
+    for _ in range(operation_count):
+        sector_count = rng.randint(1, max_sectors)
+        choice = rng.random()
+        
+        if choice < 0.4:
+            # Sequential reads, which let the device read ahead.
+            if position + sector_count > bld.count():
+                position = 0
+            start_sector = position
+            position += sector_count
+        elif choice < 0.6:
+            # Writes among the sectors that the next sequential reads are about to reach.
+            start_sector = min(position + rng.randint(0, max_sectors * 4), bld.count() - sector_count)
+        else:
+            start_sector = rng.randint(0, bld.count() - sector_count)
+        
+        buf = bytearray(sector_count * sector_size)
+        if choice >= 0.4 and rng.random() < 0.5:
+            buf[:] = rng.randbytes(len(buf))
+            recorder.measure("write", len(buf), bld.writeblocks, start_sector, buf)
+            for i in range(sector_count):
+                known[start_sector + i] = bytes(buf[i * sector_size:(i + 1) * sector_size])
+        else:
+            recorder.measure("read", len(buf), bld.readblocks, start_sector, buf)
+            check(start_sector, buf)
+    
+    recorder.measure("sync", 0, bld.sync)
+    
+    # Reading every sector that was seen once everything was sent to the server.
+    for sector in sorted(known):
+        buf = bytearray(sector_size)
+        recorder.measure("read", len(buf), bld.readblocks, sector, buf)
+        check(sector, buf)
+
+
+def run_replay(bld, recorder: Recorder, entries: list) -> None:
+    # Does the same calls as the trace in the same order, the written sectors are filled with a pattern since traces
+    #  don't hold any data.
+    for operation, start_block, block_count, _ in entries:
+        if start_block + block_count > bld.count():
+            raise ValueError("The trace accesses sector #{} but the device only has {} sectors !".format(
+                start_block + block_count - 1, bld.count()))
+        
+        buf = bytearray(block_count * bld.sector_size)
+        if operation == bld_trace.TRACE_OP_READ:
+            recorder.measure("read", len(buf), bld.readblocks, start_block, buf)
+        elif operation == bld_trace.TRACE_OP_WRITE:
+            buf[:] = bytes([start_block % 251]) * len(buf)
+            recorder.measure("write", len(buf), bld.writeblocks, start_block, buf)
+        else:
+            recorder.measure("sync", 0, bld.sync)
+
+
+def run_file_system(filesystem, recorder: Recorder, mount_path: str, libraries: int = 1) -> None:
+    # Calls the VFS methods in the same way CircuitPython does when a folder is listed and its files are imported.
+    recorder.measure("mount", 0, storage.mount, filesystem, mount_path)
+    recorder.measure("stat", 0, filesystem.stat, "/")
+    recorder.measure("statvfs", 0, filesystem.statvfs, "/")
+    
+    folders = ["/"]
+    while folders:
+        folder = folders.pop()
+        entries = recorder.measure("ilistdir", 0, lambda: list(filesystem.ilistdir(folder)))
+        
+        for entry in entries:
+            path = folder.rstrip("/") + "/" + entry[0]
+            recorder.measure("stat", 0, filesystem.stat, path)
+            
+            if entry[1] & 0x4000:
+                folders.append(path)
+            elif entry[1] & 0x8000:
+                size = entry[3] if len(entry) > 3 else 0
+                for mode in ["r", "rb"]:
+                    f = recorder.measure("open", 0, filesystem.open, path, mode)
+                    recorder.measure("read", size, f.read)
+                    f.close()
+    
+    # Imports look for a package and for each kind of module before failing, once for each library that is imported
+    #  from another folder of `sys.path` when the file system is at its front.
+    for i in range(libraries):
+        for extension in ["", ".mpy", ".py"]:
+            try:
+                recorder.measure("stat (missing)", 0, filesystem.stat, "/library_{}{}".format(i, extension))
+            except OSError:
+                pass
+    
+    recorder.measure("umount", 0, storage.umount, mount_path)
+
+
+def add_lookup_latency(filesystem, latency: float) -> None:
+    # Imitates a file system whose lookups go over the network, like a `VfsFat` on top of a remote BLD.
+    stat = filesystem.stat
+    ilistdir = filesystem.ilistdir
+    
+    def slow_stat(path):
+        time.sleep(latency)
+        return stat(path)
+    
+    def slow_ilistdir(path):
+        time.sleep(latency)
+        return ilistdir(path)
+    
+    filesystem.stat = slow_stat
+    filesystem.ilistdir = slow_ilistdir
+
+
+def run_scratch_writes(filesystem, recorder: Recorder) -> None:
+    # Writes a log and a temporary file like a program using the file system as a scratch area, and removes them.
+    line = "> {:>10} Something happened\n".format(0)
+    for _ in range(16):
+        f = recorder.measure("open (a)", 0, filesystem.open, "/log.txt", "a")
+        recorder.measure("write", len(line), f.write, line)
+        f.close()
+    
+    data = bytes(4096)
+    f = recorder.measure("open (w)", 0, filesystem.open, "/temp.bin", "wb")
+    for offset in range(0, len(data), 512):
+        recorder.measure("write", 512, f.write, data[offset:offset + 512])
+    f.close()
+
+
+def remove_scratch_writes(filesystem, recorder: Recorder) -> None:
+    for path in ["/log.txt", "/temp.bin"]:
+        recorder.measure("remove", 0, filesystem.remove, path)
+
+
+def print_report(recorder: Recorder, duration: float) -> None:
+    print("> {:<16} {:>7} {:>10} {:>10} {:>10} {:>12} {:>12} {:>9} {:>7}".format(
+        "Operation", "Calls", "p50 (us)", "p99 (us)", "Max (us)", "Data (B)", "Wire (B)", "Requests", "Errors"))
+    for stats in recorder.stats.values():
+        print("> {:<16} {:>7} {:>10.1f} {:>10.1f} {:>10.1f} {:>12} {:>12} {:>9} {:>7}".format(
+            stats.name, len(stats.latencies), stats.percentile(50), stats.percentile(99), stats.percentile(100),
+            stats.data_bytes, stats.wire_bytes, stats.round_trips, stats.errors))
+    
+    call_count = sum(len(stats.latencies) for stats in recorder.stats.values())
+    print("> {} calls in {:.2f} seconds, {:.2f} requests per call".format(
+        call_count, duration, sum(stats.round_trips for stats in recorder.stats.values()) / max(call_count, 1)))
+    
+    for stats in recorder.stats.values():
+        counts = stats.histogram()
+        used = [i for i, count in enumerate(counts) if count > 0]
+        if not used:
+            continue
+        
+        print("Latencies of '{}':".format(stats.name))
+        for i in range(used[0], used[-1] + 1):
+            lower = HISTOGRAM_BUCKETS[i - 1] if i > 0 else 0
+            upper = "{:>8}".format(HISTOGRAM_BUCKETS[i]) if i < len(HISTOGRAM_BUCKETS) else "     inf"
+            print("> {:>8} - {} us | {:<{}} {}".format(
+                lower, upper, "#" * -(-counts[i] * HISTOGRAM_WIDTH // max(counts)), HISTOGRAM_WIDTH, counts[i]))
+
+
+def run(args: argparse.Namespace, folder: str) -> None:
+    if args.target in ["fs-rom", "fs-blank", "fs-ram", "fs-remote"]:
+        path_cache = None
+        if args.path_cache > 0:
+            import path_cache as path_cache_module
+            path_cache = path_cache_module.PathCache(args.path_cache)
+        
+        process = None
+        counters = None
+        if args.target == "fs-remote":
+            # The remote file system keeps the listings of the folders instead of using a path cache.
+            filesystem, counters, process = open_remote_file_system(args, folder)
+        elif args.target == "fs-rom":
+            import fs_rom
+            filesystem = fs_rom.ReadOnlyMemoryFileSystem(image=args.rom_image, path_cache=path_cache)
+        elif args.target == "fs-ram":
+            import fs_ram
+            filesystem = fs_ram.RamDiskFileSystem(path_cache=path_cache)
+        else:
+            import fs_blank
+            filesystem = fs_blank.BlankMemoryFileSystem(path_cache=path_cache)
+        
+        if args.latency > 0:
+            add_lookup_latency(filesystem, args.latency)
+        
+        negative_cache = None
+        if args.negative_cache:
+            import negative_cache as negative_cache_module
+            filesystem = negative_cache = negative_cache_module.NegativeLookupFileSystem(filesystem)
+        
+        filesystem_instrumentation = None
+        if args.instrument:
+            filesystem_instrumentation = instrumentation.Instrumentation()
+            instrumentation.instrument(filesystem, filesystem_instrumentation)
+        
+        recorder = Recorder(counters)
+        start = time.perf_counter()
+        try:
+            for _ in range(args.operations):
+                if args.target == "fs-ram":
+                    run_scratch_writes(filesystem, recorder)
+                run_file_system(filesystem, recorder, "/" + args.target, args.libraries)
+                if args.target == "fs-ram":
+                    remove_scratch_writes(filesystem, recorder)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        print_report(recorder, time.perf_counter() - start)
+        
+        if args.target == "fs-remote":
+            print("> File cache: {} hits, {} misses".format(filesystem.hits, filesystem.misses))
+        if path_cache is not None:
+            print("> Path cache: {} hits, {} misses".format(path_cache.hits, path_cache.misses))
+        if negative_cache is not None:
+            print("> Negative cache: {} hits, {} misses".format(negative_cache.hits, negative_cache.misses))
+        
+        if filesystem_instrumentation is not None:
+            filesystem_instrumentation.dump()
+        return
+    
+    entries = None
+    sector_count = args.sector_count
+    if args.trace is not None:
+        entries = bld_trace.load_trace(args.trace)
+        print("> Loaded {} entries from '{}'".format(len(entries), args.trace))
+        
+        # The BLD is made large enough for the trace when it is created by the harness.
+        sector_count = max([sector_count] + [start_block + block_count for _, start_block, block_count, _ in entries])
+    
+    process = None
+    host, port = args.host, args.port
+    try:
+        if args.target == "memory":
+            bld = bld_memory.MemoryBlockDevice(sector_count, SECTOR_SIZE, args.latency)
+            counters = None
+        else:
+            if host is None:
+                script = "main_tcp.py" if args.target == "tcp" else args.server
+                host, port = SPAWN_HOST, SPAWN_PORTS[script]
+                print("> Starting '{}' on {}:{}".format(script, host, port))
+                process = spawn_server(script, port, folder, sector_count)
+            
+            if args.target == "tcp":
+                bld, counters = open_tcp_device(args, host, port)
+            else:
+                bld, counters = open_remote_device(args, host, port)
+        
+        bld_instrumentation = None
+        if args.instrument:
+            bld_instrumentation = instrumentation.Instrumentation()
+            instrumentation.instrument(bld, bld_instrumentation)
+        
+        tracer = None
+        if args.record is not None:
+            tracer = bld_trace.TracingBlockDevice(bld, max_entries=1 << 24)
+            bld = tracer
+        
+        recorder = Recorder(counters)
+        start = time.perf_counter()
+        if entries is not None:
+            run_replay(bld, recorder, entries)
+        elif args.workload == "sequential":
+            run_sequential(bld, recorder, args.max_sectors)
+        elif args.workload == "verify":
+            run_verify(bld, recorder, args.operations, args.max_sectors)
+        else:
+            run_random(bld, recorder, args.operations, args.max_sectors, args.write_ratio)
+        duration = time.perf_counter() - start
+        
+        print_report(recorder, duration)
+        
+        if bld_instrumentation is not None:
+            bld_instrumentation.dump()
+        
+        if tracer is not None:
+            tracer.save(args.record)
+            print("> Recorded {} entries in '{}'".format(len(tracer.entries), args.record))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measures the BLDs and file systems of this repository on CPython.")
+    parser.add_argument("target", choices=TARGETS, help="Device or file system to measure.")
+    parser.add_argument("--workload", default="random", choices=WORKLOADS,
+                        help="Calls made to a device.  (Default: random)")
+    parser.add_argument("--trace", default=None, help="Trace file or serial log to replay on a device.")
+    parser.add_argument("--record", default=None, help="File in which the calls made to a device are recorded.")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Prints what \"instrumentation.py\" recorded, as it would on the MCU.")
+    parser.add_argument("--rom-image", default=None,
+                        help="Image made by \"build_rom.py\" that the ROM file system mounts instead of its constant.")
+    parser.add_argument("--path-cache", default=0, type=int,
+                        help="Lookups kept by a path cache given to the file systems, none if 0.  (Default: 0)")
+    parser.add_argument("--negative-cache", action="store_true",
+                        help="Wraps the file systems in \"FS-Common/negative_cache.py\".")
+    parser.add_argument("--libraries", default=1, type=int,
+                        help="Missing modules looked for on each run over a file system.  (Default: 1)")
+    parser.add_argument("--operations", default=1000, type=int,
+                        help="Calls of the random workload, or runs over a file system.  (Default: 1000)")
+    parser.add_argument("--max-sectors", default=8, type=int, help="Maximum sectors per call.  (Default: 8)")
+    parser.add_argument("--write-ratio", default=0.3, type=float, help="Share of writes.  (Default: 0.3)")
+    parser.add_argument("--sector-count", default=SECTOR_COUNT, type=int,
+                        help="Sectors of the devices created by the harness.  (Default: {})".format(SECTOR_COUNT))
+    parser.add_argument("--latency", default=0, type=float,
+                        help="Seconds added to each call of the memory device, or to each lookup of the file systems.  "
+                             "(Default: 0)")
+    parser.add_argument("--host", default=None,
+                        help="Address of a running server, one is started on a temporary BLD if omitted.")
+    parser.add_argument("--port", default=8080, type=int, help="Port of the running server.  (Default: 8080)")
+    parser.add_argument("--server", default="main_async.py", choices=["main.py", "main_async.py"],
+                        help="HTTP server started for the remote device.  (Default: main_async.py)")
+    parser.add_argument("--session", default="managed", choices=["managed", "adafruit"],
+                        help="Session used by the remote device.  (Default: managed)")
+    parser.add_argument("--max-in-flight", default=4, type=int,
+                        help="Requests the managed session can pipeline.  (Default: 4)")
+    parser.add_argument("--encoding", default=bld_remote.BLD_ENCODING_RAW,
+                        choices=[bld_remote.BLD_ENCODING_BASE64, bld_remote.BLD_ENCODING_RAW,
+                                 bld_remote.BLD_ENCODING_ZLIB],
+                        help="Encoding used by the remote device.  (Default: raw)")
+    parser.add_argument("--cache-size", default=0, type=int,
+                        help="Sector cache of the remote devices, or file cache of the remote file system.  "
+                             "(Default: 0)")
+    parser.add_argument("--read-ahead-size", default=0, type=int,
+                        help="Read-ahead of the remote devices.  (Default: 0)")
+    parser.add_argument("--write-back-size", default=0, type=int,
+                        help="Write-back buffer of the remote devices.  (Default: 0)")
+    harness_args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        run(harness_args, temp_dir)
@@ -0,0 +1,213 @@
+# Imports
+import array
+import json
+import time
+
+
+# Constants
+# Methods of the VFS and BLD classes that can be instrumented, their index is used in the ring buffer.
+INSTRUMENTED_METHODS = ("open", "stat", "ilistdir", "statvfs", "readblocks", "writeblocks")
+
+# Prefix of the lines printed by `Instrumentation.dump`, which lets them be picked out of a whole serial log.
+INSTRUMENTATION_LINE_PREFIX = "INSTR "
+
+
+# Code
+class Instrumentation:
+    # Counts the calls made to the instrumented VFS and BLD objects, and keeps the last ones in a ring buffer.
+    # Everything is allocated up front so that recording a call only allocates the timestamps it measures.
+    
+    # Number of calls kept in the ring buffer.
+    capacity: int
+    
+    # Calls, cumulative microseconds and cumulative bytes of each method of `INSTRUMENTED_METHODS`.
+    calls: array.array
+    total_us: array.array
+    sizes: array.array
+    
+    # Number of calls that were recorded since the last reset.
+    recorded: int
+    
+    def __init__(self, capacity: int = 128):
+        """
+        :param capacity: Number of calls kept in the ring buffer
+        """
+        self.capacity = capacity
+        
+        self.calls = array.array("L", [0] * len(INSTRUMENTED_METHODS))
+        self.total_us = array.array("L", [0] * len(INSTRUMENTED_METHODS))
+        self.sizes = array.array("L", [0] * len(INSTRUMENTED_METHODS))
+        self.recorded = 0
+        
+        # Ring buffer of the last calls: Method index, start block, path or None, size, microseconds.
+        self._ring_methods = bytearray(capacity)
+        self._ring_blocks = array.array("L", [0] * capacity)
+        self._ring_paths = [None] * capacity
+        self._ring_sizes = array.array("L", [0] * capacity)
+        self._ring_us = array.array("L", [0] * capacity)
+        self._ring_next = 0
+    
+    def record(self, method_index: int, block: int, path: str, size: int, elapsed_us: int) -> None:
+        """
+        Adds a call to the counters and the ring buffer.
+        :param method_index: Index of the method in `INSTRUMENTED_METHODS`
+        :param block: Start block of the BLD calls
+        :param path: Path given to the VFS calls, or None
+        :param size: Bytes read, written or returned by the call
+        :param elapsed_us: Microseconds taken by the call
+        :return: None
+        """
+        self.calls[method_index] += 1
+        self.total_us[method_index] += elapsed_us
+        self.sizes[method_index] += size
+        
+        i = self._ring_next
+        self._ring_methods[i] = method_index
+        self._ring_blocks[i] = block
+        self._ring_paths[i] = path
+        self._ring_sizes[i] = size
+        self._ring_us[i] = elapsed_us
+        self._ring_next = (i + 1) % self.capacity
+        self.recorded += 1
+    
+    def reset(self) -> None:
+        """
+        Clears the counters and the ring buffer.
+        :return: None
+        """
+        for i in range(len(INSTRUMENTED_METHODS)):
+            self.calls[i] = 0
+            self.total_us[i] = 0
+            self.sizes[i] = 0
+        
+        for i in range(self.capacity):
+            self._ring_paths[i] = None
+        self._ring_next = 0
+        self.recorded = 0
+    
+    def summary(self) -> list:
+        """
+        Returns the counters of the methods that were called, the slowest ones first.
+        :return: List of (method name, calls, cumulative microseconds, cumulative bytes) tuples
+        """
+        methods = [
+            (INSTRUMENTED_METHODS[i], self.calls[i], self.total_us[i], self.sizes[i])
+            for i in range(len(INSTRUMENTED_METHODS)) if self.calls[i] > 0
+        ]
+        return sorted(methods, key=lambda method: method[2], reverse=True)
+    
+    def recent_calls(self) -> list:
+        """
+        Returns the calls held by the ring buffer, the oldest one first.
+        :return: List of (method name, start block or path, size, microseconds) tuples
+        """
+        count = min(self.recorded, self.capacity)
+        calls = []
+        
+        for n in range(count):
+            i = (self._ring_next - count + n) % self.capacity
+            target = self._ring_paths[i] if self._ring_paths[i] is not None else self._ring_blocks[i]
+            calls.append((INSTRUMENTED_METHODS[self._ring_methods[i]], target, self._ring_sizes[i], self._ring_us[i]))
+        
+        return calls
+    
+    def dump(self) -> None:
+        """
+        Prints the counters and the calls held by the ring buffer on the serial console.
+        :return: None
+        """
+        for name, calls, total_us, size in self.summary():
+            print("{}{:<12} {:>6} calls {:>10} us {:>10} bytes".format(
+                INSTRUMENTATION_LINE_PREFIX, name, calls, total_us, size))
+        
+        for name, target, size, elapsed_us in self.recent_calls():
+            print("{}> {} {} {} {}".format(INSTRUMENTATION_LINE_PREFIX, name, target, size, elapsed_us))
+    
+    def to_json(self) -> str:
+        """
+        Returns the counters and the calls held by the ring buffer in the format of the server's "/stats/" route.
+        :return: JSON-encoded report
+        """
+        return json.dumps({
+            "recorded": self.recorded,
+            "methods": [list(method) for method in self.summary()],
+            "recent": [list(call) for call in self.recent_calls()],
+        })
+    
+    def send(self, session, server_base_address: str, timeout: int = 10) -> None:
+        """
+        Sends the report to the server's "/stats/" route, where it can be read from a computer.
+        :param session: Session used to send the report
+        :param server_base_address: Base address of the server, or of the device's routes
+        :param timeout: Seconds after which the request fails
+        :return: None
+        :raises OSError: If the server refused the report
+        """
+        res = session.post("{}/stats/".format(server_base_address), data=self.to_json().encode(),
+                           headers={"Content-Type": "application/json"}, timeout=timeout)
+        status_code = res.status_code
+        res.close()
+        
+        if status_code != 200:
+            raise OSError("Unable to send the instrumentation report !  ({})".format(status_code))
+
+
+def instrument(target, instrumentation: Instrumentation, methods: tuple = INSTRUMENTED_METHODS):
+    """
+    Replaces the given methods of a VFS or BLD object by ones that record their calls, the others are left as-is.
+    :param target: Object whose methods are instrumented
+    :param instrumentation: Instrumentation in which the calls are recorded
+    :param methods: Names of the methods to instrument, taken from `INSTRUMENTED_METHODS`
+    :return: The given object
+    """
+    for name in methods:
+        method = getattr(target, name, None)
+        if method is None:
+            continue
+        
+        index = INSTRUMENTED_METHODS.index(name)
+        if name in ("readblocks", "writeblocks"):
+            wrapper = _wrap_block_method(instrumentation, index, method)
+        elif name == "open":
+            wrapper = _wrap_open(instrumentation, index, method)
+        else:
+            wrapper = _wrap_path_method(instrumentation, index, method, name == "stat")
+        
+        setattr(target, name, wrapper)
+    
+    return target
+
+
+# Each kind of method gets its own wrapper with a fixed signature, since "*args" would allocate a tuple on each call.
+def _wrap_block_method(instrumentation: Instrumentation, index: int, method):
+    def wrapper(start_block, buf):
+        start = time.monotonic_ns()
+        result = method(start_block, buf)
+        instrumentation.record(index, start_block, None, len(buf), (time.monotonic_ns() - start) // 1000)
+        return result
+    return wrapper
+
+
+def _wrap_open(instrumentation: Instrumentation, index: int, method):
+    def wrapper(path, mode):
+        start = time.monotonic_ns()
+        try:
+            return method(path, mode)
+        finally:
+            instrumentation.record(index, 0, path, 0, (time.monotonic_ns() - start) // 1000)
+    return wrapper
+
+
+def _wrap_path_method(instrumentation: Instrumentation, index: int, method, returns_stat: bool):
+    def wrapper(path):
+        start = time.monotonic_ns()
+        try:
+            result = method(path)
+        except OSError:
+            # Failed lookups are recorded too since imports try many paths before finding a module.
+            instrumentation.record(index, 0, path, 0, (time.monotonic_ns() - start) // 1000)
+            raise
+        instrumentation.record(index, 0, path, result[6] if returns_stat else 0,
+                               (time.monotonic_ns() - start) // 1000)
+        return result
+    return wrapper
@@ -0,0 +1,75 @@
+# Stand-in for the "adafruit_requests" library on CPython, which only implements what the BLDs of this repository use.
+# It is only imported by "harness.py" when the real library isn't installed.
+
+# Imports
+import http.client
+from urllib.parse import urlsplit
+
+
+# Code
+class Response:
+    # Imitates the parts of "adafruit_requests.Response" that are used by the BLDs.
+    
+    status_code: int
+    
+    def __init__(self, response: http.client.HTTPResponse):
+        self.status_code = response.status
+        self._response = response
+        self._content = None
+    
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._response.read()
+        return self._content
+    
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        if self._content is not None:
+            for offset in range(0, len(self._content), chunk_size):
+                yield self._content[offset:offset + chunk_size]
+            return
+        
+        while True:
+            chunk = self._response.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    
+    def close(self) -> None:
+        # Reading what is left so that the connection can be used again.
+        if self._content is None:
+            self._response.read()
+        self._response.close()
+
+
+class Session:
+    # Keeps one connection per host alive like "adafruit_requests.Session" does.
+    
+    def __init__(self, socket_pool=None, ssl_context=None):
+        self._connections = {}
+    
+    def request(self, method: str, url: str, data=None, headers: dict = None, timeout: float = 60) -> Response:
+        parts = urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        
+        # The connection is set up again once if the server closed it in the meantime.
+        for attempt in range(2):
+            connection = self._connections.get(parts.netloc)
+            if connection is None:
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+                self._connections[parts.netloc] = connection
+            
+            try:
+                connection.request(method, path, body=data, headers=headers or {})
+                return Response(connection.getresponse())
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                del self._connections[parts.netloc]
+                if attempt == 1:
+                    raise
+    
+    def get(self, url: str, **kw) -> Response:
+        return self.request("GET", url, **kw)
+    
+    def post(self, url: str, **kw) -> Response:
+        return self.request("POST", url, **kw)
@@ -0,0 +1,42 @@
+# Stand-in for CircuitPython's "storage" module on CPython, which keeps track of the mounted VFS objects.
+# It is only imported by "harness.py", which calls the methods of the VFS objects the same way CircuitPython does.
+
+# Code
+_mounts = {}
+
+
+class VfsFat:
+    # CPython has no FAT driver that works on top of a BLD, the accesses of a real mount have to be recorded on the MCU
+    #  with "bld_trace.py" and replayed by "harness.py" instead.
+    
+    def __init__(self, block_device):
+        raise OSError("VfsFat isn't available on CPython, replay a trace recorded on the MCU instead !")
+
+
+def mount(filesystem, mount_path: str, readonly: bool = False) -> None:
+    if mount_path in _mounts:
+        raise OSError("[Errno 1] Operation not permitted: {}".format(mount_path))
+    
+    filesystem.mount(readonly, False)
+    _mounts[mount_path] = filesystem
+
+
+def umount(mount: object) -> None:
+    mount_path = mount
+    if not isinstance(mount, str):
+        mount_path = next((path for path, filesystem in _mounts.items() if filesystem is mount), None)
+    
+    if mount_path not in _mounts:
+        raise OSError("[Errno 22] Invalid argument")
+    
+    _mounts.pop(mount_path).umount()
+
+
+def getmount(mount_path: str) -> object:
+    if mount_path not in _mounts:
+        raise OSError("[Errno 22] Invalid argument")
+    return _mounts[mount_path]
+
+
+def remount(mount_path: str, readonly: bool = False, disable_concurrent_write_protection: bool = False) -> None:
+    getmount(mount_path).readonly = readonly